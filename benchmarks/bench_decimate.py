@@ -0,0 +1,52 @@
+"""
+Compares the render time and file size of saving a long time series with
+and without decimating its line first
+
+    python benchmarks/bench_decimate.py [points]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from pythonlatex import Figure
+
+EXTENSIONS = ["png", "pdf"]
+
+
+def draw(points):
+    rng = np.random.default_rng(0)
+    figure, axis = plt.subplots(figsize=(6, 3))
+    axis.plot(rng.normal(size=points).cumsum(), linewidth=0.5)
+    axis.set_title("random walk")
+    return figure
+
+
+def main(points=10_000_000):
+    draw(points)
+    print(f"{points} points")
+    print(f"{'':16} {'format':>6} {'time':>8} {'size':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for decimate in (False, True):
+            latex_figure = Figure(
+                folders_path=f"{folder}/", decimate=decimate, rasterize_threshold=None
+            )
+            for extension in EXTENSIONS:
+                name = f"decimate_{decimate}"
+                start = time.perf_counter()
+                latex_figure.save_plot(name, extension=extension, dpi=150)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(
+                    latex_figure._absolute_inner_path(f"{name}.{extension}")
+                )
+                label = "decimated" if decimate else "every point"
+                print(f"{label:16} {extension:>6} {elapsed:7.2f}s {size:12d}")
+    plt.close("all")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:]))
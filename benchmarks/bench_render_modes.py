@@ -0,0 +1,50 @@
+"""
+Compares emitting many table floats with the pylatex tree against the
+template render mode
+
+    python benchmarks/bench_render_modes.py [tables]
+"""
+
+import sys
+import tempfile
+import time
+
+from pythonlatex import Table, buffered_inputs
+
+
+def emit(folder, render_mode, tables):
+    table = Table(folders_path=f"{folder}/", render_mode=render_mode)
+    # the manifest is written once per run instead of once per table
+    with buffered_inputs():
+        for number in range(tables):
+            table.create_input_latex(
+                "a & b \\\\ c & d",
+                f"table_{number}",
+                caption=f"Table {number} of the appendix",
+                description="Values in % of the total",
+                printing_input=False,
+            )
+
+
+def main(tables=2000, repeat=3):
+    with tempfile.TemporaryDirectory() as folder:
+        # the files are written once, after which every run leaves them
+        # untouched and times the floats themselves
+        emit(folder, "template", tables)
+        timings = {}
+        for render_mode in ("tree", "template"):
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                emit(folder, render_mode, tables)
+                times.append(time.perf_counter() - start)
+            timings[render_mode] = min(times)
+
+    print(f"{tables} tables")
+    for render_mode, elapsed in timings.items():
+        print(f"{render_mode:10} {elapsed:6.2f}s {1e6 * elapsed / tables:8.1f}us/table")
+    print(f"speedup {timings['tree'] / timings['template']:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:]))
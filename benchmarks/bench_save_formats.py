@@ -0,0 +1,61 @@
+"""
+Compares saving a figure in several formats and dpis with one save_plot call
+against a savefig call per output
+
+    python benchmarks/bench_save_formats.py [points]
+"""
+
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from pythonlatex import Figure
+
+EXTENSIONS = ["pdf", "png", "jpg"]
+DPIS = [300, 150, 72]
+
+
+def draw(points):
+    rng = np.random.default_rng(0)
+    figure, axes = plt.subplots(2, 2, figsize=(8, 6))
+    for axis in axes.flat:
+        axis.plot(rng.normal(size=points).cumsum())
+        axis.scatter(rng.random(points // 10), rng.random(points // 10), s=2)
+        axis.set_title("random walk")
+    figure.tight_layout()
+    return figure
+
+
+def repeated_savefig(figure):
+    for extension in EXTENSIONS:
+        for dpi in DPIS if extension != "pdf" else DPIS[:1]:
+            figure.savefig(BytesIO(), format=extension, dpi=dpi)
+
+
+def main(points=20000, repeat=3):
+    figure = draw(points)
+    with tempfile.TemporaryDirectory() as folder:
+        latex_figure = Figure(folders_path=f"{folder}/")
+        timings = {"savefig per output": [], "save_plot once": []}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            repeated_savefig(figure)
+            timings["savefig per output"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            latex_figure.save_plot("benchmark", extension=EXTENSIONS, dpi=DPIS)
+            timings["save_plot once"].append(time.perf_counter() - start)
+
+    print(f"{len(EXTENSIONS)} formats at {DPIS} dpi, {points} points per axes")
+    for name, times in timings.items():
+        print(f"{name:20} {min(times):6.2f}s")
+    slow, fast = (min(times) for times in timings.values())
+    print(f"speedup {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:]))
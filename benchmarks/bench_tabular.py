@@ -0,0 +1,55 @@
+"""
+Compares the numpy tabular engine with pandas' Styler on a numeric DataFrame
+
+    python benchmarks/bench_tabular.py [rows] [columns]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from pythonlatex.tabular import numpy_tabular, styler_format
+
+OPTIONS = [
+    {},
+    {"precision": 3, "thousands": ",", "na_rep": "--"},
+    {"number_format": "percent", "precision": 2},
+    {"number_format": "scientific", "precision": 3},
+]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def styler_tabular(df, **formatting):
+    # the Styler refuses to render more cells than this option by default
+    with pd.option_context("styler.render.max_elements", df.size + len(df)):
+        return df.style.format(**styler_format(**formatting)).to_latex()
+
+
+def main(rows=100000, columns=20):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        rng.normal(0, 1e4, size=(rows, columns)),
+        columns=[f"column {i}" for i in range(columns)],
+    )
+    df.iloc[::97, 0] = np.nan
+
+    print(f"{rows} x {columns} DataFrame")
+    for formatting in OPTIONS:
+        fast, fast_time = timed(numpy_tabular, df, **formatting)
+        slow, slow_time = timed(styler_tabular, df, **formatting)
+        assert fast == slow, f"outputs differ for {formatting}"
+        print(
+            f"{str(formatting):60} styler {slow_time:7.2f}s  numpy {fast_time:6.2f}s"
+            f"  speedup {slow_time / fast_time:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,276 @@
+"""
+Benchmark suite of the table, figure, value and import paths, writing its
+results to a JSON file
+
+    python benchmarks/suite.py [--quick] [--only table figure ...]
+        [--repeat 3] [--stages] [--output benchmark_results.json]
+
+All data is synthetic and seeded, plots are rendered with the Agg backend and
+every run writes into a fresh temporary folder, so the suite runs offline
+and measures exports from scratch (rather than skipped unchanged files).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from pylatex import NoEscape
+
+from pythonlatex import (
+    Figure,
+    StageStats,
+    SubFigure,
+    Table,
+    Value,
+    buffered_inputs,
+    observing,
+)
+from pythonlatex.saving import reset_shared_state
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TABLE_ROWS = {"quick": (100, 1_000), "full": (100, 1_000, 10_000)}
+TABLE_DTYPES = ("float", "int", "mixed")
+PLOT_POINTS = {"quick": (1_000, 100_000), "full": (1_000, 100_000, 1_000_000)}
+PLOT_EXTENSIONS = ("png", "pdf", "svg")
+VALUES = {"quick": 1_000, "full": 10_000}
+SUBFIGURES = {"quick": (2, 4), "full": (2, 4, 8)}
+IMPORTS = {
+    "pythonlatex": "import pythonlatex",
+    "Value": "from pythonlatex import Value",
+    "Table": "from pythonlatex import Table",
+    "Figure": "from pythonlatex import Figure",
+}
+
+
+def dataframe(rows, dtype, columns=8):
+    rng = np.random.default_rng(0)
+    if dtype == "float":
+        data = rng.normal(0, 1e4, size=(rows, columns))
+        return pd.DataFrame(data, columns=[f"column {i}" for i in range(columns)])
+    if dtype == "int":
+        data = rng.integers(-1_000_000, 1_000_000, size=(rows, columns))
+        return pd.DataFrame(data, columns=[f"column {i}" for i in range(columns)])
+    return pd.DataFrame(
+        {
+            "name": [f"item {i}" for i in range(rows)],
+            "group": pd.Categorical(rng.choice(["a", "b", "c"], size=rows)),
+            "count": rng.integers(0, 1000, size=rows),
+            "share": rng.random(rows),
+            "flag": rng.random(rows) > 0.5,
+            "value": rng.normal(size=rows),
+        }
+    )
+
+
+def draw(points):
+    rng = np.random.default_rng(0)
+    plt.figure(figsize=(6, 4))
+    plt.plot(rng.normal(size=points).cumsum(), linewidth=0.5)
+    plt.title("random walk")
+
+
+def table_cases(size):
+    for rows in TABLE_ROWS[size]:
+        for dtype in TABLE_DTYPES:
+            df = dataframe(rows, dtype)
+
+            def run(folder, df=df):
+                Table(folders_path=folder).create_input_latex(
+                    df, "table", printing_input=False
+                )
+
+            yield "table", f"{dtype}_{rows}", {"rows": rows, "dtype": dtype}, run, 1
+
+
+def figure_cases(size):
+    for points in PLOT_POINTS[size]:
+        for extension in PLOT_EXTENSIONS:
+
+            def run(folder, points=points, extension=extension):
+                draw(points)
+                Figure(folders_path=folder).create_input_latex(
+                    "plot", extension=extension, printing_input=False
+                )
+                plt.close()
+
+            params = {"points": points, "extension": extension}
+            yield "figure", f"{extension}_{points}", params, run, 1
+
+
+def value_cases(size):
+    values = VALUES[size]
+    rng = np.random.default_rng(0)
+    numbers = rng.normal(size=values)
+
+    # the default, unbuffered path as well as a buffered_inputs block
+    def separate(folder):
+        value = Value(folders_path=folder)
+        for number, item in enumerate(numbers):
+            value(item, f"value_{number}", printing_input=False, rounding=3)
+        value.flush_inputs()
+
+    def buffered(folder):
+        value = Value(folders_path=folder)
+        with buffered_inputs():
+            for number, item in enumerate(numbers):
+                value(item, f"value_{number}", printing_input=False, rounding=3)
+
+    def consolidated(folder):
+        with Value(folders_path=folder, consolidated=True) as value:
+            for number, item in enumerate(numbers):
+                value(item, f"value_{number}", printing_input=False, rounding=3)
+
+    yield "value", "separate", {"values": values}, separate, values
+    yield "value", "buffered", {"values": values}, buffered, values
+    yield "value", "consolidated", {"values": values}, consolidated, values
+
+
+def subfigure_cases(size):
+    for subfigures in SUBFIGURES[size]:
+
+        def run(folder, subfigures=subfigures):
+            figure = Figure(folders_path=folder)
+            width = NoEscape(rf"{0.95 / min(subfigures, 4):.2f}\textwidth")
+            for number in range(subfigures):
+                with figure.create(
+                    SubFigure(width=width, folders_path=folder)
+                ) as subfigure:
+                    draw(1_000)
+                    subfigure.add_plot(f"part_{number}", caption=f"part {number}")
+                    plt.close()
+            figure.create_input_latex(
+                "composed", add_plot=False, caption="composed", printing_input=False
+            )
+
+        params = {"subfigures": subfigures}
+        yield "subfigure", f"subfigures_{subfigures}", params, run, subfigures
+
+
+def import_cases(size):
+    for name, statement in IMPORTS.items():
+        yield "import", name, {"statement": statement}, statement, 1
+
+
+def cold_import(statement):
+    """Seconds a fresh interpreter takes for statement, beyond starting up"""
+    environment = {**os.environ, "PYTHONPATH": ROOT}
+
+    def timed(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], env=environment, check=True)
+        return time.perf_counter() - start
+
+    return max(timed(statement) - timed("pass"), 0.0)
+
+
+GROUPS = {
+    "table": table_cases,
+    "figure": figure_cases,
+    "value": value_cases,
+    "subfigure": subfigure_cases,
+    "import": import_cases,
+}
+
+
+def measure(run, repeat, stages):
+    """Times run on a fresh folder repeat times, stage totals of one more run"""
+    times = []
+    breakdown = None
+    for position in range(repeat + stages):
+        with tempfile.TemporaryDirectory() as folder:
+            observed = position == repeat
+            with observing(StageStats()) if observed else nullcontext() as stats:
+                start = time.perf_counter()
+                run(f"{folder}/")
+                elapsed = time.perf_counter() - start
+            # close the manifests of the temporary folder before removing it
+            reset_shared_state()
+        if observed:
+            breakdown = {
+                f"{kind}.{stage}": stats.total(kind, stage)
+                for kind, stage in stats.keys()
+            }
+        else:
+            times.append(elapsed)
+    return times, breakdown
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quick", action="store_true", help="smaller cases only")
+    parser.add_argument("--only", nargs="+", choices=sorted(GROUPS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--stages", action="store_true", help="add the time spent per export stage"
+    )
+    parser.add_argument("--output", default="benchmark_results.json")
+    options = parser.parse_args(argv)
+    # the same backend on every box, without a display
+    plt.switch_backend("Agg")
+
+    size = "quick" if options.quick else "full"
+    results = []
+    for name in options.only or GROUPS:
+        for group, case, params, run, items in GROUPS[name](size):
+            if group == "import":
+                times = [cold_import(run) for _ in range(options.repeat)]
+                breakdown = None
+            else:
+                times, breakdown = measure(run, options.repeat, options.stages)
+            result = {
+                "group": group,
+                "case": case,
+                "params": params,
+                "repeat": options.repeat,
+                "best": min(times),
+                "median": statistics.median(times),
+                "mean": statistics.mean(times),
+                "items": items,
+                "per_item": min(times) / items,
+            }
+            if breakdown is not None:
+                result["stages"] = breakdown
+            results.append(result)
+            print(f"{group:10} {case:20} {result['best']:9.4f}s")
+
+    with open(options.output, "w") as file:
+        json.dump(
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "size": size,
+                "environment": environment(),
+                "results": results,
+            },
+            file,
+            indent=1,
+        )
+    print(f"results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,50 @@ A library complementing/building upon the package
     :license: MIT, see License for more details.
 """
 
-from .figure import Figure, SubFigure
-from .table import Table
-from .saving import LatexSaving
-from .value import Value
+from importlib import import_module
+
+# the public classes are imported lazily on first access, so that e.g. a
+# script only writing values does not pay for importing matplotlib or pandas
+_lazy_imports = {
+    "ArchiveStorage": ".archive",
+    "BackgroundRenderer": ".figure",
+    "Figure": ".figure",
+    "FigureBatch": ".figure",
+    "SubFigure": ".figure",
+    "IncrementalCompiler": ".compiler",
+    "StageStats": ".hooks",
+    "add_observer": ".hooks",
+    "observing": ".hooks",
+    "remove_observer": ".hooks",
+    "LatexSaving": ".saving",
+    "LocalStorage": ".saving",
+    "MemoryStorage": ".saving",
+    "buffered_inputs": ".saving",
+    "flush_inputs": ".saving",
+    "PngOptimizer": ".optimize",
+    "Pretypesetter": ".pretypeset",
+    "RenderCache": ".cache",
+    "Table": ".table",
+    "set_default_render_mode": ".templates",
+    "set_default_storage": ".saving",
+    "export_tables": ".table",
+    "Value": ".value",
+}
+
+__all__ = sorted(_lazy_imports)
+
+
+def __getattr__(name):
+    try:
+        module = _lazy_imports[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 # from .value_old import LatexValue
@@ -0,0 +1,289 @@
+"""Storage streaming the generated files straight into a zip or tar archive.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import posixpath
+import tarfile
+import tempfile
+import threading
+import time
+import warnings
+import zipfile
+from typing import IO, TYPE_CHECKING
+
+from pythonlatex.manifest import MemoryManifest
+from pythonlatex.saving import _as_bytes, flush_inputs
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+FORMATS = ("zip", "tar", "tar.gz", "tar.bz2", "tar.xz")
+
+# chunks streamed into a tar member are spooled up to this size in memory, as
+# a tar header holds the size of the file
+_SPOOL_SIZE = 16 * 1024**2
+
+
+class ArchiveStorage:
+    """Storage writing every file of the run into one zip or tar archive.
+
+    Use it as the storage of Figure, Table and Value instances (or set it
+    with set_default_storage) instead of writing to the local filesystem and
+    archiving the folders path afterwards. Files are stored relative to root,
+    the folders path of the instances, so the archive holds e.g. Tables/ and
+    Tabulars/ at its top level and the \\input paths keep working in it (on
+    Overleaf, say).
+
+    Files are added to the archive as soon as they are written, except the
+    ones named in deferred (the latest_inputs.txt summaries and consolidated
+    values files, which are rewritten during a run), which are kept in memory
+    and added when the archive is closed. A file that was added already can
+    not be replaced, writing it again with other content adds a second member
+    of the same name, which extractors let overwrite the first one.
+
+    The archive is finished by close, or when leaving the storage as a
+    context manager, which first records all pending inputs.
+    """
+
+    local = False
+
+    def __init__(
+        self,
+        file: str | IO[bytes],
+        format: str = "zip",  # noqa: A002
+        root: str = "Latex/",
+        deferred: Sequence[str] = ("latest_inputs.txt", "values.tex"),
+        compresslevel: int | None = None,
+    ) -> None:
+        """Open the archive.
+
+        Args:
+            file: Path of the archive, or a binary file object to stream it
+                to (it does not need to be seekable, e.g. an HTTP response)
+            format: One of FORMATS
+            root: Folder the files are stored relative to, the folders_path
+                of the Figure, Table and Value instances
+            deferred: Names of the files added when the archive is closed
+            compresslevel: Compression level, defaults to that of zipfile or
+                tarfile
+
+        """
+        if format not in FORMATS:
+            msg = f"format should be one of {FORMATS}, not {format!r}"
+            raise ValueError(msg)
+        self.format = format
+        self.root = posixpath.normpath(root)
+        self.deferred = set(deferred)
+        self._owns_file = isinstance(file, str)
+        self._file = open(file, "wb") if self._owns_file else file  # noqa: SIM115
+        if format == "zip":
+            self._archive = zipfile.ZipFile(
+                self._file, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+            )
+        else:
+            compression = format.partition(".")[2]
+            options = {} if compresslevel is None else {"compresslevel": compresslevel}
+            self._archive = tarfile.open(
+                fileobj=self._file, mode=f"w|{compression}", **options
+            )
+        # digest and size of every file in the archive, by path
+        self._added: dict[str, tuple[str, int]] = {}
+        self._pending: dict[str, bytes] = {}
+        self._manifests: dict[str, MemoryManifest] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    @property
+    def scope(self) -> ArchiveStorage:
+        """Indexes of this archive are kept apart from those of other storages."""
+        return self
+
+    def _key(self, path: str) -> str:
+        """Return the name of path in the archive."""
+        name = posixpath.relpath(posixpath.normpath(path), self.root)
+        if name.startswith("../") or name == "..":
+            msg = f"{path} is not within the root {self.root} of the archive"
+            raise ValueError(msg)
+        return name
+
+    def _check_open(self) -> None:
+        if self.closed:
+            msg = "the archive was closed already"
+            raise ValueError(msg)
+
+    def prepare(self, path: str, force: bool = False) -> str:
+        """Return path, folders are implied by the names in the archive."""
+        return path
+
+    def _add(self, name: str, data: bytes) -> None:
+        if self.format == "zip":
+            self._archive.writestr(self._zip_info(name), data)
+        else:
+            self._archive.addfile(self._tar_info(name, len(data)), io.BytesIO(data))
+
+    def _zip_info(self, name: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        # members added by ZipInfo get its level rather than that of the archive
+        info._compresslevel = self._archive.compresslevel  # noqa: SLF001
+        info.external_attr = 0o644 << 16
+        return info
+
+    def _tar_info(self, name: str, size: int) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        return info
+
+    def _replaced(self, name: str, digest: str) -> bool | None:
+        """Return None for a new file, else whether its content changed."""
+        added = self._added.get(name)
+        if added is None:
+            return None
+        if added[0] == digest:
+            return False
+        warnings.warn(
+            f"{name} was added to the archive already, it now holds two versions",
+            stacklevel=4,
+        )
+        return True
+
+    def write(self, path: str, content: str | bytes, digest: str | None = None) -> bool:
+        """Add content to the archive as path, unless it holds it already.
+
+        Returns:
+            True if the file was added, False if it was left out
+
+        """
+        data = _as_bytes(content)
+        if digest is None:
+            digest = hashlib.sha256(data).hexdigest()
+        name = self._key(path)
+        with self._lock:
+            self._check_open()
+            if posixpath.basename(name) in self.deferred:
+                written = self._pending.get(name) != data
+                self._pending[name] = data
+                return written
+            if self._replaced(name, digest) is False:
+                return False
+            self._add(name, data)
+            self._added[name] = (digest, len(data))
+        return True
+
+    def write_chunks(
+        self, path: str, chunks: Iterable[str | bytes]
+    ) -> tuple[bool, str, int]:
+        """Stream chunks into the archive as path, see write.
+
+        Returns:
+            (written, digest, size) of the new content
+
+        """
+        name = self._key(path)
+        if posixpath.basename(name) in self.deferred or name in self._added:
+            data = b"".join(_as_bytes(chunk) for chunk in chunks)
+            digest = hashlib.sha256(data).hexdigest()
+            return self.write(path, data, digest), digest, len(data)
+
+        digest = hashlib.sha256()
+        size = 0
+        with self._lock:
+            self._check_open()
+            if self.format == "zip":
+                info = self._zip_info(name)
+                with self._archive.open(info, "w", force_zip64=True) as member:
+                    for chunk in chunks:
+                        data = _as_bytes(chunk)
+                        digest.update(data)
+                        size += len(data)
+                        member.write(data)
+            else:
+                with tempfile.SpooledTemporaryFile(_SPOOL_SIZE) as spool:
+                    for chunk in chunks:
+                        data = _as_bytes(chunk)
+                        digest.update(data)
+                        size += len(data)
+                        spool.write(data)
+                    spool.seek(0)
+                    self._archive.addfile(self._tar_info(name, size), spool)
+            self._added[name] = (digest.hexdigest(), size)
+        return True, digest.hexdigest(), size
+
+    def read(self, path: str) -> bytes:
+        """Return a deferred file, the others can not be read back."""
+        name = self._key(path)
+        try:
+            return self._pending[name]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def size(self, path: str) -> int:
+        """Return the size of a file in the archive."""
+        name = self._key(path)
+        if name in self._pending:
+            return len(self._pending[name])
+        try:
+            return self._added[name][1]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def remove(self, path: str) -> None:
+        """Drop a deferred file, files in the archive already are kept."""
+        name = self._key(path)
+        with self._lock:
+            if self._pending.pop(name, None) is not None:
+                return
+            if name not in self._added:
+                raise FileNotFoundError(path)
+        warnings.warn(
+            f"{name} was added to the archive already and can not be removed",
+            stacklevel=2,
+        )
+
+    def lock(self, path: str) -> threading.Lock:
+        """Return the lock guarding read-modify-write cycles of path."""
+        with self._lock:
+            return self._locks.setdefault(posixpath.normpath(path), threading.Lock())
+
+    def manifest(self, path: str) -> MemoryManifest:
+        """Return the in-memory Manifest of the artifacts at path."""
+        key = posixpath.normpath(path)
+        with self._lock:
+            if key not in self._manifests:
+                self._manifests[key] = MemoryManifest(key)
+            return self._manifests[key]
+
+    def names(self) -> list[str]:
+        """Return the names of the files in (or deferred to) the archive."""
+        return sorted({*self._added, *self._pending})
+
+    def close(self) -> None:
+        """Record the pending inputs, add the deferred files and finish."""
+        if self.closed:
+            return
+        flush_inputs()
+        with self._lock:
+            for name in sorted(self._pending):
+                self._add(name, self._pending[name])
+            self._pending.clear()
+            self._archive.close()
+            if self._owns_file:
+                self._file.close()
+            self.closed = True
+
+    def __enter__(self) -> ArchiveStorage:
+        """Use the storage for a run, finishing the archive at its end."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Finish the archive."""
+        self.close()
@@ -0,0 +1,415 @@
+"""Persistent cache of rendered matplotlib figures.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+import atexit
+import datetime
+import enum
+import hashlib
+import json
+import os
+import posixpath
+import threading
+import time
+import types
+import warnings
+
+import matplotlib
+import numpy as np
+from cycler import Cycler
+from matplotlib.artist import Artist, ArtistInspector
+from matplotlib.cbook import CallbackRegistry
+from matplotlib.colors import Colormap, Normalize
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.transforms import BboxBase, TransformNode
+
+from pythonlatex.saving import lock_for, write_if_changed
+
+# artist properties that refer to other objects (or need a renderer) rather
+# than describing what gets drawn, the drawn result is covered by the others
+_SKIPPED_PROPERTIES = frozenset(
+    {
+        "agg_filter",
+        "animated",
+        "axes",
+        "axes_locator",
+        "children",
+        "clip_box",
+        "clip_path",
+        "cursor_data",
+        "default_bbox_extra_artists",
+        "figure",
+        "gid",
+        "gridspec",
+        "mouseover",
+        "picker",
+        "subplotspec",
+        "tightbbox",
+        "transform",
+        "transformed_clip_path_and_affine",
+        "url",
+        "window_extent",
+    }
+)
+
+# nesting of helper objects (a formatter holding a locator holding ...) the
+# digest follows before giving up on a figure
+_MAX_DEPTH = 12
+
+
+# values their repr describes completely
+_REPRESENTED = (
+    str,
+    bytes,
+    int,
+    float,
+    bool,
+    range,
+    slice,
+    type(None),
+    np.generic,
+    enum.Enum,
+    datetime.date,
+    datetime.time,
+    datetime.tzinfo,
+)
+
+
+class _UnhashableError(Exception):
+    """A property value the digest can not describe, the figure is not cached."""
+
+
+# names of the drawn properties per artist type, looked up once per type as
+# matplotlib's own introspection is slower than rendering the figure itself
+_property_names = {}
+
+
+def _drawn_properties(artist: Artist) -> list[tuple[str, object]]:
+    """Return the (name, value) pairs of the settable properties of an artist."""
+    names = _property_names.get(type(artist))
+    if names is None:
+        names = sorted(
+            name
+            for name in ArtistInspector(artist).get_setters()
+            if name not in _SKIPPED_PROPERTIES
+            and callable(getattr(artist, f"get_{name}", None))
+        )
+        _property_names[type(artist)] = names
+
+    properties = []
+    for name in names:
+        try:
+            properties.append((name, getattr(artist, f"get_{name}")()))
+        except (TypeError, ValueError, AttributeError):
+            # getters that need a renderer or extra arguments
+            continue
+    # the norm of images and collections has no getter
+    norm = getattr(artist, "norm", None)
+    if isinstance(norm, Normalize):
+        properties.append(("norm", norm))
+    return properties
+
+
+def _update_function(digest: "hashlib._Hash", function: object, depth: int) -> None:
+    """Feed the code, defaults, closure and used globals of a function."""
+    code = function.__code__
+    _update_digest(digest, code, depth)
+    _update_digest(digest, function.__defaults__, depth)
+    _update_digest(digest, function.__kwdefaults__, depth)
+    for cell in function.__closure__ or ():
+        _update_digest(digest, cell.cell_contents, depth)
+    for name in code.co_names:
+        if name in function.__globals__:
+            _update_digest(digest, name, depth)
+            _update_digest(digest, function.__globals__[name], depth)
+
+
+def _update_digest(digest: "hashlib._Hash", value: object, depth: int = 0) -> None:
+    """Feed a (nested) property value into the digest.
+
+    Raises:
+        _UnhashableError: For a value it does not know how to describe
+
+    """
+    if depth > _MAX_DEPTH:
+        msg = f"{type(value).__qualname__} is nested too deeply"
+        raise _UnhashableError(msg)
+    depth += 1
+    if isinstance(value, np.ndarray):
+        if np.ma.isMaskedArray(value):
+            _update_digest(digest, np.ma.getmaskarray(value), depth)
+            value = np.ma.getdata(value)
+        if value.dtype.hasobject:
+            _update_digest(digest, value.tolist(), depth)
+            return
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"[{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item, depth)
+        digest.update(b"]")
+    elif isinstance(value, (set, frozenset)):
+        _update_digest(digest, sorted(value, key=repr), depth)
+    elif isinstance(value, dict):
+        digest.update(f"{{{len(value)}".encode())
+        for key in sorted(value, key=repr):
+            _update_digest(digest, key, depth)
+            _update_digest(digest, value[key], depth)
+        digest.update(b"}")
+    elif isinstance(value, _REPRESENTED):
+        digest.update(repr(value).encode())
+    elif isinstance(value, (Artist, CallbackRegistry, types.ModuleType)):
+        # a reference to another artist, which is fingerprinted on its own
+        digest.update(type(value).__qualname__.encode())
+    elif isinstance(value, BboxBase):
+        _update_digest(digest, value.get_points(), depth)
+    elif isinstance(value, TransformNode):
+        # the drawn result of a transform is covered by the data and limits
+        digest.update(type(value).__qualname__.encode())
+    elif hasattr(value, "vertices"):  # matplotlib Path
+        _update_digest(digest, value.vertices, depth)
+        _update_digest(digest, value.codes, depth)
+    elif isinstance(value, Colormap):
+        digest.update(f"{type(value).__qualname__}{value.name}{value.N}".encode())
+        _update_digest(digest, value(np.arange(value.N)), depth)
+        for extreme in (value.get_under(), value.get_over(), value.get_bad()):
+            _update_digest(digest, extreme, depth)
+    elif isinstance(value, Cycler):
+        _update_digest(digest, value.by_key(), depth)
+    elif isinstance(value, FontProperties):
+        digest.update(value.get_fontconfig_pattern().encode())
+    elif isinstance(value, types.FunctionType):
+        _update_function(digest, value, depth)
+    elif isinstance(value, types.CodeType):
+        digest.update(value.co_code)
+        _update_digest(digest, value.co_consts, depth)
+        _update_digest(digest, value.co_names, depth)
+    elif isinstance(value, (types.BuiltinFunctionType, type)):
+        digest.update(f"{value.__module__}.{value.__qualname__}".encode())
+    elif type(value).__module__.startswith("matplotlib.") and hasattr(
+        value, "__dict__"
+    ):
+        # norms, formatters, locators, converters, ... by class and state
+        digest.update(type(value).__qualname__.encode())
+        _update_digest(digest, vars(value), depth)
+    else:
+        msg = f"can not fingerprint a {type(value).__qualname__}"
+        raise _UnhashableError(msg)
+
+
+def figure_fingerprint(
+    figure: Figure,
+    args: tuple,
+    kwargs: dict,
+    rc: dict,
+) -> str | None:
+    """Fingerprint everything that determines the rendered output of a figure.
+
+    Norms, colormaps, tick formatters and locators and the like are
+    fingerprinted by class and state, functions (e.g. of a FuncFormatter) by
+    their code, closure and the globals they use.
+
+    Args:
+        figure: The matplotlib figure to fingerprint
+        args: Positional arguments passed to savefig
+        kwargs: Keyword arguments passed to savefig (format, dpi, ...)
+        rc: rcParams overriding the active ones while rendering
+
+    Returns:
+        The hexadecimal sha256 fingerprint, None if the figure holds an object
+        that can not be fingerprinted, in which case it should not be cached
+
+    """
+    digest = hashlib.sha256()
+    digest.update(matplotlib.__version__.encode())
+    digest.update(repr(args).encode())
+    digest.update(repr(sorted(kwargs.items())).encode())
+
+    params = {**matplotlib.rcParams, **rc}
+    with warnings.catch_warnings():
+        # some getters are (pending) deprecated in favour of other api's
+        warnings.simplefilter("ignore")
+        try:
+            for key in sorted(params):
+                if key != "backend":
+                    digest.update(key.encode())
+                    _update_digest(digest, params[key])
+            for artist in figure.findobj():
+                digest.update(type(artist).__name__.encode())
+                for name, value in _drawn_properties(artist):
+                    digest.update(name.encode())
+                    _update_digest(digest, value)
+        except _UnhashableError:
+            return None
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """A size-capped, least-recently-used cache of rendered figures on disk.
+
+    Rendered files are stored by figure fingerprint in ``directory``, next to
+    an ``index.json`` that keeps their size and last use. When the cached
+    files exceed ``max_bytes`` the least recently used ones are evicted. The
+    index is written on ``flush``, at most every ``flush_delay`` seconds while
+    storing renderings, and at exit.
+    """
+
+    index_name = "index.json"
+    flush_delay = 5.0
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024**2) -> None:
+        """Initialize the cache, reading an existing index from disk.
+
+        Args:
+            directory: Folder holding the cached files and the index
+            max_bytes: Maximum total size of the cached files
+
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        # evicted here, dropped from the index on disk when merging
+        self._evicted = set()
+        self._entries = self._read_index()
+        atexit.register(self.flush)
+
+    @property
+    def _index_path(self) -> str:
+        return posixpath.join(self.directory, self.index_name)
+
+    def _blob_path(self, fingerprint: str) -> str:
+        return posixpath.join(self.directory, fingerprint)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        # entries whose file disappeared cannot be served anymore
+        return {
+            key: entry
+            for key, entry in entries.items()
+            if os.path.isfile(self._blob_path(key))
+        }
+
+    @property
+    def size(self) -> int:
+        """Total size in bytes of the cached files."""
+        return sum(entry["size"] for entry in self._entries.values())
+
+    @property
+    def stats(self) -> dict:
+        """Hit, miss and eviction counts together with the cache size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+    def get(self, fingerprint: str) -> bytes | None:
+        """Return the cached rendering for a fingerprint, None on a miss."""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                try:
+                    with open(self._blob_path(fingerprint), "rb") as file:
+                        data = file.read()
+                except OSError:
+                    del self._entries[fingerprint]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            self._dirty = True
+            return data
+
+    def put(self, fingerprint: str, data: bytes) -> None:
+        """Store a rendering and evict least recently used ones if needed."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            write_if_changed(self._blob_path(fingerprint), data)
+            self._entries[fingerprint] = {"size": len(data), "last_used": time.time()}
+            self._evicted.discard(fingerprint)
+            self._evict()
+            self._dirty = True
+        if time.monotonic() - self._flushed_at >= self.flush_delay:
+            self.flush()
+
+    def put_file(self, fingerprint: str, path: str) -> None:
+        """Store the rendering saved at path."""
+        with open(path, "rb") as file:
+            self.put(fingerprint, file.read())
+
+    def _evict(self) -> None:
+        size = self.size
+        by_age = sorted(self._entries, key=lambda key: self._entries[key]["last_used"])
+        for key in by_age:
+            if size <= self.max_bytes:
+                break
+            size -= self._entries.pop(key)["size"]
+            self._evicted.add(key)
+            self.evictions += 1
+            try:
+                os.remove(self._blob_path(key))
+            except FileNotFoundError:
+                pass
+
+    def flush(self) -> None:
+        """Write the index to disk if it changed.
+
+        Entries that other processes added to the index meanwhile are merged
+        in, under a lock on the index file, leaving out the ones evicted here
+        or by them. The merged entries are then evicted down to max_bytes.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with lock_for(self._index_path):
+                entries = self._read_index()
+                for key, entry in self._entries.items():
+                    # another process may have evicted it meanwhile
+                    if key in entries or os.path.isfile(self._blob_path(key)):
+                        entries[key] = entry
+                self._entries = {
+                    key: entry
+                    for key, entry in entries.items()
+                    if key not in self._evicted
+                }
+                self._evict()
+                write_if_changed(
+                    self._index_path,
+                    json.dumps(self._entries, indent=1, sort_keys=True),
+                )
+            self._evicted.clear()
+            self._dirty = False
+            self._flushed_at = time.monotonic()
+
+    def clear(self) -> None:
+        """Remove every cached rendering."""
+        with self._lock:
+            for key in self._entries:
+                try:
+                    os.remove(self._blob_path(key))
+                except FileNotFoundError:
+                    pass
+            self._evicted.update(self._entries)
+            self._entries = {}
+            self._dirty = True
+        self.flush()
@@ -0,0 +1,277 @@
+"""Incremental compilation of a LaTeX document built from generated artifacts.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import posixpath
+import re
+import subprocess
+from typing import TYPE_CHECKING, NamedTuple
+
+from pylatex.errors import CompilerError
+
+from pythonlatex.manifest import Manifest
+from pythonlatex.saving import (
+    LocalStorage,
+    file_digest,
+    flush_inputs,
+    write_if_changed,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from pylatex import Document
+
+# messages in the log of LaTeX (and its packages) asking for another pass
+_RERUN_MESSAGES = ("Rerun to get", "Rerun LaTeX", "Please rerun LaTeX")
+# other files a LaTeX source pulls in, and its comments
+_INPUT_PATTERN = re.compile(r"\\(?:input|include|subfile)\s*\{([^}]+)\}")
+_COMMENT_PATTERN = re.compile(r"(?<!\\)%.*")
+
+
+def run_engine(command: list[str], folder: str = "") -> str:
+    """Run a TeX engine command in folder and return its output.
+
+    Raises:
+        CompilerError: When the engine cannot be found or fails
+
+    """
+    try:
+        process = subprocess.run(
+            command, cwd=folder or None, capture_output=True, check=False
+        )
+    except FileNotFoundError as error:
+        msg = f"LaTeX engine {command[0]!r} was not found"
+        raise CompilerError(msg) from error
+    output = process.stdout.decode("utf-8", errors="replace")
+    if process.returncode:
+        msg = (
+            f"{' '.join(command)} failed with exit code {process.returncode}:"
+            f"\n{output}"
+        )
+        raise CompilerError(msg)
+    return output
+
+
+class CompileResult(NamedTuple):
+    """Outcome of IncrementalCompiler.compile."""
+
+    compiled: bool
+    passes: int
+    changed: list[str]
+
+
+def _digest_or_none(path: str) -> str | None:
+    """Return the digest of the file at path, None if it does not exist.
+
+    Files written through the skip-unchanged write path are not read again
+    as long as their size and mtime match what was written.
+    """
+    try:
+        return file_digest(path)
+    except OSError:
+        return None
+
+
+class IncrementalCompiler:
+    """Compiles a document only when one of its dependencies changed.
+
+    The dependencies are the document itself, the .tex files it inputs or
+    includes (recursively, e.g. chapters), the files of the artifacts in the
+    folders path manifest any of those refer to (by the path of their outer
+    or inner file) and any extra files given. Their digests are kept in a state
+    file next to the document between runs. When compiling, the engine is
+    rerun until the .aux file stops changing and the log does not ask for a
+    rerun, up to max_passes.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        folders_path: str = "Latex/",
+        engine: Sequence[str] = ("pdflatex",),
+        engine_args: Sequence[str] = ("-interaction=nonstopmode", "-halt-on-error"),
+        max_passes: int = 3,
+        dependencies: Sequence[str] = (),
+    ) -> None:
+        """Initialize the compiler.
+
+        Args:
+            filepath: Path of the main document, without the .tex extension
+            folders_path: Folders path of the Figure, Table and Value
+                instances generating the artifacts
+            engine: Command of the TeX engine, e.g. ("lualatex",)
+            engine_args: Arguments passed to the engine before the document
+            max_passes: Maximum number of engine runs per compile
+            dependencies: Extra files the document depends on (e.g. a .bib)
+
+        """
+        self.filepath = filepath
+        self.folders_path = folders_path
+        self.engine = list(engine)
+        self.engine_args = list(engine_args)
+        self.max_passes = max_passes
+        self.dependencies = list(dependencies)
+
+    @property
+    def _tex_path(self) -> str:
+        return f"{self.filepath}.tex"
+
+    @property
+    def state_path(self) -> str:
+        """Path of the state file holding the digests of the last compile."""
+        return f"{self.filepath}.deps.json"
+
+    @property
+    def manifest(self) -> Manifest:
+        """The Manifest of the artifacts generated into the folders path."""
+        path = posixpath.join(self.folders_path, Manifest.filename)
+        return LocalStorage().manifest(path)
+
+    def _read_state(self) -> dict:
+        try:
+            with open(self.state_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _sources(self, artifact_files: set[str]) -> dict[str, str]:
+        """Return the text of the document and the .tex files it pulls in.
+
+        Comments are left out of the text.
+
+        Inputs are resolved against the folder of the document, the way the
+        engine run in that folder does, and followed recursively except into
+        the files of artifacts.
+
+        Args:
+            artifact_files: Normalized paths of the files of all artifacts
+
+        """
+        folder = os.path.dirname(self.filepath)
+        sources = {}
+        pending = [self._tex_path]
+        pending.extend(path for path in self.dependencies if path.endswith(".tex"))
+        while pending:
+            path = pending.pop(0)
+            if path in sources:
+                continue
+            try:
+                with open(path, encoding="utf-8") as file:
+                    text = file.read()
+            except FileNotFoundError:
+                if path == self._tex_path:
+                    raise
+                continue
+            sources[path] = text = _COMMENT_PATTERN.sub("", text)
+            for name in _INPUT_PATTERN.findall(text):
+                name = name.strip()
+                if not posixpath.splitext(name)[1]:
+                    name += ".tex"
+                path = posixpath.normpath(posixpath.join(folder, name))
+                if path not in artifact_files:
+                    pending.append(path)
+        return sources
+
+    def dependency_digests(self) -> dict[str, str | None]:
+        """Return the current digest of every dependency of the document."""
+        artifacts = self.manifest.artifacts()
+        artifact_files = {
+            posixpath.normpath(posixpath.join(self.folders_path, path))
+            for artifact in artifacts
+            for path in (artifact.outer_path, artifact.inner_path)
+            if path
+        }
+        sources = self._sources(artifact_files)
+        text = "".join(sources.values())
+
+        # the files on disk are digested rather than taking the digest of the
+        # manifest, which is not known yet for plots rendered in the background
+        digests = {path: _digest_or_none(path) for path in sources}
+        for artifact in artifacts:
+            files = (artifact.outer_path, artifact.inner_path)
+            paths = [path for path in files if path]
+            if any(posixpath.splitext(path)[0] in text for path in paths):
+                for path in paths:
+                    digests[path] = _digest_or_none(
+                        posixpath.join(self.folders_path, path)
+                    )
+        for path in self.dependencies:
+            digests[path] = _digest_or_none(path)
+        return digests
+
+    def changed(self) -> list[str]:
+        """Return the dependencies that changed since the last compile."""
+        previous = self._read_state()
+        if previous.get("engine") != self.engine:
+            previous = {}
+        digests = previous.get("digests", {})
+        current = self.dependency_digests()
+        changed = [key for key, digest in current.items() if digest != digests.get(key)]
+        # dependencies that are no longer there changed the document as well
+        changed.extend(key for key in digests if key not in current)
+        if not changed and not os.path.isfile(f"{self.filepath}.pdf"):
+            changed.append(f"{self.filepath}.pdf")
+        return changed
+
+    def _run_engine(self) -> str:
+        folder, name = os.path.split(self.filepath)
+        return run_engine([*self.engine, *self.engine_args, f"{name}.tex"], folder)
+
+    def _needs_rerun(self, aux_before: str | None, output: str) -> bool:
+        if _digest_or_none(f"{self.filepath}.aux") != aux_before:
+            return True
+        try:
+            log = f"{self.filepath}.log"
+            with open(log, encoding="utf-8", errors="replace") as file:
+                output += file.read()
+        except FileNotFoundError:
+            pass
+        return any(message in output for message in _RERUN_MESSAGES)
+
+    def compile(
+        self,
+        document: Document | None = None,
+        force: bool = False,
+    ) -> CompileResult:
+        """Compile the document if any of its dependencies changed.
+
+        Args:
+            document: Optional pylatex Document, written to filepath.tex
+                first (left untouched when its content did not change)
+            force: Compile even if nothing changed
+
+        Returns:
+            Whether the engine ran, how many passes it took and which
+            dependencies changed
+
+        Raises:
+            CompilerError: When the engine cannot be found or fails
+
+        """
+        # artifacts recorded in a buffered_inputs block are in the manifest
+        flush_inputs()
+        if document is not None:
+            write_if_changed(self._tex_path, document.dumps())
+
+        changed = self.changed()
+        if not changed and not force:
+            return CompileResult(False, 0, [])
+
+        passes = 0
+        while passes < self.max_passes:
+            aux_before = _digest_or_none(f"{self.filepath}.aux")
+            output = self._run_engine()
+            passes += 1
+            if not self._needs_rerun(aux_before, output):
+                break
+
+        state = {"engine": self.engine, "digests": self.dependency_digests()}
+        write_if_changed(self.state_path, json.dumps(state, indent=1, sort_keys=True))
+        return CompileResult(True, passes, changed)
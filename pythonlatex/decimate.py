@@ -0,0 +1,112 @@
+"""Shape-preserving decimation of the line series of matplotlib figures.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import matplotlib.figure
+    import matplotlib.lines
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Select n_out points of a series with largest-triangle-three-buckets.
+
+    The first and last point are kept, the others are split in n_out - 2
+    buckets of which the point forming the largest triangle with the
+    previously selected point and the average of the next bucket is kept.
+    Peaks and dips survive, unlike with taking every n-th point.
+
+    Args:
+        x: The x coordinates of the series
+        y: The y coordinates of the series
+        n_out: Number of points to keep
+
+    Returns:
+        The sorted indices of the kept points
+
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # bucket i holds the points edges[i]:edges[i + 1] (never empty as there
+    # are more points than buckets), the last point is a bucket of its own so
+    # the last bucket averages towards it
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    edges[-1] = n - 1
+    bounds = np.append(edges, n)
+    sums_x = np.add.reduceat(x, bounds[:-1])
+    sums_y = np.add.reduceat(y, bounds[:-1])
+    sizes = np.diff(bounds)
+    means_x, means_y = sums_x / sizes, sums_y / sizes
+
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        x_a, y_a = x[selected], y[selected]
+        x_c, y_c = means_x[bucket + 1], means_y[bucket + 1]
+        # twice the triangle area, the constant factor does not change argmax
+        areas = np.abs(
+            (x_a - x_c) * (y[start:stop] - y_a) - (x_a - x[start:stop]) * (y_c - y_a)
+        )
+        selected = start + int(areas.argmax())
+        indices[bucket + 1] = selected
+    return indices
+
+
+def _is_series(line: matplotlib.lines.Line2D) -> bool:
+    """Whether a line is drawn as a plain line, without markers."""
+    hidden = ("None", "", " ", None)
+    return line.get_linestyle() not in hidden and line.get_marker() in hidden
+
+
+def decimate_lines(
+    figure: matplotlib.figure.Figure,
+    dpi: float,
+    points_per_pixel: float = 2.0,
+) -> list[tuple[matplotlib.lines.Line2D, object, object]]:
+    """Downsample the lines of a figure to what its output can resolve.
+
+    Every line is reduced with lttb to points_per_pixel points per pixel of
+    the width of its axes at dpi. Lines with markers or with gaps (non-finite
+    values) are left alone, as are lines that are short enough already.
+
+    Args:
+        figure: The matplotlib figure
+        dpi: Resolution of the output
+        points_per_pixel: Number of points kept per horizontal pixel
+
+    Returns:
+        The (line, xdata, ydata) of every decimated line, with the original
+        data to put back with line.set_data after saving
+
+    """
+    from matplotlib.lines import Line2D
+
+    decimated = []
+    for line in figure.findobj(Line2D):
+        if line.axes is None or not _is_series(line):
+            continue
+        width = line.axes.bbox.width * dpi / figure.dpi
+        n_out = max(3, int(width * points_per_pixel))
+        if len(line.get_xydata()) <= n_out:
+            continue
+        # triangle areas in (the non-linear part of) display space, e.g. on
+        # log axes, the remaining affine part does not change which is largest
+        xy = line.get_transform().transform_non_affine(line.get_xydata())
+        if not np.isfinite(xy).all():
+            continue
+        x_data, y_data = line.get_xdata(orig=True), line.get_ydata(orig=True)
+        kept = lttb(xy[:, 0], xy[:, 1], n_out)
+        line.set_data(np.asarray(x_data)[kept], np.asarray(y_data)[kept])
+        decimated.append((line, x_data, y_data))
+    return decimated
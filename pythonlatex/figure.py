@@ -4,20 +4,397 @@
     :license: MIT, see License for more details.
 """
 
-from pathlib import Path
-from typing import ClassVar
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable, ClassVar, NamedTuple
 
-import matplotlib.pyplot as plt
 from pylatex import Command, NoEscape, Package, StandAloneGraphic
 from pylatex import Figure as FigureOriginal
 
 from pythonlatex.float import FloatAdditions
-from pythonlatex.saving import LatexSaving
+from pythonlatex.hooks import track
+from pythonlatex.saving import (
+    BatchArtifacts,
+    LatexSaving,
+    record_batch,
+    split_batch_options,
+    warn_batch_failures,
+    write_if_changed,
+)
+from pythonlatex.templates import latex_arguments, latex_item
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    import matplotlib.artist
+    import matplotlib.figure
+
+    from pythonlatex.cache import RenderCache
+    from pythonlatex.optimize import PngOptimizer
+    from pythonlatex.pretypeset import Pretypesetter
+    from pythonlatex.saving import LocalStorage, MemoryStorage
+
+# matplotlib.pyplot is only imported once a plot gets saved or shown, as it
+# dominates the import time of the package
+
+logger = logging.getLogger(__name__)
+
+
+# metadata entry holding the creation date, per vector output format
+_DATE_METADATA_KEYS = {
+    "pdf": "CreationDate",
+    "ps": "CreationDate",
+    "eps": "CreationDate",
+    "svg": "Date",
+}
+
+# formats savefig encodes from the pixels of the Agg canvas, by extension,
+# with the name Pillow knows the format by
+_RASTER_FORMATS = {
+    "png": "png",
+    "jpg": "jpeg",
+    "jpeg": "jpeg",
+    "tif": "tiff",
+    "tiff": "tiff",
+    "webp": "webp",
+}
+
+
+def _render(
+    figure: matplotlib.figure.Figure,
+    args: tuple,
+    kwargs: dict,
+    rc: dict,
+) -> bytes:
+    """Render a matplotlib figure in memory with the given savefig options."""
+    import matplotlib.pyplot as plt
+
+    buffer = BytesIO()
+    with plt.rc_context(rc):
+        figure.savefig(buffer, *args, **kwargs)
+    return buffer.getvalue()
+
+
+def _element_count(artist: matplotlib.artist.Artist) -> int:
+    """Return the number of points, markers or paths a line or collection draws."""
+    from matplotlib.collections import Collection, QuadMesh
+    from matplotlib.lines import Line2D
+
+    if isinstance(artist, Line2D):
+        return len(artist.get_xydata())
+    if isinstance(artist, QuadMesh):
+        rows, columns = artist.get_coordinates().shape[:2]
+        return (rows - 1) * (columns - 1)
+    if isinstance(artist, Collection):
+        vertices = sum(len(path.vertices) for path in artist.get_paths())
+        return max(len(artist.get_offsets()), vertices)
+    return 0
+
+
+def _rasterize_heavy_artists(
+    figure: matplotlib.figure.Figure,
+    threshold: int,
+) -> list[tuple[matplotlib.artist.Artist, int]]:
+    """Mark the lines and collections drawing more than threshold elements.
+
+    Only those artists get rasterized in vector outputs, axes and text stay
+    vector. Artists that were rasterized already are left alone.
+
+    Returns:
+        The (artist, element count) of every artist that got marked
+
+    """
+    from matplotlib.collections import Collection
+    from matplotlib.lines import Line2D
+
+    marked = []
+    for artist in figure.findobj(lambda item: isinstance(item, Line2D | Collection)):
+        if not artist.get_rasterized():
+            count = _element_count(artist)
+            if count > threshold:
+                artist.set_rasterized(True)
+                marked.append((artist, count))
+    return marked
+
+
+def _resolve_dpi(figure: matplotlib.figure.Figure, dpi: float | None) -> float:
+    """Return the dpi savefig uses for the given dpi argument."""
+    import matplotlib.pyplot as plt
+
+    if dpi is None:
+        dpi = plt.rcParams["savefig.dpi"]
+    return figure.dpi if dpi == "figure" else dpi
+
+
+def _render_variants(
+    figure: matplotlib.figure.Figure,
+    variants: list[tuple[str, float | None]],
+    args: tuple,
+    kwargs: dict,
+    rc: dict,
+) -> list[bytes]:
+    """Render a figure to several (format, dpi) variants, drawing it once.
+
+    All raster variants are encoded from a single Agg drawing at the highest
+    dpi, the same way savefig encodes them, lower dpis are resampled from it.
+    Every vector format needs a drawing by its own backend.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.image import imsave
+    from PIL import Image
+
+    rendered = {}
+    raster = [variant for variant in variants if variant[0] in _RASTER_FORMATS]
+    if raster:
+        with plt.rc_context(rc):
+            resolved = {dpi: _resolve_dpi(figure, dpi) for _, dpi in raster}
+        top = max(resolved.values())
+        png = _render(figure, args, {**kwargs, "format": "png", "dpi": top}, rc)
+        image = Image.open(BytesIO(png))
+        image.load()
+        for extension, dpi in raster:
+            if extension == "png" and resolved[dpi] == top:
+                rendered[extension, dpi] = png
+                continue
+            scaled = image
+            if resolved[dpi] != top:
+                size = [round(side * resolved[dpi] / top) for side in image.size]
+                scaled = image.resize(size, Image.Resampling.LANCZOS)
+            # savefig blends transparency against white for formats without it
+            white = extension in ("jpg", "jpeg")
+            buffer = BytesIO()
+            with plt.rc_context({**rc, "savefig.facecolor": "white"} if white else rc):
+                imsave(
+                    buffer,
+                    np.asarray(scaled),
+                    format=_RASTER_FORMATS[extension],
+                    dpi=resolved[dpi],
+                    pil_kwargs=kwargs.get("pil_kwargs"),
+                )
+            rendered[extension, dpi] = buffer.getvalue()
+
+    for extension, dpi in variants:
+        if (extension, dpi) not in rendered:
+            options = {**kwargs, "format": extension}
+            if dpi is not None:
+                options["dpi"] = dpi
+            if extension in _DATE_METADATA_KEYS:
+                options.setdefault("metadata", {_DATE_METADATA_KEYS[extension]: None})
+            rendered[extension, dpi] = _render(figure, args, options, rc)
+    return [rendered[variant] for variant in variants]
+
+
+def _render_in_worker(
+    pickled_figure: bytes,
+    path: str | list[str],
+    args: tuple,
+    kwargs: dict,
+    rc: dict,
+    variants: list[tuple[str, float | None]] | None = None,
+    png_options: dict | None = None,
+) -> tuple[bool, int]:
+    """Unpickle and render a figure inside a worker process and save it.
+
+    With variants, path is the list of paths to save the variants to. With
+    png_options, PNG files are optimized with them (see optimize_png).
+    """
+    import matplotlib.pyplot as plt
+
+    figure = pickle.loads(pickled_figure)  # noqa: S301
+    try:
+        if variants is None:
+            data = [_render(figure, args, kwargs, rc)]
+        else:
+            data = _render_variants(figure, variants, args, kwargs, rc)
+    finally:
+        plt.close(figure)
+    paths = [path] if variants is None else path
+    if png_options is not None:
+        from pythonlatex.optimize import optimize_png
+
+        data = [
+            optimize_png(output, **png_options) if path.endswith(".png") else output
+            for path, output in zip(paths, data)
+        ]
+    written = [write_if_changed(*output) for output in zip(paths, data)]
+    return any(written), sum(len(output) for output in data)
+
+
+def _log_rasterized(
+    rasterized: list[tuple[matplotlib.artist.Artist, int]],
+    paths: list[str],
+    dpi: float | None,
+    storage: LocalStorage | MemoryStorage,
+) -> None:
+    artists = ", ".join(
+        f"{type(artist).__name__} ({count} elements)" for artist, count in rasterized
+    )
+    for path in paths:
+        try:
+            size = f"{storage.size(path)} bytes"
+        except OSError:
+            size = "not saved"
+        logger.info("Rasterized %s at %s dpi in %s: %s", artists, dpi, path, size)
+
+
+def _gather_writes(futures: list[Future]) -> Future:
+    """Return a future of (any written, total size) of several file writes."""
+    gathered = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def collect(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            gathered.set_exception(errors[0])
+            return
+        results = [future.result() for future in futures]
+        written = any(written for written, _ in results)
+        gathered.set_result((written, sum(size for _, size in results)))
+
+    for future in futures:
+        future.add_done_callback(collect)
+    return gathered
+
+
+class RenderJob(str):
+    """The relative path of a plot that is being rendered in the background.
+
+    Behaves as the path string returned by ``Figure.save_plot`` and gives
+    access to the underlying future of the render.
+    """
+
+    __slots__ = ("future",)
+
+    def __new__(cls, path: str, future: Future) -> RenderJob:
+        """Create the path string and attach the render future to it."""
+        job = super().__new__(cls, path)
+        job.future = future
+        return job
+
+    def done(self) -> bool:
+        """Return True if the render finished (successfully or not)."""
+        return self.future.done()
+
+    def result(self, timeout: float | None = None) -> tuple[bool, int]:
+        """Wait for the render and return (written, size), re-raising errors."""
+        return self.future.result(timeout)
+
+
+class BackgroundRenderer:
+    """Renders matplotlib figures in a pool of worker processes.
+
+    The current figure gets pickled when submitted, so it can be changed or
+    closed right away. ``wait_all`` (also called when leaving the renderer as
+    a context manager) blocks until every submitted render finished and
+    raises if any of them failed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        mp_context: object = None,
+    ) -> None:
+        """Initialize the renderer.
+
+        Args:
+            max_workers: Number of worker processes, defaults to the cpu count
+            mp_context: Optional multiprocessing context for the worker pool
+
+        """
+        self._max_workers = max_workers
+        self._mp_context = mp_context
+        self._executor = None
+        self._pending = []
+
+    def submit(
+        self,
+        figure: matplotlib.figure.Figure,
+        path: str | list[str],
+        args: tuple,
+        kwargs: dict,
+        rc: dict,
+        variants: list[tuple[str, float | None]] | None = None,
+        png_options: dict | None = None,
+    ) -> Future:
+        """Submit a figure to be rendered to path in a worker process.
+
+        With variants (format, dpi), path is the list of their paths. With
+        png_options, PNG files are optimized in the worker as well.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers, mp_context=self._mp_context
+            )
+        # rcParams do not travel with a pickled figure, pass them explicitly
+        rc = {**_rc_snapshot(), **rc}
+        future = self._executor.submit(
+            _render_in_worker,
+            pickle.dumps(figure),
+            path,
+            args,
+            kwargs,
+            rc,
+            variants,
+            png_options,
+        )
+        self._pending.append(future)
+        return future
+
+    def wait_all(self) -> None:
+        """Wait for all submitted renders and raise if any of them failed."""
+        pending, self._pending = self._pending, []
+        wait(pending)
+        errors = [future.exception() for future in pending if future.exception()]
+        if errors:
+            msg = f"{len(errors)} of {len(pending)} background renders failed: {errors}"
+            raise RuntimeError(msg) from errors[0]
+
+    def shutdown(self) -> None:
+        """Wait for all renders and stop the worker processes."""
+        try:
+            self.wait_all()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> BackgroundRenderer:
+        """Use the renderer as a barrier around a block of plotting code."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Wait for (and check) all renders submitted within the block."""
+        self.shutdown()
+
+
+def _rc_snapshot() -> dict:
+    import matplotlib.pyplot as plt
+
+    return {key: value for key, value in plt.rcParams.items() if key != "backend"}
 
 
 class Figure(FloatAdditions, LatexSaving, FigureOriginal):
     """A class representing a Figure with modified methods compared to parent."""
 
+    _artifact_kind = "figure"
+
     def __init__(
         self,
         *args: tuple,
@@ -25,6 +402,16 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
         outer_folder_name: str = "Figures",
         inner_folder_name: str = "Graphics",
         position: str | None = None,
+        renderer: BackgroundRenderer | None = None,
+        render_cache: RenderCache | None = None,
+        png_optimizer: PngOptimizer | None = None,
+        rasterize_threshold: int | None = 100_000,
+        rasterize_dpi: float = 300,
+        decimate: bool = False,
+        points_per_pixel: float = 2.0,
+        pretypesetter: Pretypesetter | None = None,
+        render_mode: str | None = None,
+        storage: LocalStorage | MemoryStorage | None = None,
         **kwargs: tuple,
     ) -> None:
         """Initialize a Figure instance with custom folder paths and position.
@@ -34,6 +421,29 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             outer_folder_name: Name of the outer folder for figure files
             inner_folder_name: Name of the inner folder for graphics
             position: Optional position argument for the figure
+            renderer: Optional BackgroundRenderer, plots are then rendered
+                asynchronously in its worker processes
+            render_cache: Optional RenderCache, plots identical to an earlier
+                rendering are then taken from the cache instead of re-rendered
+            png_optimizer: Optional PngOptimizer, PNG files are then optimized
+                in its threads (or in the worker of a background renderer)
+            rasterize_threshold: Lines and collections drawing more points,
+                markers or paths are rasterized in vector outputs, None keeps
+                everything vector
+            rasterize_dpi: Resolution of the rasterized artists, unless a dpi
+                is passed to savefig
+            decimate: Downsample long lines to what the output resolves before
+                saving, see pythonlatex.decimate.decimate_lines
+            points_per_pixel: Number of points of a decimated line kept per
+                pixel of the width of its axes
+            pretypesetter: Optional Pretypesetter, plots saved as pgf are then
+                compiled to a standalone PDF which the figure includes, see
+                pythonlatex.pretypeset (with the same folders_path)
+            render_mode: "tree" or "template", see FloatAdditions, defaults to
+                pythonlatex.templates.default_render_mode
+            storage: Storage the files are saved to, defaults to
+                pythonlatex.saving.default_storage. Plots are rendered in
+                process when it does not keep them on the local filesystem.
             *args: Additional positional arguments passed to parent class
             **kwargs: Additional keyword arguments passed to parent class
 
@@ -43,16 +453,26 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             outer_folder=outer_folder_name,
             inner_folder=inner_folder_name,
             folders_path=folders_path,
+            storage=storage,
         )
         FigureOriginal.__init__(self, *args, position=position, **kwargs)
 
         self._label = "fig"
+        self.renderer = renderer
+        self.render_cache = render_cache
+        self.png_optimizer = png_optimizer
+        self.rasterize_threshold = rasterize_threshold
+        self.rasterize_dpi = rasterize_dpi
+        self.decimate = decimate
+        self.points_per_pixel = points_per_pixel
+        self.pretypesetter = pretypesetter
+        self.render_mode = render_mode
 
     def save_plot(
         self,
         filename: str,
         *args: tuple,
-        extension: str = "png",
+        extension: str | Sequence[str] = "png",
         **kwargs: tuple,
     ) -> str:
         """Save the plot in the 'inner' folder.
@@ -63,13 +483,17 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             Name of the plot for saving
         args:
             Arguments passed to plt.savefig for displaying the plot.
-        extension : str
-            extension of image file indicating figure file type
+        extension : str, list
+            extension of image file indicating figure file type, or several
+            of them (e.g. ["pdf", "png"]), the first being the primary one
         kwargs:
             Keyword arguments passed to plt.savefig for displaying the plot. In
             case these contain ``width`` or ``placement``, they will be used
             for the same purpose as in the add_image command. Namely the width
             and placement of the generated plot in the LaTeX document.
+            ``dpi`` can be a list as well, raster formats are then saved at
+            every dpi, the first one as {filename}.{extension} and the others
+            as {filename}_{dpi}dpi.{extension}.
 
         Returns:
         -------
@@ -77,12 +501,236 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             The relative path/name with which the plot has been saved.
             (original package stored figure in temp directory, here the naming is added
             and it is being saved in a known directory)
+            With a background renderer this is a RenderJob, which also gives
+            access to the pending render.
+
+        The plot is rendered in memory first, so the image file on disk is only
+        rewritten when the rendered bytes differ from what is already there.
+        With several extensions or dpis the figure is drawn once for all
+        raster outputs (and once per vector format).
+
+        In vector formats, lines and collections drawing more elements than
+        rasterize_threshold are rasterized at rasterize_dpi, which keeps the
+        files of e.g. scatter plots with millions of points small. The
+        rasterized artists and resulting file sizes are logged. With decimate,
+        long lines are downsampled first and restored after saving.
 
         """
+        import matplotlib.pyplot as plt
+
+        figure = plt.gcf()
+        decimated = []
+        if self.decimate:
+            from pythonlatex.decimate import decimate_lines
+
+            dpi = kwargs.get("dpi")
+            dpis = dpi if isinstance(dpi, list | tuple) else [dpi]
+            dpi = max(_resolve_dpi(figure, item) for item in dpis)
+            decimated = decimate_lines(figure, dpi, self.points_per_pixel)
+
+        extensions = [extension] if isinstance(extension, str) else list(extension)
+        vector = [item for item in extensions if item not in _RASTER_FORMATS]
+        rasterized = []
+        if vector and self.rasterize_threshold is not None:
+            rasterized = _rasterize_heavy_artists(figure, self.rasterize_threshold)
+
+        vector_dpi = self.rasterize_dpi if rasterized else None
+        dpi = kwargs.get("dpi")
+        try:
+            if len(extensions) > 1 or isinstance(dpi, list | tuple):
+                path = self._save_variants(
+                    filename, args, extensions, kwargs, vector_dpi
+                )
+            else:
+                if vector_dpi is not None:
+                    kwargs.setdefault("dpi", vector_dpi)
+                path = self._save_single(filename, args, extensions[0], kwargs)
+        finally:
+            for artist, _ in rasterized:
+                artist.set_rasterized(False)
+            for line, x_data, y_data in decimated:
+                line.set_data(x_data, y_data)
+
+        if rasterized:
+            paths = [self._absolute_inner_path(f"{filename}.{item}") for item in vector]
+            # vector formats are saved at the first dpi given, if any
+            if isinstance(dpi, list | tuple):
+                dpi = dpi[0]
+            if dpi is None:
+                dpi = vector_dpi
+            log = partial(_log_rasterized, rasterized, paths, dpi, self._storage)
+            if isinstance(path, RenderJob):
+                path.future.add_done_callback(lambda _: log())
+            else:
+                log()
+        return path
+
+    def _save_single(
+        self,
+        filename: str,
+        args: tuple,
+        extension: str,
+        kwargs: dict,
+    ) -> str:
+        """Save the plot in a single format, see save_plot."""
+        import matplotlib.pyplot as plt
+
         name = f"{filename}.{extension}"
-        plt.savefig(*args, fname=self._absolute_inner_path(name), **kwargs)
+        kwargs.setdefault("format", extension)
+        # leave out timestamps (and random svg ids) so an unchanged plot
+        # renders to the same bytes on every run
+        if extension in _DATE_METADATA_KEYS:
+            kwargs.setdefault("metadata", {_DATE_METADATA_KEYS[extension]: None})
+        rc = {} if plt.rcParams["svg.hashsalt"] else {"svg.hashsalt": "pythonlatex"}
+        path = self._prepare_path(self._absolute_inner_path(name))
+        figure = plt.gcf()
+
+        fingerprint = None
+        if self.render_cache is not None:
+            from pythonlatex.cache import figure_fingerprint
+
+            # None for figures that can not be fingerprinted, never cached
+            fingerprint = figure_fingerprint(figure, args, kwargs, rc)
+        if fingerprint is not None:
+            data = self.render_cache.get(fingerprint)
+            if data is not None:
+                future = self._save_render(path, data)
+                if not self._renders_in_background:
+                    return self._relative_inner_path(name)
+                # keep returning a RenderJob when rendering in the background
+                return RenderJob(self._relative_inner_path(name), future)
+
+        if self._renders_in_background:
+            future = self.renderer.submit(
+                figure, path, args, kwargs, rc, png_options=self._png_options
+            )
+            future.add_done_callback(self._count_background_write)
+            # content still unknown while rendering
+            self._artifact_files.append((path, None, 0))
+            if fingerprint is not None:
+                future.add_done_callback(partial(self._cache_render, fingerprint, path))
+            return RenderJob(self._relative_inner_path(name), future)
+
+        with track(self._artifact_kind, filename, "render"):
+            data = _render(figure, args, kwargs, rc)
+        self._save_render(path, data)
+        if fingerprint is not None:
+            self.render_cache.put(fingerprint, data)
         return self._relative_inner_path(name)
 
+    def _save_variants(
+        self,
+        filename: str,
+        args: tuple,
+        extensions: list[str],
+        kwargs: dict,
+        vector_dpi: float | None = None,
+    ) -> str:
+        """Save the plot in several formats and dpis, see save_plot.
+
+        vector_dpi is used for vector formats when no dpi is given.
+        """
+        import matplotlib.pyplot as plt
+
+        dpis = kwargs.pop("dpi", None)
+        dpis = list(dpis) if isinstance(dpis, list | tuple) else [dpis]
+        kwargs.pop("format", None)
+
+        # the dpi of vector formats only matters for their rasterized artists
+        variants, names = [], []
+        for extension in extensions:
+            for position, dpi in enumerate(dpis):
+                if extension not in _RASTER_FORMATS:
+                    if position:
+                        break
+                    if dpi is None:
+                        dpi = vector_dpi
+                variants.append((extension, dpi))
+                suffix = f"_{dpi}dpi" if position else ""
+                names.append(f"{filename}{suffix}.{extension}")
+        paths = [self._prepare_path(self._absolute_inner_path(n)) for n in names]
+        primary = self._relative_inner_path(names[0])
+        rc = {} if plt.rcParams["svg.hashsalt"] else {"svg.hashsalt": "pythonlatex"}
+        figure = plt.gcf()
+
+        keys = fingerprint = None
+        if self.render_cache is not None:
+            from pythonlatex.cache import figure_fingerprint
+
+            fingerprint = figure_fingerprint(
+                figure, args, {**kwargs, "variants": variants}, rc
+            )
+        if fingerprint is not None:
+            keys = [f"{fingerprint}-{position}" for position in range(len(paths))]
+            cached = [self.render_cache.get(key) for key in keys]
+            if all(data is not None for data in cached):
+                futures = [
+                    self._save_render(path, data) for path, data in zip(paths, cached)
+                ]
+                if not self._renders_in_background:
+                    return primary
+                return RenderJob(primary, _gather_writes(futures))
+
+        if self._renders_in_background:
+            future = self.renderer.submit(
+                figure, paths, args, kwargs, rc, variants, self._png_options
+            )
+            future.add_done_callback(self._count_background_write)
+            self._artifact_files.extend((path, None, 0) for path in paths)
+            if keys is not None:
+                for key, path in zip(keys, paths):
+                    future.add_done_callback(partial(self._cache_render, key, path))
+            return RenderJob(primary, future)
+
+        with track(self._artifact_kind, filename, "render"):
+            rendered = _render_variants(figure, variants, args, kwargs, rc)
+        for position, (path, data) in enumerate(zip(paths, rendered)):
+            self._save_render(path, data)
+            if keys is not None:
+                self.render_cache.put(keys[position], data)
+        return primary
+
+    @property
+    def _renders_in_background(self) -> bool:
+        # the worker processes write the files to the local filesystem
+        return self.renderer is not None and self._storage.local
+
+    @property
+    def _png_options(self) -> dict | None:
+        return None if self.png_optimizer is None else self.png_optimizer.options
+
+    def _save_render(self, path: str, data: bytes) -> Future:
+        """Save a rendered plot, PNG files through the optimizer if any.
+
+        Returns:
+            A future of (written, size) of the file, done already unless the
+            PNG is being optimized in the background
+
+        """
+        future = Future()
+        if self.png_optimizer is None or not path.endswith(".png"):
+            future.set_result((self._save_file(path, data), len(data)))
+            return future
+        if not self._storage.local:
+            from pythonlatex.optimize import optimize_png
+
+            data = optimize_png(data, **self.png_optimizer.options)
+            future.set_result((self._save_file(path, data), len(data)))
+            return future
+        future = self.png_optimizer.submit(path, data)
+        future.add_done_callback(self._count_background_write)
+        # content still unknown while optimizing
+        self._artifact_files.append((path, None, 0))
+        return future
+
+    def _count_background_write(self, future: Future) -> None:
+        if future.exception() is None:
+            self._count_write(*future.result())
+
+    def _cache_render(self, fingerprint: str, path: str, future: Future) -> None:
+        if future.exception() is None:
+            self.render_cache.put_file(fingerprint, path)
+
     def add_plot(
         self,
         filename: str,
@@ -96,9 +744,9 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
         resizebox_arguments: tuple | None = None,
         width: str | None = None,
         placement: str | None = None,
-        extension: str = "png",
+        extension: str | Sequence[str] = "png",
         **kwargs: tuple,
-    ) -> None:
+    ) -> RenderJob | None:
         """Add the current Matplotlib plot to the figure.
 
         The plot that gets added is the one that would normally be shown when
@@ -118,8 +766,15 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
         resizebox_arguments: Arguments for the resizebox command.
         width: Width of the figure in LaTeX terms.
         placement: Placement command for the figure.
-        extension: Extension of image file indicating figure file type.
-        kwargs: Keyword arguments passed to plt.savefig for displaying the plot.
+        extension: Extension of image file indicating figure file type, or a
+            list of them, the graphic then shows the first one.
+        kwargs: Keyword arguments passed to plt.savefig for displaying the plot,
+            dpi can be a list of dpis to save raster formats at.
+
+        Returns:
+        -------
+        RenderJob | None
+            The pending render in case of a background renderer.
 
         """
         # Set default values for NoEscape parameters
@@ -134,29 +789,61 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
 
         path = self.save_plot(filename, *args, extension=extension, **kwargs)
 
-        if placement is not None:
-            self.append(placement)
-
         if width is not None:
             width = "width=" + str(width)
 
-        graphic = StandAloneGraphic(image_options=width, filename=path)
+        graphic_path = path
+        if self.pretypesetter is not None and path.endswith(".pgf"):
+            # the digest of the standalone document covers the pgf file
+            if isinstance(path, RenderJob):
+                path.result()
+            graphic_path = self.pretypesetter.submit(
+                path[: -len(".pgf")].replace("/", "-"), f"\\input{{{path}}}", [path]
+            )
 
-        if resizebox:
-            figure_input = Command(
-                command="resizebox",
-                arguments=resizebox_arguments,
-                extra_arguments=graphic,
-                packages=[Package("graphics")],
+        lines = self._template_lines()
+        if lines is not None:
+            if placement is not None:
+                lines.append(latex_item(placement))
+            lines.append(
+                self._graphic_line(graphic_path, width, resizebox, resizebox_arguments)
             )
         else:
-            figure_input = graphic
-
-        self.append(figure_input)
+            if placement is not None:
+                self.append(placement)
+            graphic = StandAloneGraphic(image_options=width, filename=graphic_path)
+            if resizebox:
+                figure_input = Command(
+                    command="resizebox",
+                    arguments=resizebox_arguments,
+                    extra_arguments=graphic,
+                    packages=[Package("graphics")],
+                )
+            else:
+                figure_input = graphic
+            self.append(figure_input)
 
         if caption is not None:
             self.add_caption_description_label(caption, label, above, description, zref)
 
+        return path if isinstance(path, RenderJob) else None
+
+    def _graphic_line(
+        self,
+        path: str,
+        width: str | None,
+        resizebox: bool,
+        resizebox_arguments: tuple,
+    ) -> str:
+        """Return the LaTeX of the graphic of add_plot, in the template render mode."""
+        options = "" if width is None else f"[{width}]"
+        line = f"\\includegraphics{options}{{{path}}}"
+        # only the package of the outer command counts, as in the tree
+        if resizebox:
+            line = f"\\resizebox{latex_arguments(resizebox_arguments)}{{{line}}}"
+        self._add_line_package(Package("graphics" if resizebox else "graphicx"))
+        return line
+
     def reset(
         self,
         show: bool = True,
@@ -182,6 +869,8 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             Keyword arguments passed to plt.show or plt.close.
 
         """
+        import matplotlib.pyplot as plt
+
         if show:
             plt.show(*args, **kwargs)
 
@@ -189,6 +878,7 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             plt.close()
 
         self.data = []
+        self._lines = None
 
     def create_input_latex(
         self,
@@ -206,7 +896,7 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
         width: str | None = None,
         placement: str | None = None,
         **kwargs: tuple,
-    ) -> None:
+    ) -> RenderJob | None:
         """Create separate input tex-file that can be used to input Figure.
 
         Args:
@@ -227,6 +917,12 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
         placement: Placement command for the figure.
         kwargs: Keyword arguments passed to plt.savefig for displaying the plot.
 
+        Returns:
+        -------
+        RenderJob | None
+            The pending render in case of a background renderer, the outer
+            .tex file is written right away as the image path is known.
+
         """
         # Set default values for NoEscape parameters
         if resizebox_arguments is None:
@@ -238,8 +934,10 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
 
         label, caption = self._check_label_caption(label, caption, filename)
 
+        render_job = None
         if add_plot:
-            self.add_plot(
+            self._begin_artifact()
+            render_job = self.add_plot(
                 filename,
                 *args,
                 caption=caption,
@@ -257,15 +955,18 @@ class Figure(FloatAdditions, LatexSaving, FigureOriginal):
             self.add_caption_description_label(caption, label, above, description, zref)
 
         # creating + opening the final input file in the 'outer' folder
-        with Path(f"{self._absolute_outer_path(filename)}.tex").open("w+") as tex_file:
-            tex_file.write(self.dumps())
+        with track(self._artifact_kind, filename, "dumps"):
+            latex = self.dumps()
+        self._save_file(f"{self._absolute_outer_path(filename)}.tex", latex)
 
         latex_input = self._input_lines(filename)
-        self._write_input_to_txt_file(latex_input)
+        self._record_input(filename, latex_input)
 
         if printing_input:
             print(latex_input)
 
+        return render_job
+
     def _check_label_caption(
         self,
         label: str | None,
@@ -333,3 +1034,263 @@ class SubFigure(Figure):
         if width is None:
             width = NoEscape(r"\linewidth")
         super().add_image(filename, width=width, placement=placement)
+
+
+class PlotResult(NamedTuple):
+    """The outcome of one plot of a FigureBatch.
+
+    ``plot_time`` is spent in the plot callable, ``save_time`` in rendering
+    and writing the files. ``error`` holds the formatted traceback if the
+    plot failed, in which case ``latex_input`` is None.
+    """
+
+    filename: str
+    latex_input: str | None
+    plot_time: float
+    save_time: float
+    error: str | None
+
+    @property
+    def total_time(self) -> float:
+        """Time spent on the plot as a whole."""
+        return self.plot_time + self.save_time
+
+
+class _BatchFigure(BatchArtifacts, Figure):
+    """A Figure keeping its artifacts, for the batch to record them in order."""
+
+
+@contextmanager
+def _time_limit(seconds: float | None) -> Iterator[None]:
+    """Raise TimeoutError in the block once it runs longer than seconds.
+
+    Relies on SIGALRM, so the limit only applies on Unix in the main thread.
+    """
+    if (
+        not seconds
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def expire(*_: object) -> None:
+        msg = f"plot did not finish within {seconds} seconds"
+        raise TimeoutError(msg)
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _run_plot(
+    function: Callable,
+    args: tuple,
+    kwargs: dict,
+    filename: str,
+    options: dict,
+    timeout: float | None,
+    in_worker: bool,
+) -> tuple[str | None, list, float, float, str | None]:
+    """Run a plot callable and save the figure it drew with its options.
+
+    Returns:
+        The latex input, the artifacts to record, the plot and save times and
+        the formatted traceback if the plot failed
+
+    """
+    import matplotlib.pyplot as plt
+
+    if in_worker:
+        plt.switch_backend("Agg")
+    existing = set(plt.get_fignums())
+    figure_options, input_options = split_batch_options(options)
+    plot_time = save_time = 0.0
+    try:
+        with _time_limit(timeout):
+            start = time.perf_counter()
+            drawn = function(*args, **kwargs)
+            if isinstance(drawn, plt.Figure):
+                plt.figure(drawn)
+            plot_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            figure = _BatchFigure(**figure_options)
+            figure.create_input_latex(filename, printing_input=False, **input_options)
+            save_time = time.perf_counter() - start
+    except Exception:  # noqa: BLE001
+        return None, [], plot_time, save_time, traceback.format_exc()
+    finally:
+        for number in set(plt.get_fignums()) - existing:
+            plt.close(number)
+    latex_input = figure.artifacts[-1].latex_input
+    return latex_input, figure.artifacts, plot_time, save_time, None
+
+
+def _available_memory() -> int | None:
+    """Return the memory available for new processes in bytes, if known."""
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class FigureBatch:
+    """Runs plot-producing callables on a pool of worker processes.
+
+    Every registered callable draws its own figure (returning it, or leaving
+    it as the current pyplot figure), which then gets saved as with
+    ``Figure.create_input_latex``. The image and outer .tex files are
+    written by the workers, the inputs are recorded in the manifest and
+    latest_inputs.txt afterwards in the order of registration. Callables and
+    their arguments are pickled, so they have to be importable (module level)
+    functions.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        timeout: float | None = None,
+        min_available_memory: int | None = 512 * 1024**2,
+        mp_context: object = None,
+        **defaults: dict,
+    ) -> None:
+        """Initialize the batch.
+
+        Args:
+            max_workers: Number of worker processes, defaults to the cpu
+                count, 1 runs the plots in this process
+            timeout: Seconds a single plot (drawing and saving) may take
+                before it is aborted with a TimeoutError, Unix only
+            min_available_memory: No further plots are started while less
+                memory (in bytes) is available and other plots are running,
+                None disables the throttling
+            mp_context: Optional multiprocessing context for the worker pool
+            **defaults: Options for every plot, overridden by the options of
+                a plot. folders_path, outer_folder_name, inner_folder_name
+                and position go to the Figure, the others to
+                create_input_latex
+
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.min_available_memory = min_available_memory
+        self.mp_context = mp_context
+        self.defaults = defaults
+        self.results = []
+        self._plots = []
+
+    def register(
+        self,
+        function: Callable,
+        filename: str,
+        args: tuple = (),
+        kwargs: dict | None = None,
+        **options: dict,
+    ) -> None:
+        """Register a plot to be run by the batch.
+
+        Args:
+            function: Callable drawing the figure
+            filename: Name of the figure for saving
+            args: Positional arguments for the callable
+            kwargs: Keyword arguments for the callable
+            **options: Options for the figure, e.g. caption, label,
+                extension or savefig keyword arguments
+
+        """
+        options = {**self.defaults, **options}
+        self._plots.append((function, args, kwargs or {}, filename, options))
+
+    def _memory_low(self) -> bool:
+        if self.min_available_memory is None:
+            return False
+        available = _available_memory()
+        return available is not None and available < self.min_available_memory
+
+    def _run_in_pool(self, plots: list) -> list:
+        workers = self.max_workers or os.cpu_count() or 1
+        outcomes = [None] * len(plots)
+        with ProcessPoolExecutor(workers, mp_context=self.mp_context) as executor:
+            running = {}
+
+            def collect(futures: set) -> None:
+                for future in futures:
+                    position = running.pop(future)
+                    try:
+                        outcomes[position] = future.result()
+                    except Exception as error:  # noqa: BLE001
+                        # e.g. an unpicklable callable or a killed worker
+                        message = "".join(traceback.format_exception(error))
+                        outcomes[position] = (None, [], 0.0, 0.0, message)
+
+            for position, plot in enumerate(plots):
+                # wait for a slot, or for memory while other plots are running
+                while running and (len(running) >= workers or self._memory_low()):
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(_run_plot, *plot, self.timeout, True)
+                running[future] = position
+            collect(wait(running).done)
+        return outcomes
+
+    def run(self, printing_input: bool = False) -> list[PlotResult]:
+        """Run the registered plots, saving their figures.
+
+        A failing plot does not abort the others, failures are reported in a
+        warning and in the returned results.
+
+        Args:
+            printing_input: Print the latex input of every figure, in the
+                order of registration
+
+        Returns:
+            A PlotResult per plot, in the order of registration
+
+        """
+        plots, self._plots = self._plots, []
+        if self.max_workers == 1:
+            outcomes = [_run_plot(*plot, self.timeout, False) for plot in plots]
+        else:
+            outcomes = self._run_in_pool(plots)
+
+        results, recorded = [], []
+        for plot, outcome in zip(plots, outcomes):
+            latex_input, artifacts, plot_time, save_time, error = outcome
+            results.append(
+                PlotResult(plot[3], latex_input, plot_time, save_time, error)
+            )
+            recorded.append((plot[4], latex_input, artifacts))
+        record_batch(Figure, recorded, printing_input)
+
+        self.results = results
+        warn_batch_failures(
+            [(result.filename, result.error) for result in results if result.error],
+            len(results),
+            "plots failed",
+        )
+        return results
+
+    def timings(self, slowest: int | None = None) -> str:
+        """Report the time spent per figure of the last run, slowest first.
+
+        Args:
+            slowest: Only report this many of the slowest figures
+
+        """
+        results = sorted(self.results, key=lambda result: -result.total_time)
+        lines = [f"{'figure':30} {'plot':>8} {'save':>8} {'total':>8}"]
+        lines.extend(
+            f"{result.filename:30} {result.plot_time:8.3f} {result.save_time:8.3f} "
+            f"{result.total_time:8.3f}{'  failed' if result.error else ''}"
+            for result in results[:slowest]
+        )
+        return "\n".join(lines)
@@ -1,13 +1,100 @@
 """
 """
 from pylatex import Command, NoEscape, Package
-from pylatex.base_classes import Float
+from pylatex.base_classes import Container, Float, LatexObject
+
+from . import templates
 
 
 class FloatAdditions(Float):
+    """
+    Additions to the pylatex floats. With the "template" render mode (set per
+    instance or globally with templates.set_default_render_mode) the items of
+    the float are kept as LaTeX lines instead of pylatex objects, which
+    dumps renders with a precompiled template to the same string. Items
+    added through the pylatex api (append, insert, extend) become lines as
+    well, in their place among the others
+    """
+
+    #: "tree" or "template", None for templates.default_render_mode
+    render_mode = None
+    # the LaTeX lines of the float when it is rendered from a template, and
+    # the packages of the items they stand for
+    _lines = None
+    _lines_packages = ()
+
     def __init__(self):
         self._label = ""
 
+    def _template_lines(self):
+        """The LaTeX lines of the float in the template render mode, else None"""
+        render_mode = self.render_mode or templates.default_render_mode
+        templates.check_render_mode(render_mode)
+        if render_mode == "template" and self._lines is None:
+            # items added before keep their place in front of the lines
+            self._lines = [self._as_line(item) for item in self.data]
+            self._lines_packages = []
+            self.data = []
+        return self._lines
+
+    def _as_line(self, item):
+        """
+        The LaTeX line of an item added through the pylatex api, pylatex
+        objects are kept as such until dumps, as they may still change
+        """
+        if isinstance(item, LatexObject):
+            return item
+        return templates.latex_item(item, self.escape)
+
+    def append(self, item):
+        if self._lines is None:
+            super().append(item)
+        else:
+            self._lines.append(self._as_line(item))
+
+    def insert(self, i, item):
+        if self._lines is None:
+            super().insert(i, item)
+        else:
+            self._lines.insert(i, self._as_line(item))
+
+    def extend(self, other):
+        if self._lines is None:
+            super().extend(other)
+        else:
+            self._lines.extend(self._as_line(item) for item in other)
+
+    def _add_line_package(self, package):
+        """Adds the package of an item represented by a template line"""
+        self._lines_packages.append(package)
+
+    def _propagate_packages(self):
+        # the packages of the lines come after those of the float itself, the
+        # same as the packages of the items of a tree
+        super()._propagate_packages()
+        for item in self._lines or ():
+            if isinstance(item, LatexObject):
+                if isinstance(item, Container):
+                    item._propagate_packages()
+                for package in item.packages:
+                    self.packages.add(package)
+        for package in self._lines_packages:
+            self.packages.add(package)
+
+    def dumps(self):
+        """Represents the float, from its template lines if it has those"""
+        if self._lines is None:
+            return super().dumps()
+        lines = [
+            line if isinstance(line, str) else templates.latex_item(line, self.escape)
+            for line in self._lines
+        ]
+        # items put in data directly come after the lines
+        lines.extend(templates.latex_item(item, self.escape) for item in self.data)
+        return templates.render_float(
+            self.latex_name, lines, self.options, self.arguments
+        )
+
     def add_caption_description(self, caption, above=True, description=None):
         """Add a caption to the float.
         Args
@@ -19,7 +106,17 @@ class FloatAdditions(Float):
         description: str
             The text for an accompanying description bellow caption
         """
-        if above:
+        if self._lines is not None:
+            caption = templates.latex_command("caption", caption)
+            if description:
+                description = templates.latex_command("caption*", description)
+            lines = [caption, description] if description else [caption]
+            if above:
+                self._lines[:0] = lines
+            else:
+                self._lines.extend(lines)
+
+        elif above:
             if description:
                 self.insert(0, Command("caption*", description))
             self.insert(0, Command("caption", caption))
@@ -27,7 +124,7 @@ class FloatAdditions(Float):
         else:
             self.append(Command("caption", caption))
             if description:
-                self.append(0, Command("caption*"), description)
+                self.append(Command("caption*", description))
 
     def add_label(self, label, above=True, zref=False):
         if zref:
@@ -36,7 +133,13 @@ class FloatAdditions(Float):
         else:
             lbl = "label"
 
-        if above:
+        if self._lines is not None:
+            line = f"\\{lbl}{{{self._label}:{label}}}"
+            if above:
+                self._lines.insert(0, line)
+            else:
+                self._lines.append(line)
+        elif above:
             self.insert(0, Command(lbl, NoEscape(f"{self._label}:{label}")))
         else:
             self.append(Command(lbl, NoEscape(f"{self._label}:{label}")))
@@ -0,0 +1,232 @@
+"""Instrumentation hooks around the stages of exporting artifacts.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+#: stages an artifact export goes through, in order, tabulars that are streamed
+#: or split into pages are formatted within their write stage
+STAGES = ("format", "tabular", "render", "dumps", "write", "record")
+
+# replaced rather than mutated, so emitting never iterates a changing list
+_observers: tuple[Callable[[StageEvent], None], ...] = ()
+_observers_lock = threading.Lock()
+
+
+class StageEvent(NamedTuple):
+    """A stage of an artifact export starting or stopping.
+
+    Attributes:
+        event: "start" or "stop"
+        kind: Kind of the artifact, e.g. "figure", "table" or "value"
+        name: Name of the artifact, or of the file for the write stage
+        stage: One of STAGES
+        duration: Seconds the stage took, None for start events
+        bytes_written: Bytes written to disk by the stage, files left
+            untouched because their content did not change count as 0
+
+    """
+
+    event: str
+    kind: str
+    name: str
+    stage: str
+    duration: float | None = None
+    bytes_written: int = 0
+
+
+def add_observer(observer: Callable[[StageEvent], None]) -> None:
+    """Call observer with the StageEvent of every stage from now on."""
+    global _observers
+    with _observers_lock:
+        _observers = (*_observers, observer)
+
+
+def remove_observer(observer: Callable[[StageEvent], None]) -> None:
+    """Stop calling an observer added with add_observer."""
+    global _observers
+    with _observers_lock:
+        observers = list(_observers)
+        observers.remove(observer)
+        _observers = tuple(observers)
+
+
+@contextmanager
+def observing(
+    observer: Callable[[StageEvent], None],
+) -> Iterator[Callable[[StageEvent], None]]:
+    """Observe the stages of the exports within the block.
+
+    Example:
+        with observing(StageStats()) as stats:
+            table.create_input_latex(df, "results")
+        print(stats)
+
+    """
+    add_observer(observer)
+    try:
+        yield observer
+    finally:
+        remove_observer(observer)
+
+
+def _emit(event: StageEvent) -> None:
+    for observer in _observers:
+        observer(event)
+
+
+class _Stage:
+    """Emits the start and stop events of a stage."""
+
+    __slots__ = ("kind", "name", "stage", "bytes_written", "_started")
+
+    def __init__(self, kind: str, name: str, stage: str) -> None:
+        self.kind = kind
+        self.name = name
+        self.stage = stage
+        self.bytes_written = 0
+
+    def add_bytes(self, size: int) -> None:
+        self.bytes_written += size
+
+    def __enter__(self) -> _Stage:
+        _emit(StageEvent("start", self.kind, self.name, self.stage))
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        duration = time.perf_counter() - self._started
+        _emit(
+            StageEvent(
+                "stop", self.kind, self.name, self.stage, duration, self.bytes_written
+            )
+        )
+
+
+class _NullStage:
+    """Stands in for a stage when nobody observes, doing nothing."""
+
+    __slots__ = ()
+
+    def add_bytes(self, size: int) -> None:
+        pass
+
+    def __enter__(self) -> _NullStage:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def track(kind: str, name: str, stage: str) -> _Stage | _NullStage:
+    """Return a context manager emitting the events of a stage.
+
+    Without observers a shared no-op stage is returned, so the hooks cost
+    no more than this check.
+
+    Args:
+        kind: Kind of the artifact, e.g. "figure"
+        name: Name of the artifact
+        stage: One of STAGES
+
+    """
+    if not _observers:
+        return _NULL_STAGE
+    return _Stage(kind, name, stage)
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Linearly interpolated percentile of sorted values."""
+    position = (len(values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class StageStats:
+    """Aggregates the stop events of every stage by artifact kind and stage.
+
+    Register it as an observer (see observing) and print it at the end of a
+    run for the count, total and percentile durations and the bytes written
+    of every stage. Exports in worker processes (export_tables, FigureBatch
+    or a BackgroundRenderer) are not observed, only their writes and
+    records in the observing process are.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty stats."""
+        self._durations: dict[tuple[str, str], list[float]] = {}
+        self._bytes: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: StageEvent) -> None:
+        """Add the duration and bytes written of a stop event."""
+        if event.event != "stop":
+            return
+        key = (event.kind, event.stage)
+        with self._lock:
+            self._durations.setdefault(key, []).append(event.duration)
+            self._bytes[key] = self._bytes.get(key, 0) + event.bytes_written
+
+    def keys(self) -> list[tuple[str, str]]:
+        """Return the observed (kind, stage) pairs, in the order of STAGES."""
+        order = {stage: position for position, stage in enumerate(STAGES)}
+        return sorted(
+            self._durations, key=lambda key: (key[0], order.get(key[1], len(order)))
+        )
+
+    def count(self, kind: str, stage: str) -> int:
+        """Return how often the stage ran for artifacts of kind."""
+        return len(self._durations.get((kind, stage), []))
+
+    def total(self, kind: str, stage: str) -> float:
+        """Return the seconds spent in the stage for artifacts of kind."""
+        return sum(self._durations.get((kind, stage), []))
+
+    def bytes_written(self, kind: str, stage: str) -> int:
+        """Return the bytes the stage wrote for artifacts of kind."""
+        return self._bytes.get((kind, stage), 0)
+
+    def percentile(self, kind: str, stage: str, percentile: float) -> float:
+        """Return a percentile (0 to 100) of the durations of the stage."""
+        durations = sorted(self._durations.get((kind, stage), []))
+        if not durations:
+            return 0.0
+        return _percentile(durations, percentile)
+
+    def reset(self) -> None:
+        """Forget all events added so far."""
+        with self._lock:
+            self._durations.clear()
+            self._bytes.clear()
+
+    def __str__(self) -> str:
+        """Return a table of the stats of every stage, in milliseconds."""
+        lines = [
+            f"{'kind':8} {'stage':8} {'count':>7} {'total':>10} {'p50':>9} "
+            f"{'p90':>9} {'p99':>9} {'bytes':>12}"
+        ]
+        for kind, stage in self.keys():
+            p50, p90, p99 = (
+                1e3 * self.percentile(kind, stage, percentile)
+                for percentile in (50, 90, 99)
+            )
+            lines.append(
+                f"{kind:8} {stage:8} {self.count(kind, stage):7d} "
+                f"{1e3 * self.total(kind, stage):10.2f} {p50:9.3f} {p90:9.3f} "
+                f"{p99:9.3f} {self.bytes_written(kind, stage):12d}"
+            )
+        return "\n".join(lines)
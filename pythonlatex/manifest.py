@@ -0,0 +1,184 @@
+"""Indexed manifest of the artifacts generated into a LaTeX folder.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import NamedTuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    outer_folder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    inner_path TEXT,
+    outer_path TEXT,
+    digest TEXT,
+    size INTEGER,
+    generated_at REAL,
+    duration REAL,
+    latex_input TEXT NOT NULL,
+    PRIMARY KEY (outer_folder, filename)
+);
+CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, filename);
+CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts (digest);
+CREATE INDEX IF NOT EXISTS artifacts_generated_at ON artifacts (generated_at);
+"""
+
+_UPSERT = """
+INSERT INTO artifacts (
+    outer_folder, filename, kind, inner_path, outer_path,
+    digest, size, generated_at, duration, latex_input
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (outer_folder, filename) DO UPDATE SET
+    kind = excluded.kind,
+    inner_path = excluded.inner_path,
+    outer_path = excluded.outer_path,
+    digest = excluded.digest,
+    size = excluded.size,
+    generated_at = excluded.generated_at,
+    duration = excluded.duration,
+    latex_input = excluded.latex_input
+"""
+
+
+class Artifact(NamedTuple):
+    """A generated figure, table or value as recorded in the manifest."""
+
+    outer_folder: str
+    filename: str
+    kind: str
+    inner_path: str | None
+    outer_path: str | None
+    digest: str | None
+    size: int | None
+    generated_at: float | None
+    duration: float | None
+    latex_input: str
+
+
+class Manifest:
+    """SQLite database recording every artifact generated into a folders path.
+
+    Artifacts are keyed by their outer folder and filename, recording an
+    artifact again replaces the earlier entry of that name.
+    """
+
+    filename = "manifest.sqlite"
+
+    def __init__(self, path: str) -> None:
+        """Refer to the manifest database at path, created on first use.
+
+        Args:
+            path: Path of the SQLite database file
+
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._file_id = None
+
+    def _file_changed(self) -> bool:
+        """Return True if the database file was removed or replaced."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_dev, stat.st_ino) != self._file_id
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The connection to the database, (re)opened when needed."""
+        if self._connection is not None and self._file_changed():
+            self._connection.close()
+            self._connection = None
+        if self._connection is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=60, check_same_thread=False
+            )
+            connection.executescript(_SCHEMA)
+            stat = os.stat(self.path)
+            self._file_id = (stat.st_dev, stat.st_ino)
+            self._connection = connection
+        return self._connection
+
+    def upsert(self, artifacts: list[Artifact]) -> None:
+        """Record a batch of artifacts in a single transaction."""
+        with self._lock, self.connection as connection:
+            connection.executemany(_UPSERT, artifacts)
+
+    def artifacts(
+        self,
+        kind: str | None = None,
+        outer_folder: str | None = None,
+    ) -> list[Artifact]:
+        """Return the recorded artifacts sorted by outer folder and filename.
+
+        Args:
+            kind: Only return artifacts of this kind (figure, table, value)
+            outer_folder: Only return artifacts of this outer folder
+
+        """
+        query = "SELECT * FROM artifacts"
+        conditions, parameters = [], []
+        if kind is not None:
+            conditions.append("kind = ?")
+            parameters.append(kind)
+        if outer_folder is not None:
+            conditions.append("outer_folder = ?")
+            parameters.append(outer_folder)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY outer_folder, filename"
+        with self._lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+        return [Artifact(*row) for row in rows]
+
+    def get(self, outer_folder: str, filename: str) -> Artifact | None:
+        """Return the artifact recorded under filename, None if unknown."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT * FROM artifacts WHERE outer_folder = ? AND filename = ?",
+                (outer_folder, filename),
+            ).fetchone()
+        return None if row is None else Artifact(*row)
+
+    def remove(self, outer_folder: str, filename: str) -> None:
+        """Forget the artifact recorded under filename."""
+        with self._lock, self.connection as connection:
+            connection.execute(
+                "DELETE FROM artifacts WHERE outer_folder = ? AND filename = ?",
+                (outer_folder, filename),
+            )
+
+    def forget_connection(self) -> None:
+        """Drop the connection without closing it, e.g. in a forked child."""
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class MemoryManifest(Manifest):
+    """Manifest kept in an in-memory SQLite database, see MemoryStorage."""
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The connection to the database, which only lives in memory."""
+        if self._connection is None:
+            connection = sqlite3.connect(":memory:", check_same_thread=False)
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
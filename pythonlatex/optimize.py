@@ -0,0 +1,217 @@
+"""Lossless optimization of the PNG files of rendered figures.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from io import BytesIO
+from typing import NamedTuple
+
+from pythonlatex.saving import write_if_changed
+
+
+def _palette_image(image: object) -> object | None:
+    """Return image as an exact palette image, None if it has too many colors.
+
+    Every distinct color (alpha included) gets its own palette entry, so the
+    conversion is lossless, unlike Image.quantize.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rgba = image.convert("RGBA")
+    if rgba.getcolors(256) is None:
+        return None
+    pixels = np.asarray(rgba).reshape(-1, 4)
+    colors, indices = np.unique(pixels, axis=0, return_inverse=True)
+    indices = indices.astype(np.uint8).reshape(rgba.height, rgba.width)
+    palette = Image.fromarray(indices).convert("P")
+    palette.putpalette(colors[:, :3].tobytes())
+    if (colors[:, 3] < 255).any():
+        palette.info["transparency"] = colors[:, 3].tobytes()
+    return palette
+
+
+def optimize_png(
+    data: bytes,
+    quantize: bool = False,
+    strip_metadata: bool = True,
+) -> bytes:
+    """Recompress a PNG losslessly, returning the original if that is smaller.
+
+    Args:
+        data: The PNG file
+        quantize: Store images of at most 256 distinct colors (flat-color
+            plots) as palette images, which is lossless as well
+        strip_metadata: Leave out the text chunks (e.g. Software), the dpi is
+            always kept as it sets the size of the graphic in LaTeX
+
+    Returns:
+        The smallest PNG file
+
+    """
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        options = {"optimize": True}
+        if "dpi" in image.info:
+            options["dpi"] = image.info["dpi"]
+        if not strip_metadata and image.text:
+            options["pnginfo"] = PngInfo()
+            for key, value in image.text.items():
+                options["pnginfo"].add_text(key, value)
+        if quantize:
+            palette = _palette_image(image)
+            if palette is not None:
+                image = palette
+                if "transparency" in image.info:
+                    options["transparency"] = image.info["transparency"]
+
+        buffer = BytesIO()
+        image.save(buffer, format="PNG", **options)
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+class OptimizeResult(NamedTuple):
+    """Sizes of a PNG file before and after optimization."""
+
+    path: str
+    original_size: int
+    optimized_size: int
+
+    @property
+    def saved(self) -> int:
+        """Number of bytes saved."""
+        return self.original_size - self.optimized_size
+
+
+class PngOptimizer:
+    """Optimizes PNG files in a pool of threads.
+
+    Pillow releases the GIL while compressing, so the zlib work of several
+    files overlaps, and overlaps with rendering the next figures when used by
+    a Figure. Every optimized file is kept in ``results``, ``wait`` blocks
+    until all submitted files are done and raises if any of them failed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        quantize: bool = False,
+        strip_metadata: bool = True,
+    ) -> None:
+        """Initialize the optimizer.
+
+        Args:
+            max_workers: Number of threads, defaults to that of the
+                ThreadPoolExecutor
+            quantize: Store flat-color images as palette images, see
+                optimize_png
+            strip_metadata: Leave out the text chunks, see optimize_png
+
+        """
+        self.max_workers = max_workers
+        self.quantize = quantize
+        self.strip_metadata = strip_metadata
+        self.results = []
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = []
+
+    @property
+    def options(self) -> dict:
+        """The keyword arguments of optimize_png for this optimizer."""
+        return {"quantize": self.quantize, "strip_metadata": self.strip_metadata}
+
+    def _optimize(self, path: str, data: bytes | None) -> tuple[bool, int]:
+        if data is None:
+            with open(path, "rb") as file:
+                data = file.read()
+        optimized = optimize_png(data, **self.options)
+        written = write_if_changed(path, optimized)
+        with self._lock:
+            self.results.append(OptimizeResult(path, len(data), len(optimized)))
+        return written, len(optimized)
+
+    def submit(self, path: str, data: bytes | None = None) -> Future:
+        """Optimize a PNG and write it to path, skipped when unchanged.
+
+        Args:
+            path: Path of the PNG file
+            data: The PNG as rendered, read from path if not given
+
+        Returns:
+            A future of (written, size) of the file
+
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="pythonlatex-png"
+            )
+        future = self._executor.submit(self._optimize, path, data)
+        self._pending.append(future)
+        return future
+
+    def optimize_folder(self, folder: str) -> list[OptimizeResult]:
+        """Optimize every PNG file in folder and wait for them."""
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(".png"):
+                self.submit(posixpath.join(folder, name))
+        return self.wait()
+
+    def wait(self) -> list[OptimizeResult]:
+        """Wait for all submitted files and raise if any of them failed."""
+        pending, self._pending = self._pending, []
+        wait(pending)
+        errors = [future.exception() for future in pending if future.exception()]
+        if errors:
+            msg = f"{len(errors)} of {len(pending)} PNG optimizations failed: {errors}"
+            raise RuntimeError(msg) from errors[0]
+        return self.results
+
+    @property
+    def total_saved(self) -> int:
+        """Number of bytes saved over all optimized files."""
+        return sum(result.saved for result in self.results)
+
+    def report(self) -> str:
+        """Report the bytes saved per file and in total."""
+        lines = [f"{'file':40} {'original':>10} {'optimized':>10} {'saved':>10}"]
+        for result in sorted(self.results):
+            lines.append(
+                f"{result.path:40} {result.original_size:10d} "
+                f"{result.optimized_size:10d} {result.saved:10d}"
+            )
+        original = sum(result.original_size for result in self.results)
+        percentage = 100 * self.total_saved / original if original else 0.0
+        lines.append(
+            f"{'total':40} {original:10d} {original - self.total_saved:10d} "
+            f"{self.total_saved:10d} ({percentage:.1f}%)"
+        )
+        return "\n".join(lines)
+
+    def shutdown(self) -> None:
+        """Wait for all files and stop the threads."""
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> PngOptimizer:
+        """Use the optimizer as a barrier around a block of plotting code."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Wait for (and check) all files submitted within the block."""
+        self.shutdown()
@@ -0,0 +1,207 @@
+"""Pre-typesetting of float bodies as standalone PDFs, compiled in parallel.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+from pylatex.errors import CompilerError
+
+from pythonlatex.compiler import _digest_or_none, run_engine
+from pythonlatex.saving import write_if_changed
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from multiprocessing.context import BaseContext
+
+    from pythonlatex.cache import RenderCache
+
+DEFAULT_PREAMBLE = "\\usepackage{booktabs}\n\\usepackage{graphicx}\n\\usepackage{pgf}"
+
+# the float bodies input files relative to the folders path, one level up
+# from the folder the standalone documents are compiled in
+_STANDALONE = r"""\documentclass{standalone}
+%s
+\makeatletter\def\input@path{{../}}\makeatother
+\begin{document}
+%s
+\end{document}
+"""
+
+
+def _typeset(command: list[str], folder: str, name: str, source: str) -> bytes:
+    """Compile a standalone document in folder and return its PDF."""
+    write_if_changed(posixpath.join(folder, f"{name}.tex"), source)
+    run_engine([*command, f"{name}.tex"], folder)
+    with open(posixpath.join(folder, f"{name}.pdf"), "rb") as file:
+        return file.read()
+
+
+class Pretypesetter:
+    """Compiles float bodies to standalone PDFs in a pool of processes.
+
+    A Table or Figure given a pretypesetter includes the PDF of its body
+    instead of the body itself, so the main document no longer typesets
+    large tabulars or pgf plots on every compile. The PDFs are cached by the
+    digest of their source and of the files it inputs, so only bodies that
+    changed are compiled again, also over runs. ``wait`` blocks until all
+    submitted bodies are compiled and raises if any of them failed.
+    """
+
+    def __init__(
+        self,
+        folders_path: str = "Latex/",
+        folder_name: str = "Pretypeset",
+        engine: Sequence[str] = ("pdflatex",),
+        engine_args: Sequence[str] = ("-interaction=nonstopmode", "-halt-on-error"),
+        preamble: str = DEFAULT_PREAMBLE,
+        cache: RenderCache | None = None,
+        max_workers: int | None = None,
+        mp_context: BaseContext | None = None,
+    ) -> None:
+        """Initialize the pretypesetter.
+
+        Args:
+            folders_path: Folders path of the tables and figures, as the
+                bodies input their inner files relative to it
+            folder_name: Folder in the folders path holding the standalone
+                documents and PDFs
+            engine: Command of the TeX engine, e.g. ("lualatex",)
+            engine_args: Arguments passed to the engine before the document
+            preamble: Preamble of the standalone documents
+            cache: RenderCache of the PDFs, defaults to one in the cache
+                folder of folder_name
+            max_workers: Number of processes, defaults to that of the
+                ProcessPoolExecutor
+            mp_context: Multiprocessing context of the processes
+
+        """
+        self.folders_path = folders_path
+        self.folder_name = folder_name
+        self.engine = list(engine)
+        self.engine_args = list(engine_args)
+        self.preamble = preamble
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self.compiled = []
+        self._cache = cache
+        self._executor = None
+        self._pending = {}
+
+    @property
+    def cache(self) -> RenderCache:
+        """The RenderCache holding the compiled PDFs by digest."""
+        if self._cache is None:
+            from pythonlatex.cache import RenderCache
+
+            self._cache = RenderCache(posixpath.join(self.folder, "cache"))
+        return self._cache
+
+    @property
+    def folder(self) -> str:
+        """Folder holding the standalone documents and their PDFs."""
+        return f"{self.folders_path}{self.folder_name}"
+
+    def _source(self, body: str) -> str:
+        return _STANDALONE % (self.preamble, body)
+
+    def _digest(self, source: str, files: Sequence[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(repr(self.engine + self.engine_args).encode())
+        digest.update(source.encode("utf-8"))
+        for path in files:
+            file_digest = _digest_or_none(posixpath.join(self.folders_path, path))
+            digest.update(f"{path}:{file_digest}".encode())
+        return digest.hexdigest()
+
+    def _collect(self, names: list[str]) -> list[BaseException]:
+        """Wait for the pending bodies of names and cache their PDFs."""
+        jobs = [self._pending.pop(name) for name in names]
+        wait([future for future, _ in jobs])
+        errors = []
+        for name, (future, digest) in zip(names, jobs):
+            if future.exception() is not None:
+                errors.append(future.exception())
+            else:
+                self.cache.put(digest, future.result())
+                self.compiled.append(name)
+        return errors
+
+    def submit(self, name: str, body: str, files: Sequence[str] = ()) -> str:
+        """Typeset a float body, unless its PDF is cached already.
+
+        Args:
+            name: Name of the standalone document and its PDF
+            body: LaTeX of the float body, e.g. \\input{Tabulars/name}
+            files: Paths relative to the folders path of the files the body
+                inputs, their content is part of the digest
+
+        Returns:
+            The path of the PDF relative to the folders path, for the float to
+            include
+
+        """
+        source = self._source(body)
+        digest = self._digest(source, files)
+        relative_path = posixpath.join(self.folder_name, f"{name}.pdf")
+
+        # a body of the same name still compiling would race for its files,
+        # its error (if any) is left for the new compile to raise
+        if name in self._pending:
+            self._collect([name])
+
+        os.makedirs(self.folder, exist_ok=True)
+        data = self.cache.get(digest)
+        if data is not None:
+            write_if_changed(posixpath.join(self.folder, f"{name}.pdf"), data)
+            return relative_path
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=self.mp_context
+            )
+        command = [*self.engine, *self.engine_args]
+        future = self._executor.submit(_typeset, command, self.folder, name, source)
+        self._pending[name] = (future, digest)
+        return relative_path
+
+    def wait(self) -> list[str]:
+        """Wait for all submitted bodies and raise if any of them failed.
+
+        Returns:
+            The names of the bodies compiled so far, cached ones left out
+
+        """
+        names = list(self._pending)
+        errors = self._collect(names)
+        if self._cache is not None:
+            # the end of the batch, for other processes to find the PDFs
+            self._cache.flush()
+        if errors:
+            msg = f"{len(errors)} of {len(names)} standalone compiles failed"
+            raise CompilerError(f"{msg}: {errors[0]}") from errors[0]
+        return self.compiled
+
+    def shutdown(self) -> None:
+        """Wait for all bodies and stop the processes."""
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> Pretypesetter:
+        """Use the pretypesetter as a barrier around a block of exports."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Wait for (and check) all bodies submitted within the block."""
+        self.shutdown()
@@ -4,8 +4,623 @@ This module is the base module for saving .tex files using pylatex
     :license: MIT, see License for more details.
 """
 
+import atexit
+import hashlib
+import multiprocessing.util
 import os
 import posixpath
+import tempfile
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+from .hooks import track
+from .manifest import Artifact, Manifest, MemoryManifest
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class WriteStats(object):
+    """
+    Counter of the files that were (re)written and the files that were left
+    untouched because their content did not change
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self.bytes_written = 0
+        self.bytes_skipped = 0
+
+    def add(self, written, size):
+        if written:
+            self.written += 1
+            self.bytes_written += size
+        else:
+            self.skipped += 1
+            self.bytes_skipped += size
+
+    def reset(self):
+        self.__init__()
+
+    def __repr__(self):
+        return (
+            f"WriteStats(written={self.written}, skipped={self.skipped}, "
+            f"bytes_written={self.bytes_written}, bytes_skipped={self.bytes_skipped})"
+        )
+
+
+#: totals over every LatexSaving instance of the running process
+write_stats = WriteStats()
+
+# digest of the content last written to a path, together with the
+# (size, mtime) of the file right after writing it, so an unchanged file
+# does not even have to be read back to be compared
+_recorded_digests = {}
+
+
+def _as_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else bytes(content)
+
+
+def _file_name(path):
+    """Name of the file at path without its folder and extension"""
+    return posixpath.splitext(posixpath.basename(path))[0]
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """
+    Returns the sha256 digest of the file at path, without reading it again
+    when it was written through this module and its size and mtime did not
+    change since
+    Args
+    ----
+    path: str
+        Path of the file
+    Returns
+    -------
+    str
+        Hexadecimal digest, raises OSError when the file cannot be read
+    """
+    signature = _file_signature(path)
+    recorded = _recorded_digests.get(path)
+    if recorded is not None and recorded[1] == signature:
+        return recorded[0]
+    return _file_digest(path)
+
+
+def write_if_changed(path, content):
+    """
+    Writes content to path, unless the file on disk already holds exactly
+    the same bytes, in which case the file (and its mtime) is left untouched
+    Args
+    ----
+    path: str
+        Path of the file to write
+    content: str, bytes
+        New content of the file, str is encoded as utf-8
+    Returns
+    -------
+    bool
+        True if the file was written, False if it was skipped
+    """
+    data = _as_bytes(content)
+    return _write_if_changed(path, data, hashlib.sha256(data).hexdigest())
+
+
+def _unchanged(path, digest, size):
+    """Returns True if the file at path holds content with digest and size"""
+    try:
+        signature = _file_signature(path)
+    except OSError:
+        return False
+    if signature[0] != size:
+        return False
+
+    recorded = _recorded_digests.get(path)
+    if recorded is not None and recorded[1] == signature:
+        on_disk = recorded[0]
+    else:
+        on_disk = _file_digest(path)
+    if on_disk == digest:
+        _recorded_digests[path] = (digest, signature)
+        return True
+    return False
+
+
+def _write_if_changed(path, data, digest):
+    if _unchanged(path, digest, len(data)):
+        return False
+    _atomic_write(path, [data])
+    return True
+
+
+def write_chunks_if_changed(path, chunks):
+    """
+    Streams chunks into a temporary file next to path, hashing them on the
+    way, and only replaces path with it when the content differs from the
+    file on disk, so memory stays proportional to a single chunk
+    Args
+    ----
+    path: str
+        Path of the file to write
+    chunks: iterable of str or bytes
+        Consecutive parts of the new content, str is encoded as utf-8
+    Returns
+    -------
+    tuple
+        (written, digest, size) of the new content
+    """
+    return _atomic_write(path, chunks, skip_unchanged=True)
+
+
+# permissions of newly created files, as mkstemp creates them private
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def atomic_write(path, data):
+    """
+    Writes data to a temporary file next to path and renames it over path,
+    so readers (LaTeX, other processes) never see a partially written file
+    """
+    _atomic_write(path, [data])
+
+
+def _atomic_write(path, chunks, skip_unchanged=False):
+    folder, name = os.path.split(path)
+    descriptor, temporary = tempfile.mkstemp(
+        prefix=f".{name}.", suffix=".tmp", dir=folder or "."
+    )
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(descriptor, "wb") as file:
+            for chunk in chunks:
+                data = _as_bytes(chunk)
+                digest.update(data)
+                size += len(data)
+                file.write(data)
+        digest = digest.hexdigest()
+
+        if skip_unchanged and _unchanged(path, digest, size):
+            os.remove(temporary)
+            return False, digest, size
+        os.chmod(temporary, 0o666 & ~_umask)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    _recorded_digests[path] = (digest, _file_signature(path))
+    return True, digest, size
+
+
+class FileLock(object):
+    """
+    Advisory lock on path + '.lock', excluding both other threads and other
+    processes, used around read-modify-write cycles of shared index files
+    """
+
+    def __init__(self, path):
+        self.path = f"{path}.lock"
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._file = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+            self._thread_lock.release()
+
+
+class _Folder(object):
+    """
+    A folder shared by all LatexSaving instances of the process, it gets
+    created once, on the first file that is actually written into it
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._provisioned = False
+
+    def provision(self, force=False):
+        if force or not self._provisioned:
+            os.makedirs(self.path, exist_ok=True)
+            self._provisioned = True
+
+
+class _InputsIndex(object):
+    """
+    The latest_inputs.txt summary of an outer folder, shared by all
+    LatexSaving instances of the process. Recorded artifacts are batched,
+    and upserted by name into the manifest of the folders path in a single
+    transaction once max_entries are pending, the oldest pending one is
+    max_delay seconds old, flush is called (see flush_inputs and
+    buffered_inputs) or the interpreter exits.
+    The summary is rendered from the manifest, sorted by filename and
+    without duplicates. It covers the whole folder, so rather than for every
+    batch it is rendered at most once per max_delay seconds of recording,
+    and whenever the index is flushed.
+    """
+
+    max_entries = 256
+    max_delay = 5.0
+
+    def __init__(self, path, title, manifest, outer_folder, storage):
+        self.path = path
+        self.title = title
+        self.manifest = manifest
+        self.outer_folder = outer_folder
+        self.storage = storage
+        self._pending = []
+        self._pending_since = None
+        # other processes may have recorded into the manifest already
+        self._stale = True
+        self._rendered_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _header(self):
+        text = self.title.upper()
+        n = len(text)
+        return f"{n * '='} \n{text} \n{n * '='} \n"
+
+    def write(self, artifact):
+        with self._lock:
+            now = time.monotonic()
+            self._pending.append(artifact)
+            if self._pending_since is None:
+                self._pending_since = now
+            if (
+                len(self._pending) >= self.max_entries
+                or now - self._pending_since >= self.max_delay
+            ):
+                self._upsert()
+                if now - self._rendered_at >= self.max_delay:
+                    self._render()
+
+    def flush(self):
+        with self._lock:
+            self._upsert()
+            if self._stale:
+                self._render()
+
+    def record(self):
+        """Upserts the pending artifacts, leaving the summary for later"""
+        with self._lock:
+            self._upsert()
+
+    def _upsert(self):
+        if not self._pending:
+            return
+        with self.storage.lock(self.manifest.path):
+            # pending artifacts are only dropped once they were recorded
+            self.manifest.upsert(self._pending)
+            self._pending = []
+            self._pending_since = None
+            self._stale = True
+
+    def _render(self):
+        self.storage.prepare(self.path, force=True)
+        # other processes may record into the same manifest, the summary is
+        # rendered within the same lock so it cannot miss their artifacts
+        with self.storage.lock(self.manifest.path):
+            artifacts = self.manifest.artifacts(outer_folder=self.outer_folder)
+            text = self._header() + "".join(item.latex_input for item in artifacts)
+            self.storage.write(self.path, text)
+            self._stale = False
+            self._rendered_at = time.monotonic()
+
+
+class _Buffering(object):
+    """Process-wide depth of the nested buffered_inputs blocks"""
+
+    def __init__(self):
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self._depth += 1
+
+    def exit(self):
+        with self._lock:
+            self._depth -= 1
+            return self._depth == 0
+
+
+_buffering = _Buffering()
+
+
+# process-wide state per resolved path, so that constructing LatexSaving
+# instances does not touch the filesystem at all
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _shared(kind, path, *args, scope=None):
+    """
+    Returns the shared object of the given kind for path, creating it once,
+    scope separates the objects of the same path in different storages
+    """
+    key = (kind, os.path.abspath(path), scope)
+    state = _registry.get(key)
+    if state is None:
+        with _registry_lock:
+            state = _registry.setdefault(key, kind(path, *args))
+    return state
+
+
+def lock_for(path):
+    """Returns the process-wide FileLock guarding the shared file at path"""
+    return _shared(FileLock, path)
+
+
+def _forget_connections():
+    # sqlite connections cannot be used in a forked child, it opens its own
+    for (kind, *_), state in list(_registry.items()):
+        if kind is Manifest:
+            state.forget_connection()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_connections)
+
+
+def _record_pending(manifest):
+    """Upserts the artifacts pending for manifest in any inputs index"""
+    for (kind, *_), state in list(_registry.items()):
+        if kind is _InputsIndex and state.manifest is manifest:
+            state.record()
+
+
+def flush_inputs():
+    """
+    Records the pending artifacts of every latest_inputs.txt index and
+    renders the summaries that are out of date
+    """
+    for (kind, *_), state in list(_registry.items()):
+        if kind is _InputsIndex:
+            state.flush()
+
+
+atexit.register(flush_inputs)
+
+
+def _flush_inputs_at_exit(_):
+    # forked multiprocessing children leave without running atexit
+    multiprocessing.util.Finalize(None, flush_inputs, exitpriority=0)
+
+
+multiprocessing.util.register_after_fork(_buffering, _flush_inputs_at_exit)
+
+
+@contextmanager
+def buffered_inputs():
+    """
+    Flushes the pending inputs of every latest_inputs.txt index when leaving
+    the block (as batch exports do), so the manifest and summaries are up to
+    date afterwards
+    """
+    _buffering.enter()
+    try:
+        yield
+    finally:
+        if _buffering.exit():
+            flush_inputs()
+
+
+def reset_shared_state():
+    """
+    Forgets the provisioned folders, indexes and open manifests, e.g. after
+    the output folders were removed
+    """
+    flush_inputs()
+    with _registry_lock:
+        for (kind, *_), state in _registry.items():
+            if kind is Manifest:
+                state.close()
+        _registry.clear()
+
+
+class LocalStorage(object):
+    """
+    Storage of the generated files on the local filesystem (the default),
+    written atomically and left untouched when their content did not change
+    """
+
+    #: whether the files are on disk, for TeX engines and worker processes
+    local = True
+    #: shared indexes of the local filesystem are process-wide per path
+    scope = None
+
+    def prepare(self, path, force=False):
+        """
+        Makes sure the folder of path exists before writing to it, force
+        re-creates a folder that was removed after it was provisioned
+        """
+        _shared(_Folder, posixpath.dirname(path)).provision(force)
+        return path
+
+    def write(self, path, content, digest=None):
+        """
+        Writes content (str or bytes) to path unless the file holds exactly
+        the same bytes, digest is the sha256 of its bytes if known already
+        Returns
+        -------
+        bool
+            True if the file was written, False if it was left untouched
+        """
+        data = _as_bytes(content)
+        if digest is None:
+            digest = hashlib.sha256(data).hexdigest()
+        try:
+            return _write_if_changed(self.prepare(path), data, digest)
+        except FileNotFoundError:
+            return _write_if_changed(self.prepare(path, force=True), data, digest)
+
+    def write_chunks(self, path, chunks):
+        """
+        Streams chunks to path unless the file holds the same content
+        Returns
+        -------
+        tuple
+            (written, digest, size) of the new content
+        """
+        return write_chunks_if_changed(self.prepare(path), chunks)
+
+    def read(self, path):
+        """Returns the bytes of the file at path"""
+        with open(path, "rb") as file:
+            return file.read()
+
+    def size(self, path):
+        """Returns the size of the file at path"""
+        return os.path.getsize(path)
+
+    def remove(self, path):
+        """Removes the file at path, raises FileNotFoundError if there is none"""
+        os.remove(path)
+
+    def lock(self, path):
+        """Returns the lock guarding read-modify-write cycles of path"""
+        return lock_for(path)
+
+    def manifest(self, path):
+        """Returns the Manifest of the artifacts at path"""
+        return _shared(Manifest, path)
+
+
+class MemoryStorage(object):
+    """
+    Storage keeping the generated files in memory, by path, e.g. for tests
+    or to serve the generated LaTeX without any disk I/O. The manifests are
+    in-memory SQLite databases. Plots are rendered (and their PNG files
+    optimized) in process, as a BackgroundRenderer writes its files to disk
+    """
+
+    local = False
+
+    def __init__(self):
+        self.files = {}
+        self._manifests = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def scope(self):
+        return self
+
+    def _key(self, path):
+        return posixpath.normpath(path)
+
+    def prepare(self, path, force=False):
+        return path
+
+    def write(self, path, content, digest=None):
+        data = _as_bytes(content)
+        key = self._key(path)
+        with self._lock:
+            if self.files.get(key) == data:
+                return False
+            self.files[key] = data
+        return True
+
+    def write_chunks(self, path, chunks):
+        digest = hashlib.sha256()
+        parts = []
+        for chunk in chunks:
+            data = _as_bytes(chunk)
+            digest.update(data)
+            parts.append(data)
+        data = b"".join(parts)
+        return self.write(path, data), digest.hexdigest(), len(data)
+
+    def read(self, path):
+        try:
+            return self.files[self._key(path)]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def size(self, path):
+        return len(self.read(path))
+
+    def remove(self, path):
+        with self._lock:
+            try:
+                del self.files[self._key(path)]
+            except KeyError:
+                raise FileNotFoundError(path) from None
+
+    def lock(self, path):
+        with self._lock:
+            return self._locks.setdefault(self._key(path), threading.Lock())
+
+    def manifest(self, path):
+        key = self._key(path)
+        with self._lock:
+            if key not in self._manifests:
+                self._manifests[key] = MemoryManifest(key)
+            return self._manifests[key]
+
+
+#: storage of the LatexSaving instances that do not set one themselves
+default_storage = LocalStorage()
+
+
+def set_default_storage(storage):
+    """
+    Sets the storage of every LatexSaving instance that does not set one
+    itself, e.g. set_default_storage(MemoryStorage())
+    """
+    global default_storage
+    default_storage = storage
 
 
 class LatexSaving(object):
@@ -18,22 +633,50 @@ class LatexSaving(object):
     in the 'outer' folder
     e.g. same reasoning for table: tabular gets saved in the 'inner',
     while full table is saved in 'outer'
+    Every artifact is recorded in the manifest of the folders path, from
+    which the latest_inputs.txt summary of the outer folder is rendered
+    All files are saved through storage, default_storage (the local
+    filesystem unless set_default_storage was called) when it is None
     """
 
+    _artifact_kind = "artifact"
+
     def __init__(
-        self, folders_path="Latex/", outer_folder="Outer", inner_folder="Inner"
+        self,
+        folders_path="Latex/",
+        outer_folder="Outer",
+        inner_folder="Inner",
+        storage=None,
     ):
         # print("latexsaving init in")
         self._folders_path = folders_path
         self._inner_folder_name = inner_folder
         self._outer_folder_name = outer_folder
-        self._create_folders()
-        self._create_latest_inputs_txt()
+        self.storage = storage
+        self.write_stats = WriteStats()
+        self._begin_artifact()
+        # folders and the inputs summary are provisioned on the first write
+
+    def _begin_artifact(self):
+        """Starts timing a new artifact and tracking the files saved for it"""
+        self._artifact_started = time.perf_counter()
+        self._artifact_files = []
 
     def _create_folders(self):
         for folder_name in [self._inner_folder_name, self._outer_folder_name]:
-            if not os.path.exists(self._folder(folder_name)):
-                os.makedirs(self._folder(folder_name))
+            _shared(_Folder, self._folder(folder_name)).provision()
+
+    @property
+    def _storage(self):
+        """The storage the files are saved to, default_storage if not set"""
+        return default_storage if self.storage is None else self.storage
+
+    def _prepare_path(self, path, force=False):
+        """
+        Makes sure the folder of path exists before writing to it, force
+        re-creates a folder that was removed after it was provisioned
+        """
+        return self._storage.prepare(path, force)
 
     def _folder(self, folder_name):
         return f"{self._folders_path}{folder_name}"
@@ -62,21 +705,141 @@ class LatexSaving(object):
         path = posixpath.join(self._outer_folder_name, name)
         return path
 
+    def _save_file(self, path, content):
+        """
+        Saves content to path through the skip-unchanged write path and
+        keeps count of the written and skipped files
+        Returns
+        -------
+        bool
+            True if the file was written, False if it was left untouched
+        """
+        with track(self._artifact_kind, _file_name(path), "write") as stage:
+            data = _as_bytes(content)
+            digest = hashlib.sha256(data).hexdigest()
+            written = self._storage.write(path, data, digest)
+            if written:
+                stage.add_bytes(len(data))
+        self._count_write(written, len(data))
+        self._artifact_files.append((path, digest, len(data)))
+        return written
+
+    def _save_chunks(self, path, chunks):
+        """
+        Streams chunks to path through the skip-unchanged write path, without
+        holding the full content in memory
+        Returns
+        -------
+        bool
+            True if the file was written, False if it was left untouched
+        """
+        with track(self._artifact_kind, _file_name(path), "write") as stage:
+            written, digest, size = self._storage.write_chunks(path, chunks)
+            if written:
+                stage.add_bytes(size)
+        self._count_write(written, size)
+        self._artifact_files.append((path, digest, size))
+        return written
+
+    def _count_write(self, written, size):
+        self.write_stats.add(written, size)
+        write_stats.add(written, size)
+
     @property
     def _latest_inputs_file(self):
         return f"{self._absolute_outer_path('latest_inputs')}.txt"
 
-    def _create_latest_inputs_txt(self):
-        with open(self._latest_inputs_file, "w") as file:
-            text = f"Summary of all {self._inner_folder_name}".upper()
-            n = len(text)
-            file.write(f"{n * '='} \n")
-            file.write(f"{text} \n")
-            file.write(f"{n * '='} \n")
+    @property
+    def manifest(self):
+        """
+        The Manifest of all artifacts generated into the folders path, with
+        the artifacts still pending in this process recorded first
+        """
+        manifest = self._manifest
+        _record_pending(manifest)
+        return manifest
+
+    @property
+    def _manifest(self):
+        return self._storage.manifest(
+            posixpath.join(self._folders_path, Manifest.filename)
+        )
+
+    @property
+    def _inputs_index(self):
+        storage = self._storage
+        return _shared(
+            _InputsIndex,
+            self._latest_inputs_file,
+            f"Summary of all {self._inner_folder_name}",
+            self._manifest,
+            self._outer_folder_name,
+            storage,
+            scope=storage.scope,
+        )
+
+    def _relative_path(self, path):
+        """Path relative to the folders path, as used in LaTeX inputs"""
+        if path.startswith(self._folders_path):
+            return path[len(self._folders_path) :]
+        return path
+
+    def _record_input(self, filename, latex_input, files=None):
+        """
+        Records the artifact filename (with the files saved for it since
+        _begin_artifact, unless given) in the manifest and inputs summary
+        Args
+        ----
+        filename: str
+            Name of the artifact
+        latex_input: str
+            LaTeX lines that input the artifact
+        files: list
+            Optional (path, digest, size) tuples of the artifact's files
+        """
+        if files is None:
+            files = self._artifact_files
+        inner_path = outer_path = None
+        for path, _, _ in files:
+            folder = posixpath.dirname(path)
+            if folder == self._outer_folder:
+                outer_path = self._relative_path(path)
+            elif folder == self._inner_folder:
+                inner_path = self._relative_path(path)
+
+        digests = [digest for _, digest, _ in files if digest]
+        if len(digests) > 1:
+            digest = hashlib.sha256("".join(digests).encode()).hexdigest()
+        else:
+            digest = digests[0] if digests else None
 
-    def _write_input_to_txt_file(self, latex_input):
-        with open(self._latest_inputs_file, "a") as file:
-            file.write(latex_input)
+        artifact = Artifact(
+            outer_folder=self._outer_folder_name,
+            filename=filename,
+            kind=self._artifact_kind,
+            inner_path=inner_path,
+            outer_path=outer_path,
+            digest=digest,
+            size=sum(size for _, _, size in files),
+            generated_at=time.time(),
+            duration=time.perf_counter() - self._artifact_started,
+            latex_input=latex_input,
+        )
+        with track(self._artifact_kind, filename, "record"):
+            self._record(artifact)
+        self._begin_artifact()
+
+    def _record(self, artifact):
+        """Writes an artifact to the manifest and inputs summary"""
+        self._prepare_path(self._latest_inputs_file)
+        self._inputs_index.write(artifact)
+
+    def flush_inputs(self):
+        """
+        Records the pending artifacts of this instance's outer folder and
+        renders its latest_inputs.txt summary
+        """
+        self._inputs_index.flush()
 
     def _input_lines(self, filename):
         to_print = (
@@ -84,3 +847,73 @@ class LatexSaving(object):
             f"\\input{{{self._relative_outer_path(filename)}}} \n"
         )
         return to_print
+
+
+# keyword arguments of a batch item that construct the LatexSaving (Table,
+# Figure), the others are passed on to create_input_latex
+BATCH_ARGUMENTS = (
+    "folders_path",
+    "outer_folder_name",
+    "inner_folder_name",
+    "position",
+)
+
+
+def split_batch_options(options):
+    """
+    Splits the options of a batch item into the keyword arguments of the
+    LatexSaving and those of create_input_latex
+    """
+    saving_options = {k: v for k, v in options.items() if k in BATCH_ARGUMENTS}
+    input_options = {k: v for k, v in options.items() if k not in BATCH_ARGUMENTS}
+    return saving_options, input_options
+
+
+class BatchArtifacts(object):
+    """
+    Mixin for a LatexSaving exporting an item of a batch (e.g. in a worker
+    process), keeping its artifacts for record_batch instead of recording them
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.artifacts = []
+
+    def _record(self, artifact):
+        self.artifacts.append(artifact)
+
+
+def record_batch(saving_class, outcomes, printing_input=False):
+    """
+    Records the artifacts of a batch in the manifest and latest_inputs.txt,
+    in the order of the batch
+    Args
+    ----
+    saving_class: type
+        LatexSaving subclass the items were exported with, e.g. Table
+    outcomes: iterable
+        (options, latex_input, artifacts) of every item, latex_input is None
+        for the items that failed
+    printing_input: bool
+        Print the latex input of every item
+    """
+    with buffered_inputs():
+        for options, latex_input, artifacts in outcomes:
+            if artifacts:
+                recorder = saving_class(**split_batch_options(options)[0])
+                for artifact in artifacts:
+                    recorder._record(artifact)
+            if printing_input and latex_input is not None:
+                print(latex_input)
+
+
+def warn_batch_failures(failures, total, description):
+    """
+    Warns about the failed items of a batch, failures holding the name and
+    formatted traceback of each, e.g. "2 of 5 tables failed to export"
+    """
+    if failures:
+        details = "".join(f"\n{name}:\n{error}" for name, error in failures)
+        warnings.warn(
+            f"{len(failures)} of {total} {description}{details}", stacklevel=3
+        )
@@ -4,15 +4,73 @@ This module modifies the 'Table' class from 'pylatex'
     :license: MIT, see License for more details.
 """
 
+import sys
+import traceback
+from collections import namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
 from pylatex import Table as TableOriginal
 from pylatex import Tabular as TabularOriginal
 from pylatex import Package, NoEscape, UnsafeCommand, Command
 
 # from pylatex.base_classes import Arguments
-from pylatex.utils import fix_filename
-from .saving import LatexSaving
+from pylatex.utils import dumps_list, fix_filename
+from .hooks import track
+from .saving import (
+    BatchArtifacts,
+    LatexSaving,
+    record_batch,
+    split_batch_options,
+    warn_batch_failures,
+)
+from .templates import latex_arguments, latex_item
 from .float import FloatAdditions
-import pandas as pd
+from .tabular import (
+    _check_options,
+    dataframe_bodies,
+    dataframe_chunks,
+    dataframe_header,
+    numpy_tabular,
+    rows_chunks,
+    rows_per_page,
+    styler_format,
+    tabular_begin,
+    tabular_end,
+    tabular_header,
+)
+
+SPLITS = ("continued", "longtable")
+
+# options understood when a tabular is written in chunks or pages rather than
+# through Styler.to_latex
+DATAFRAME_OPTIONS = (
+    "column_format",
+    "hrules",
+    "engine",
+    "precision",
+    "thousands",
+    "na_rep",
+    "number_format",
+)
+ROWS_OPTIONS = ("column_format", "hrules", "precision")
+
+
+def _is_dataframe(tabular):
+    # a DataFrame can only exist once pandas got imported by the caller
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(tabular, pd.DataFrame)
+
+
+def _check_chunked_options(args, kwargs, supported, mode):
+    """Raises for Styler.to_latex options that mode cannot apply"""
+    unsupported = sorted(set(kwargs) - set(supported))
+    if args or unsupported:
+        options = ", ".join([*map(repr, args), *unsupported])
+        raise ValueError(
+            f"{mode} only supports the options {', '.join(supported)}, "
+            f"not the Styler.to_latex options {options}"
+        )
 
 
 class Table(FloatAdditions, LatexSaving, TableOriginal):
@@ -20,6 +78,14 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
     compared to parent TableOriginal
     """
 
+    _artifact_kind = "table"
+
+    # room for a table on a page and the height of a row in points, from
+    # which max_rows="auto" estimates the rows per page of a split table
+    page_height = 550.0
+    row_height = 12.0
+    continued_text = " (continued)"
+
     def __init__(
         self,
         *args,
@@ -27,31 +93,80 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
         outer_folder_name="Tables",
         inner_folder_name="Tabulars",
         position=None,
+        pretypesetter=None,
+        render_mode=None,
+        storage=None,
         **kwargs,
     ):
+        """
+        Args
+        ----
+        pretypesetter: Pretypesetter
+            Optional, every tabular is then compiled to a standalone PDF
+            which the table includes instead, see pythonlatex.pretypeset. It
+            should have the same folders_path.
+        render_mode: str
+            "tree" or "template", see FloatAdditions, defaults to
+            templates.default_render_mode
+        storage: LocalStorage, MemoryStorage
+            Storage the files are saved to, defaults to
+            saving.default_storage
+        """
 
         LatexSaving.__init__(
             self,
             outer_folder=outer_folder_name,
             inner_folder=inner_folder_name,
             folders_path=folders_path,
+            storage=storage,
         )
 
         TableOriginal.__init__(self, *args, position=position, **kwargs)
         self._label = "tbl"
+        self._position = position
+        self._continued = []
+        self._longtable = None
+        self.pretypesetter = pretypesetter
+        self.render_mode = render_mode
 
-    def _set_tabular(self, tabular, *args, **kwargs):
+    def _set_tabular(
+        self,
+        tabular,
+        *args,
+        engine="styler",
+        precision=None,
+        thousands=None,
+        na_rep=None,
+        number_format="fixed",
+        **kwargs,
+    ):
         """
-        TODO
+        Sets the tabular as a string, formatting a DataFrame with the given
+        engine ("styler" or the faster "numpy" for numeric DataFrames) and
+        formatting options (see tabular.styler_format)
         """
+        _check_options(engine, number_format)
+        formatting = {
+            "precision": precision,
+            "thousands": thousands,
+            "na_rep": na_rep,
+            "number_format": number_format,
+        }
         if isinstance(tabular, TabularOriginal):
             self.tabular = tabular.dumps()
 
         elif isinstance(tabular, str):
             self.tabular = tabular
 
-        elif isinstance(tabular, pd.DataFrame):
-            self.tabular = tabular.style.to_latex(*args, **kwargs)
+        else:
+            # pandas is only imported when the tabular is not a str or Tabular
+            import pandas as pd
+
+            if isinstance(tabular, pd.DataFrame) and engine == "numpy":
+                self.tabular = numpy_tabular(tabular, *args, **kwargs, **formatting)
+            elif isinstance(tabular, pd.DataFrame):
+                styler = tabular.style.format(**styler_format(**formatting))
+                self.tabular = styler.to_latex(*args, **kwargs)
 
     def _save_tabular(self, filename):
         try:
@@ -59,11 +174,244 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
         except AttributeError:
             raise AttributeError("No tabular set to save")
 
-        with open(self._absolute_inner_path(f"{filename}.tex"), "w+") as file:
-            file.write(self.tabular)
+        self._save_file(self._absolute_inner_path(f"{filename}.tex"), self.tabular)
+        self.tabular_path = self._absolute_inner_path(f"{filename}.tex")
 
         return self._relative_inner_path(filename)
 
+    def _streams(self, tabular, chunk_size):
+        """Whether tabular gets streamed rather than formatted as a whole"""
+        if isinstance(tabular, (str, TabularOriginal)):
+            return False
+        if _is_dataframe(tabular):
+            return chunk_size is not None
+        return hasattr(tabular, "__iter__")
+
+    def _stream_tabular(
+        self, tabular, filename, chunk_size=None, columns=None, **kwargs
+    ):
+        """
+        Formats and writes the tabular chunk by chunk straight into the inner
+        file, only the path of the tabular is kept afterwards
+        Args
+        ----
+        tabular: pandas.DataFrame, iterable
+            DataFrame or iterable of rows (e.g. a database cursor or
+            DataFrame.itertuples())
+        filename: str
+            Name of the tabular for saving
+        chunk_size: int
+            Number of rows formatted at once, defaults to 10000
+        columns: list
+            Header labels, required when tabular is an iterable of rows
+        kwargs:
+            column_format and hrules as in pd.DataFrame.style.to_latex, for a
+            DataFrame also engine and the formatting options of _set_tabular
+        """
+        if chunk_size is None:
+            chunk_size = 10000
+        if _is_dataframe(tabular):
+            chunks = dataframe_chunks(tabular, chunk_size, **kwargs)
+        elif columns is None:
+            raise ValueError("Streaming rows of a tabular requires their columns")
+        else:
+            chunks = rows_chunks(tabular, columns, chunk_size, **kwargs)
+
+        path = self._absolute_inner_path(f"{filename}.tex")
+        self._save_chunks(path, chunks)
+        self.tabular = None
+        self.tabular_path = path
+        return self._relative_inner_path(filename)
+
+    def _write_pages(
+        self,
+        tabular,
+        filename,
+        max_rows,
+        split,
+        column_format=None,
+        hrules=False,
+        engine="styler",
+        **formatting,
+    ):
+        """
+        Formats a DataFrame max_rows at a time, writing every page to its own
+        inner file ({filename}_1.tex, {filename}_2.tex, ...) as soon as it is
+        formatted, so only one page is held in memory
+        Args
+        ----
+        max_rows: int, str
+            Rows per page, "auto" estimates them from page_height and
+            row_height
+        split: str
+            "continued" writes every page as a full tabular, "longtable" only
+            the rows of every page
+        Returns
+        -------
+        tuple
+            The relative paths of the pages, the column format and the
+            header rows
+        """
+        if not _is_dataframe(tabular):
+            raise ValueError("Only a DataFrame can be split into pages")
+        column_format, header_rows = dataframe_header(tabular, column_format)
+        if max_rows == "auto":
+            max_rows = rows_per_page(
+                self.page_height, self.row_height, len(header_rows)
+            )
+
+        bodies = dataframe_bodies(tabular, max_rows, engine, **formatting)
+        if len(tabular) == 0:
+            bodies = iter([""])
+        paths = []
+        for number, body in enumerate(bodies, start=1):
+            if split == "continued":
+                body = (
+                    tabular_begin(column_format, header_rows, hrules)
+                    + body
+                    + tabular_end(hrules)
+                )
+            name = f"{filename}_{number}"
+            self._save_file(self._absolute_inner_path(f"{name}.tex"), body)
+            paths.append(self._relative_inner_path(name))
+        self._remove_pages(filename, len(paths) + 1)
+
+        self.tabular = None
+        self.tabular_path = self._absolute_inner_path(f"{filename}_1.tex")
+        return paths, column_format, header_rows
+
+    def _remove_pages(self, filename, first):
+        """Removes the pages from number first on, left by an earlier run"""
+        number = first
+        while True:
+            try:
+                path = self._absolute_inner_path(f"{filename}_{number}.tex")
+                self._storage.remove(path)
+            except FileNotFoundError:
+                break
+            number += 1
+
+    def _pretypeset(self, path, tabular_input):
+        """Submits the tabular to the pretypesetter, returning its pdf path"""
+        pdf_path = self.pretypesetter.submit(
+            path.replace("/", "-"), tabular_input, [f"{path}.tex"]
+        )
+        return NoEscape(fix_filename(pdf_path))
+
+    def _tabular_input_line(
+        self, path, resizebox, resizebox_arguments, adjustbox, adjustbox_arguments
+    ):
+        """The LaTeX of _tabular_input, in the template render mode"""
+        # only the package of the outer command counts, as in the tree
+        line, package = f"\\input{{{fix_filename(path)}}}", None
+        if self.pretypesetter is not None:
+            line = f"\\includegraphics{{{self._pretypeset(path, line)}}}"
+            package = "graphicx"
+        if resizebox:
+            line = f"\\resizebox{latex_arguments(resizebox_arguments)}{{{line}}}"
+            package = "graphics"
+        if adjustbox:
+            line = f"\\adjustbox{latex_arguments(adjustbox_arguments)}{{{line}}}"
+            package = "adjustbox"
+        if package is not None:
+            self._add_line_package(Package(package))
+        return line
+
+    def _tabular_input(
+        self, path, resizebox, resizebox_arguments, adjustbox, adjustbox_arguments
+    ):
+        tabular_input = NoEscape(StandAloneTabular(filename=fix_filename(path)).dumps())
+        if self.pretypesetter is not None:
+            tabular_input = Command(
+                "includegraphics",
+                self._pretypeset(path, tabular_input),
+                packages=[Package("graphicx")],
+            )
+        # tabular_input = "test"
+        if resizebox:
+            tabular_input = Command(
+                command="resizebox",
+                arguments=resizebox_arguments,
+                extra_arguments=tabular_input,
+                packages=[Package("graphics")],
+            )
+
+        if adjustbox:
+            tabular_input = Command(
+                command="adjustbox",
+                arguments=adjustbox_arguments,
+                extra_arguments=tabular_input,
+                packages=[Package("adjustbox")],
+            )
+        return tabular_input
+
+    def _continued_caption(self, caption):
+        """The caption of the continued pages, left out of the list of tables"""
+        return Command(
+            "caption",
+            dumps_list([caption, self.continued_text], token=""),
+            options=NoEscape(""),
+        )
+
+    def _add_continued(self, paths, caption, above, placement, input_arguments):
+        """Adds a continued float (same number, see the caption package) per page"""
+        self.packages.add(Package("caption"))
+        for path in paths:
+            part = TableOriginal(position=self._position)
+            part.append(Command("ContinuedFloat"))
+            if caption is not None and above:
+                part.append(self._continued_caption(caption))
+            if placement is not None:
+                part.append(placement)
+            part.append(self._tabular_input(path, *input_arguments))
+            if caption is not None and not above:
+                part.append(self._continued_caption(caption))
+            self._continued.append(part)
+
+    def _set_longtable(
+        self,
+        paths,
+        column_format,
+        header_rows,
+        hrules,
+        caption,
+        description,
+        above,
+        label,
+        zref,
+    ):
+        """Sets a longtable inputting the rows of every page, repeating the header"""
+        self.packages.add(Package("longtable"))
+        header = tabular_header(header_rows, hrules)
+        first_caption = continued_caption = ""
+        if caption is not None:
+            if zref:
+                self.packages.add(Package("zref-user"))
+            lbl = "zlabel" if zref else "label"
+            first_caption = (
+                Command("caption", caption).dumps()
+                + Command(lbl, NoEscape(f"{self._label}:{label}")).dumps()
+                + " \\\\\n"
+            )
+            if description:
+                first_caption += Command("caption*", description).dumps() + " \\\\\n"
+            continued_caption = self._continued_caption(caption).dumps() + " \\\\\n"
+
+        bottom_rule = "\\bottomrule\n" if hrules else ""
+        lines = [f"\\begin{{longtable}}{{{column_format}}}\n"]
+        if above:
+            lines += [first_caption, header, "\\endfirsthead\n"]
+            lines += [continued_caption, header, "\\endhead\n", bottom_rule]
+        else:
+            lines += [header, "\\endhead\n", bottom_rule, first_caption]
+        lines += ["\\endlastfoot\n"]
+        lines += [
+            StandAloneTabular(filename=fix_filename(path)).dumps() + "\n"
+            for path in paths
+        ]
+        lines += ["\\end{longtable}"]
+        self._longtable = NoEscape("".join(lines))
+
     def add_table(
         self,
         tabular,
@@ -79,6 +427,10 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
         resizebox_arguments=(NoEscape(r"\columnwidth"), NoEscape("!")),
         adjustbox=True,
         adjustbox_arguments=NoEscape(r"max totalsize={\textwidth}{0.95\textheight}"),
+        chunk_size=None,
+        columns=None,
+        max_rows=None,
+        split="continued",
         **kwargs,
     ):
         """Add a table/panel.
@@ -88,44 +440,109 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
             Filename of the image.
         placement: str
             Placement of the table, `None` is also accepted.
+        chunk_size: int
+            If given, a DataFrame is formatted and written chunk_size rows at a
+            time instead of as a whole. Iterables of rows (e.g. a database
+            cursor or DataFrame.itertuples()) are always streamed this way.
+        columns: list
+            Header labels of the rows, when tabular is an iterable of rows
+        max_rows: int, str
+            If given, a DataFrame is split into pages of max_rows rows (or as
+            many as estimated to fit on a page with "auto"), each saved to
+            its own inner file
+        split: str
+            How the pages of a split DataFrame are set: "continued" adds a
+            float per page continuing the numbering of the first, "longtable"
+            a single longtable that repeats the header on every page
+        kwargs:
+            Passed on to pd.DataFrame.style.to_latex, except for the engine
+            ("styler" or "numpy", which formats numeric DataFrames column by
+            column and much faster) and the formatting options precision,
+            thousands, na_rep and number_format ("fixed", "percent" or
+            "scientific") that apply to both engines. A streamed or split
+            DataFrame is not formatted by the Styler and only takes
+            column_format, hrules, the engine and the formatting options,
+            streamed rows only column_format, hrules and precision; other
+            options raise a ValueError.
         """
         if resizebox & adjustbox:
             raise Exception("Cannot have both resizebox and adjustbox")
         if label is None:
             label = filename
 
-        self._set_tabular(tabular, *args, **kwargs)
-        path = self._save_tabular(filename)
-
-        if placement is not None:
-            self.append(placement)
-
-        tabular_input = NoEscape(StandAloneTabular(filename=fix_filename(path)).dumps())
-        # tabular_input = "test"
-        if resizebox:
-            tabular_input = Command(
-                command="resizebox",
-                arguments=resizebox_arguments,
-                extra_arguments=tabular_input,
-                packages=[Package("graphics")],
+        if max_rows is not None:
+            if split not in SPLITS:
+                raise ValueError(f"split should be one of {SPLITS}, not {split!r}")
+            _check_chunked_options(
+                args, kwargs, DATAFRAME_OPTIONS, "Splitting a table (max_rows)"
             )
-
-        if adjustbox:
-            tabular_input = Command(
-                command="adjustbox",
-                arguments=adjustbox_arguments,
-                extra_arguments=tabular_input,
-                packages=[Package("adjustbox")],
+            paths, column_format, header_rows = self._write_pages(
+                tabular, filename, max_rows, split, **kwargs
             )
-
-        self.append(tabular_input)
+            if split == "longtable":
+                self._set_longtable(
+                    paths,
+                    column_format,
+                    header_rows,
+                    kwargs.get("hrules", False),
+                    caption,
+                    description,
+                    above,
+                    label,
+                    zref,
+                )
+                return
+            path, continued = paths[0], paths[1:]
+        elif self._streams(tabular, chunk_size):
+            _check_chunked_options(
+                args,
+                kwargs,
+                DATAFRAME_OPTIONS if _is_dataframe(tabular) else ROWS_OPTIONS,
+                "Streaming a table (chunk_size)",
+            )
+            path = self._stream_tabular(
+                tabular, filename, chunk_size, columns, **kwargs
+            )
+        else:
+            with track(self._artifact_kind, filename, "tabular"):
+                self._set_tabular(tabular, *args, **kwargs)
+            path = self._save_tabular(filename)
+
+        input_arguments = (
+            resizebox,
+            resizebox_arguments,
+            adjustbox,
+            adjustbox_arguments,
+        )
+        lines = self._template_lines()
+        if lines is not None:
+            if placement is not None:
+                lines.append(latex_item(placement))
+            lines.append(self._tabular_input_line(path, *input_arguments))
+        else:
+            if placement is not None:
+                self.append(placement)
+            self.append(self._tabular_input(path, *input_arguments))
 
         if caption is not None:
             self.add_caption_description_label(caption, label, above, description, zref)
 
+        if max_rows is not None:
+            self._add_continued(continued, caption, above, placement, input_arguments)
+
+    def dumps(self):
+        """Represents the table, or its longtable, and the continued floats"""
+        if self._longtable is not None:
+            return self._longtable
+        return "\n".join([super().dumps(), *(part.dumps() for part in self._continued)])
+
     def reset(self):
         self.data = []
         self.tabular = None
+        self.tabular_path = None
+        self._continued = []
+        self._longtable = None
+        self._lines = None
 
     def create_input_latex(
         self,
@@ -167,6 +584,10 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
             Extension of image file indicating table file type
         kwargs:
             Keyword arguments passed to plt.savefig for displaying the plot.
+            chunk_size and columns are passed on to add_table for streaming
+            large DataFrames or iterables of rows, engine and the formatting
+            options for formatting DataFrames, max_rows and split for
+            splitting them into pages.
         """
         # create automatic caption
         if caption is None:
@@ -177,6 +598,7 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
             caption = None
 
         if add_table:
+            self._begin_artifact()
             self.add_table(
                 tabular,
                 filename,
@@ -196,11 +618,12 @@ class Table(FloatAdditions, LatexSaving, TableOriginal):
             self.add_caption_description_label(caption, label, above, description, zref)
 
         # creating + opening the file
-        with open(self._absolute_outer_path(f"{filename}.tex"), "w") as tex_file:
-            tex_file.write(self.dumps())
+        with track(self._artifact_kind, filename, "dumps"):
+            latex = self.dumps()
+        self._save_file(self._absolute_outer_path(f"{filename}.tex"), latex)
 
         latex_input = self._input_lines(filename)
-        self._write_input_to_txt_file(latex_input)
+        self._record_input(filename, latex_input)
 
         if reset:
             self.reset()
@@ -237,3 +660,94 @@ class StandAloneTabular(UnsafeCommand):
         arguments = [NoEscape(filename)]
 
         super().__init__(command=self._latex_name, arguments=arguments)
+
+
+ExportResult = namedtuple("ExportResult", ["name", "latex_input", "error"])
+ExportResult.__doc__ = """
+The outcome of exporting one table in a batch, error holds the formatted
+traceback if it failed (and latex_input is None)
+"""
+
+
+class _BatchTable(BatchArtifacts, Table):
+    """A Table keeping its artifacts, for the batch to record them in order"""
+
+
+def _export_table(name, tabular, options):
+    """
+    Writes the inner and outer file of one table, returns the latex input and
+    the artifacts to record or the formatted traceback of the failure
+    """
+    table_options, input_options = split_batch_options(options)
+    try:
+        table = _BatchTable(**table_options)
+        table.create_input_latex(tabular, name, printing_input=False, **input_options)
+    except Exception:
+        return None, [], traceback.format_exc()
+    latex_input = table.artifacts[-1].latex_input
+    return latex_input, table.artifacts, None
+
+
+def _batch_items(tables, defaults):
+    items = tables.items() if isinstance(tables, Mapping) else tables
+    for item in items:
+        if isinstance(tables, Mapping) and not isinstance(item[1], tuple):
+            name, tabular, options = *item, {}
+        elif isinstance(tables, Mapping):
+            name, (tabular, options) = item
+        else:
+            name, tabular, *rest = item
+            options = rest[0] if rest else {}
+        yield name, tabular, {**defaults, **(options or {})}
+
+
+def export_tables(
+    tables, max_workers=None, mp_context=None, printing_input=False, **defaults
+):
+    """
+    Exports a batch of tables across a pool of worker processes, each the
+    same as Table(...).create_input_latex(tabular, name, ...)
+    The inner and outer files are written by the workers, the inputs are
+    recorded in the manifest and latest_inputs.txt afterwards in the order of
+    the batch. A failing table does not abort the others, failures are
+    reported in a warning and in the returned results.
+    Args
+    ----
+    tables: dict, iterable
+        Mapping of name to tabular (or to a (tabular, options) tuple), or an
+        iterable of (name, tabular) or (name, tabular, options) tuples
+    max_workers: int
+        Number of worker processes, defaults to the cpu count, 1 exports the
+        tables in this process
+    mp_context:
+        Optional multiprocessing context for the worker pool
+    printing_input: bool
+        Print the latex input of every table, in the order of the batch
+    defaults:
+        Options for every table, overridden by the options of a table.
+        folders_path, outer_folder_name, inner_folder_name and position go to
+        the Table, the others to create_input_latex
+    Returns
+    -------
+    list
+        An ExportResult per table, in the order of the batch
+    """
+    items = list(_batch_items(tables, defaults))
+    if max_workers == 1:
+        outcomes = [_export_table(*item) for item in items]
+    else:
+        with ProcessPoolExecutor(max_workers, mp_context=mp_context) as executor:
+            futures = [executor.submit(_export_table, *item) for item in items]
+            outcomes = [future.result() for future in futures]
+
+    results, recorded = [], []
+    for (name, _, options), (latex_input, artifacts, error) in zip(items, outcomes):
+        results.append(ExportResult(name, latex_input, error))
+        recorded.append((options, latex_input, artifacts))
+    record_batch(Table, recorded, printing_input)
+    warn_batch_failures(
+        [(result.name, result.error) for result in results if result.error],
+        len(results),
+        "tables failed to export",
+    )
+    return results
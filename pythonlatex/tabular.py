@@ -0,0 +1,358 @@
+"""
+This module writes LaTeX tabulars in chunks, producing the same output as
+pandas' Styler.to_latex without ever holding the full tabular in memory,
+and formats numeric DataFrames column by column with numpy as a fast
+alternative to the per-cell formatting of the Styler
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from itertools import islice
+from numbers import Integral, Number, Real
+
+ENGINES = ("styler", "numpy")
+NUMBER_FORMATS = ("fixed", "percent", "scientific")
+
+
+def default_formatter(value, precision=6, thousands=False):
+    """
+    Formats a single cell like the default formatter of pandas' Styler
+    Args
+    ----
+    value:
+        The cell value
+    precision: int
+        Number of decimals of floats
+    thousands: bool
+        Whether to group the digits of numbers with a ","
+    """
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, Integral):
+        return f"{value:,}" if thousands else str(value)
+    if isinstance(value, (Real, complex)):
+        return f"{value:,.{precision}f}" if thousands else f"{value:.{precision}f}"
+    return str(value)
+
+
+def _check_options(engine="styler", number_format="fixed"):
+    if engine not in ENGINES:
+        raise ValueError(f"engine should be one of {ENGINES}, not {engine!r}")
+    if number_format not in NUMBER_FORMATS:
+        raise ValueError(
+            f"number_format should be one of {NUMBER_FORMATS}, not {number_format!r}"
+        )
+
+
+def _default_precision():
+    import pandas as pd
+
+    return pd.get_option("styler.format.precision")
+
+
+def styler_format(precision=None, thousands=None, na_rep=None, number_format="fixed"):
+    """
+    Returns the keyword arguments of Styler.format for the formatting options
+    Args
+    ----
+    precision: int
+        Number of decimals, defaults to the styler.format.precision option
+    thousands: str
+        Separator grouping the digits of fixed formatted numbers, e.g. ","
+    na_rep: str
+        Representation of missing values
+    number_format: str
+        "fixed", "percent" (the value times 100 followed by "%") or
+        "scientific"
+    """
+    _check_options(number_format=number_format)
+    if number_format == "fixed":
+        return {"precision": precision, "thousands": thousands, "na_rep": na_rep}
+    if precision is None:
+        precision = _default_precision()
+    code = "%" if number_format == "percent" else "e"
+    return {
+        "formatter": f"{{:.{precision}{code}}}",
+        "thousands": thousands,
+        "na_rep": na_rep,
+    }
+
+
+def cell_formatter(precision=None, thousands=None, na_rep=None, number_format="fixed"):
+    """
+    Returns a function formatting a single cell like Styler.format does with
+    the same options, see styler_format
+    """
+    from pandas import isna
+
+    _check_options(number_format=number_format)
+    if precision is None:
+        precision = _default_precision()
+    code = {"percent": "%", "scientific": "e"}.get(number_format)
+
+    def formatter(value):
+        if na_rep is not None and isna(value):
+            return na_rep
+        if code is not None:
+            return f"{value:.{precision}{code}}" if _is_numeric(value) else str(value)
+        text = default_formatter(value, precision, thousands is not None)
+        if thousands is not None and _is_numeric(value):
+            text = text.replace(",", thousands)
+        return text
+
+    return formatter
+
+
+def _is_numeric(value):
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def tabular_header(header_rows, hrules=False):
+    """Returns the header lines of a tabular, with the rules around them"""
+    lines = ["\\toprule\n"] if hrules else []
+    lines.extend(f"{' & '.join(row)} \\\\\n" for row in header_rows)
+    if hrules:
+        lines.append("\\midrule\n")
+    return "".join(lines)
+
+
+def tabular_begin(column_format, header_rows, hrules=False):
+    """Returns the lines opening a tabular, up to and including the header"""
+    return f"\\begin{{tabular}}{{{column_format}}}\n" + tabular_header(
+        header_rows, hrules
+    )
+
+
+def tabular_end(hrules=False):
+    """Returns the lines closing a tabular"""
+    return ("\\bottomrule\n" if hrules else "") + "\\end{tabular}\n"
+
+
+def format_rows(rows, precision=6):
+    """Formats an iterable of row sequences into the body lines of a tabular"""
+    return "".join(
+        " & ".join(default_formatter(value, precision) for value in row) + " \\\\\n"
+        for row in rows
+    )
+
+
+def _check_single_level(df):
+    if df.index.nlevels > 1 or df.columns.nlevels > 1:
+        raise ValueError(
+            "Streaming tabulars only support a single level index and columns"
+        )
+
+
+def dataframe_header(df, column_format=None):
+    """
+    Returns the column format and header rows Styler.to_latex uses for df
+    """
+    from pandas.api.types import is_numeric_dtype
+
+    _check_single_level(df)
+    if column_format is None:
+        column_format = "l" + "".join(
+            "r" if is_numeric_dtype(dtype) else "l" for dtype in df.dtypes
+        )
+
+    columns_name = "" if df.columns.name is None else str(df.columns.name)
+    header_rows = [[columns_name, *(str(column) for column in df.columns)]]
+    if df.index.name is not None:
+        header_rows.append([str(df.index.name), *("" for _ in df.columns)])
+    return column_format, header_rows
+
+
+def _format_all(template, values):
+    """Formats a list of values with one call on the template repeated"""
+    if not values:
+        return []
+    if "%" in template:
+        text = (template * len(values)) % tuple(values)
+    else:
+        text = (template * len(values)).format(*values)
+    return text.split("\n")[:-1]
+
+
+def format_column(
+    values, precision=6, thousands=None, na_rep=None, number_format="fixed"
+):
+    """
+    Formats a numeric numpy array as a whole, matching Styler.format with the
+    same options, see styler_format
+    Returns
+    -------
+    list
+        The formatted cells
+    """
+    import numpy as np
+
+    is_float = values.dtype.kind == "f"
+    if number_format == "percent":
+        values = values.astype(float) * 100
+        template = f"%.{precision}f%%\n"
+    elif number_format == "scientific":
+        values = values.astype(float)
+        template = f"%.{precision}e\n"
+    elif thousands is not None:
+        template = f"{{:,.{precision}f}}\n" if is_float else "{:,d}\n"
+    else:
+        template = f"%.{precision}f\n" if is_float else "%d\n"
+
+    cells = _format_all(template, values.tolist())
+    if thousands not in (None, ",") and number_format == "fixed":
+        cells = [cell.replace(",", thousands) for cell in cells]
+    if na_rep is not None and is_float:
+        for position in np.flatnonzero(np.isnan(values)).tolist():
+            cells[position] = na_rep
+    return cells
+
+
+def _format_index(index, precision):
+    if index.dtype.kind in "iu":
+        return _format_all("%d\n", index.tolist())
+    if index.dtype.kind == "f":
+        return _format_all(f"%.{precision}f\n", index.tolist())
+    return [default_formatter(label, precision) for label in index]
+
+
+def numpy_rows(
+    df, precision=None, thousands=None, na_rep=None, number_format="fixed"
+):
+    """
+    Formats the body lines of a numeric DataFrame column by column, the same
+    as Styler.format(...).to_latex but without formatting cell by cell
+    """
+    import numpy as np
+
+    _check_options(number_format=number_format)
+    index_precision = _default_precision()
+    if precision is None:
+        precision = index_precision
+
+    columns = [_format_index(df.index, index_precision)]
+    for column, dtype in df.dtypes.items():
+        if not isinstance(dtype, np.dtype) or dtype.kind not in "iuf":
+            raise ValueError(
+                f"The numpy engine only formats int and float columns, column "
+                f"{column!r} is {dtype}, use engine='styler' instead"
+            )
+        values = df[column].to_numpy()
+        columns.append(
+            format_column(values, precision, thousands, na_rep, number_format)
+        )
+    return "".join([" & ".join(row) + " \\\\\n" for row in zip(*columns)])
+
+
+def numpy_tabular(df, column_format=None, hrules=False, **formatting):
+    """
+    Returns the tabular of a numeric DataFrame, matching
+    df.style.format(**styler_format(**formatting)).to_latex(
+        column_format=..., hrules=...
+    )
+    """
+    column_format, header_rows = dataframe_header(df, column_format)
+    return (
+        tabular_begin(column_format, header_rows, hrules)
+        + numpy_rows(df, **formatting)
+        + tabular_end(hrules)
+    )
+
+
+def dataframe_bodies(df, chunk_size=10000, engine="styler", **formatting):
+    """
+    Yields the body lines of the tabular of a DataFrame, formatting
+    chunk_size rows at a time
+    Args
+    ----
+    engine: str
+        "styler" formats cell by cell, "numpy" column by column (numeric
+        DataFrames only)
+    formatting:
+        precision, thousands, na_rep and number_format as in styler_format
+    """
+    _check_options(engine)
+    precision = _default_precision()
+    if engine == "styler":
+        formatter = cell_formatter(**formatting)
+
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        if engine == "numpy":
+            yield numpy_rows(chunk, **formatting)
+        elif formatting:
+            yield "".join(
+                " & ".join([default_formatter(index, precision), *map(formatter, row)])
+                + " \\\\\n"
+                for index, *row in chunk.itertuples(index=True, name=None)
+            )
+        else:
+            yield format_rows(chunk.itertuples(index=True, name=None), precision)
+
+
+def dataframe_chunks(
+    df,
+    chunk_size=10000,
+    column_format=None,
+    hrules=False,
+    engine="styler",
+    **formatting,
+):
+    """
+    Yields the tabular of a DataFrame in parts, formatting chunk_size rows at
+    a time, matching df.style.to_latex(column_format=..., hrules=...)
+    Args
+    ----
+    engine, formatting:
+        As in dataframe_bodies
+    """
+    column_format, header_rows = dataframe_header(df, column_format)
+    yield tabular_begin(column_format, header_rows, hrules)
+    yield from dataframe_bodies(df, chunk_size, engine, **formatting)
+    yield tabular_end(hrules)
+
+
+def rows_per_page(page_height=550.0, row_height=12.0, header_rows=1, reserved_rows=4):
+    """
+    Estimates how many body rows of a tabular fit on a page
+    Args
+    ----
+    page_height: float
+        Height available for the table in points, e.g. the \\textheight
+    row_height: float
+        Height of a row in points, the \\baselineskip times the
+        \\arraystretch
+    header_rows: int
+        Number of header rows repeated on every page
+    reserved_rows: int
+        Rows worth of height kept free for the caption and rules
+    """
+    return max(1, int(page_height // row_height) - header_rows - reserved_rows)
+
+
+def rows_chunks(
+    rows, columns, chunk_size=10000, column_format=None, hrules=False, precision=6
+):
+    """
+    Yields the tabular of an iterable of rows (e.g. a database cursor or
+    DataFrame.itertuples) in parts of chunk_size rows
+    Args
+    ----
+    rows: iterable
+        Sequences of cell values, one per row
+    columns: list
+        Header labels, one for every cell of a row
+    column_format: str
+        Defaults to "r" for columns of which the first row holds a number
+        and "l" for the others
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, chunk_size))
+    if column_format is None:
+        first = chunk[0] if chunk else [None] * len(columns)
+        column_format = "".join("r" if _is_numeric(value) else "l" for value in first)
+
+    yield tabular_begin(column_format, [[str(column) for column in columns]], hrules)
+    while chunk:
+        yield format_rows(chunk, precision)
+        chunk = list(islice(rows, chunk_size))
+    yield tabular_end(hrules)
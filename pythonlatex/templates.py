@@ -0,0 +1,128 @@
+"""Template rendering of float environments, without building a pylatex tree.
+
+..  :copyright: (c) 2019 by Jordy Rillaerts.
+    :license: MIT, see License for more details.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from pylatex import NoEscape
+from pylatex.utils import dumps_list, escape_latex
+
+if TYPE_CHECKING:
+    import jinja2
+
+RENDER_MODES = ("tree", "template")
+
+#: render mode of the floats that do not set one themselves, "tree" dumps the
+#: pylatex object tree and "template" renders the float lines with Jinja2
+default_render_mode = "tree"
+
+# the same layout as pylatex's Environment.dumps, every line of the float is
+# followed by a "%" to not introduce spaces
+_FLOAT_TEMPLATE = r"""\begin{<< environment >>}<< options >><< arguments >>%
+<< lines | join(separator) >>%
+\end{<< environment >>}"""
+
+
+def check_render_mode(render_mode: str) -> None:
+    """Raise a ValueError for an unknown render mode."""
+    if render_mode not in RENDER_MODES:
+        msg = f"render_mode should be one of {RENDER_MODES}, not {render_mode!r}"
+        raise ValueError(msg)
+
+
+def set_default_render_mode(render_mode: str) -> None:
+    """Set the render mode of every float that does not set one itself.
+
+    Args:
+        render_mode: "tree" (the default) or "template"
+
+    """
+    global default_render_mode
+    check_render_mode(render_mode)
+    default_render_mode = render_mode
+
+
+@lru_cache(maxsize=None)
+def _float_template() -> jinja2.Template:
+    """Compile the float template once, with delimiters that are no LaTeX."""
+    import jinja2
+
+    environment = jinja2.Environment(
+        block_start_string="<%",
+        block_end_string="%>",
+        variable_start_string="<<",
+        variable_end_string=">>",
+        comment_start_string="<#",
+        comment_end_string="#>",
+        autoescape=False,
+    )
+    return environment.from_string(_FLOAT_TEMPLATE)
+
+
+def latex_item(value: object, escape: bool = True) -> str:
+    """Return value as LaTeX the way pylatex dumps an item of a list."""
+    if isinstance(value, NoEscape):
+        return value
+    if isinstance(value, str):
+        return escape_latex(value) if escape else value
+    return dumps_list([value], escape=escape)
+
+
+def latex_arguments(arguments: object, escape: bool = True) -> str:
+    """Return the {...}{...} of the arguments of a pylatex Command."""
+    if arguments is None:
+        return ""
+    if hasattr(arguments, "dumps"):
+        return arguments.dumps()
+    if isinstance(arguments, str) or not hasattr(arguments, "__iter__"):
+        arguments = [arguments]
+    return "".join(f"{{{latex_item(argument, escape)}}}" for argument in arguments)
+
+
+def latex_options(options: object, escape: bool = True) -> str:
+    """Return the [...] of the options of a pylatex Command."""
+    if options is None:
+        return ""
+    if hasattr(options, "dumps"):
+        return options.dumps()
+    if isinstance(options, str) or not hasattr(options, "__iter__"):
+        options = [options]
+    options = [latex_item(option, escape) for option in options]
+    return f"[{','.join(options)}]" if options else ""
+
+
+def latex_command(name: str, arguments: object = None, escape: bool = True) -> str:
+    """Return \\name{arguments} the way a pylatex Command dumps it."""
+    return f"\\{name}{latex_arguments(arguments, escape)}"
+
+
+def render_float(
+    environment: str,
+    lines: list[str],
+    options: object = None,
+    arguments: object = None,
+) -> str:
+    """Render a float environment from the LaTeX of its lines.
+
+    Args:
+        environment: Name of the environment, e.g. "figure"
+        lines: The LaTeX of every item in the float, in order
+        options: Options of the environment, e.g. a position "h"
+        arguments: Arguments of the environment, e.g. a width
+
+    Returns:
+        The same string as dumping the pylatex float holding these items
+
+    """
+    return _float_template().render(
+        environment=environment,
+        options=latex_options(options),
+        arguments=latex_arguments(arguments),
+        lines=lines,
+        separator="%\n",
+    )
@@ -4,18 +4,34 @@ This module modifies the 'Figure' class from 'pylatex'
     :license: MIT, see License for more details.
 """
 
+import atexit
+import hashlib
+import re
+
 from pylatex import NoEscape
-from .saving import LatexSaving
-from numpy import round
+from .hooks import track
+from .saving import LatexSaving, buffered_inputs
 
 
 class Value(LatexSaving):
-    """A class that represents a Value"""
+    """A class that represents a Value
+
+    By default every value is saved in its own .tex file. With
+    consolidated=True the values are gathered in memory instead and flushed
+    in one go to a single file of keyed macros, which is input once in the
+    preamble, after which each value is used as \\pyval{filename}.
+    """
+
+    _artifact_kind = "value"
+    macro_name = "pyval"
 
     def __init__(
         self,
         folders_path="Latex/",
         outer_folder_name="Values",
+        consolidated=False,
+        values_filename="values",
+        storage=None,
     ):
 
         LatexSaving.__init__(
@@ -23,7 +39,29 @@ class Value(LatexSaving):
             outer_folder=outer_folder_name,
             inner_folder=outer_folder_name,
             folders_path=folders_path,
+            storage=storage,
         )
+        self.consolidated = consolidated
+        self.values_filename = values_filename
+        self._pending_values = {}
+        self._pending_inputs = {}
+
+    def _format_value(self, value, rounding=None, vformat=None):
+        if not isinstance(value, str):
+            if isinstance(value, int):
+                value = str(value)
+            else:
+                if vformat:
+                    value = f"{{{vformat}}}".format(value)
+                elif rounding:
+                    from numpy import round
+
+                    value = str(round(value, rounding))
+                else:
+                    raise ValueError(
+                        "Value should be of type int or string, if float a rounding or format needs to be provided"
+                    )
+        return value
 
     def create_input_latex(
         self, value, filename, printing_input=True, rounding=None, vformat=None
@@ -40,33 +78,117 @@ class Value(LatexSaving):
         kwargs:
             Keyword arguments passed to plt.savefig for displaying the plot.
         """
+        self._begin_artifact()
+        with track(self._artifact_kind, filename, "format"):
+            value = self._format_value(value, rounding, vformat)
 
-        if not isinstance(value, str):
-            if isinstance(value, int):
-                value = str(value)
-            else:
-                if vformat:
-                    value = f"{{{vformat}}}".format(value)
-                elif rounding:
-                    value = str(round(value, rounding))
-                else:
-                    raise ValueError(
-                        "Value should be of type int or string, if float a rounding or format needs to be provided"
-                    )
-
-        # creating + opening the file
-        with open(self._absolute_outer_path(f"{filename}.tex"), "w") as tex_file:
-            tex_file.write(value)
-            tex_file.write("%")
-
-        latex_input = self._input_lines(filename)
-        self._write_input_to_txt_file(latex_input)
+        if self.consolidated:
+            # kept in memory until flush, the last value for a key wins, only
+            # pending values keep the instance alive to be flushed at exit
+            if not self._pending_values:
+                atexit.register(self.flush)
+            self._pending_values[filename] = value
+            latex_input = self._macro_lines(filename)
+            self._pending_inputs[filename] = latex_input
+        else:
+            # saving the file, left untouched if the value did not change
+            self._save_file(
+                self._absolute_outer_path(f"{filename}.tex"), f"{value}%"
+            )
+            latex_input = self._input_lines(filename)
+            self._record_input(filename, latex_input)
 
         if printing_input:
             print(latex_input)
         return None
         # return NoEscape(latex_input)
 
+    def _macro_lines(self, filename):
+        to_print = (
+            f"\n% Latex value: {filename} %\n"
+            f"\\{self.macro_name}{{{filename}}} \n"
+        )
+        return to_print
+
+    @property
+    def _values_file(self):
+        return self._absolute_outer_path(f"{self.values_filename}.tex")
+
+    def _read_values_file(self):
+        """Reads the key/value entries from an existing values file, in order"""
+        pattern = re.compile(
+            rf"^\\{self.macro_name}set{{(?P<key>[^}}]*)}}{{(?P<value>.*)}}%$"
+        )
+        try:
+            lines = self._storage.read(self._values_file).decode("utf-8").splitlines()
+        except FileNotFoundError:
+            return {}
+
+        values = {}
+        for line in lines:
+            match = pattern.match(line)
+            if match:
+                values[match["key"]] = match["value"]
+        return values
+
+    def _values_file_content(self, values):
+        name = self.macro_name
+        lines = [
+            "% Values generated by pythonlatex, input this file in the preamble %",
+            f"\\providecommand{{\\{name}}}[1]{{\\ifcsname {name}@#1\\endcsname"
+            f"\\csname {name}@#1\\endcsname\\else\\textbf{{??#1??}}\\fi}}%",
+            f"\\providecommand{{\\{name}set}}[2]"
+            f"{{\\expandafter\\def\\csname {name}@#1\\endcsname{{#2}}}}%",
+        ]
+        lines.extend(
+            f"\\{name}set{{{key}}}{{{value}}}%" for key, value in values.items()
+        )
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Writes the gathered values to the consolidated values file
+
+        Entries already in the file are replaced in place by key, new keys are
+        added at the end, so reruns keep a stable file. The file is left
+        untouched when no value changed.
+        Returns
+        -------
+        bool
+            True if the values file was written
+        """
+        if not self._pending_values:
+            return False
+
+        # read-modify-write under a lock, other processes may flush as well
+        with self._storage.lock(self._values_file):
+            values = self._read_values_file()
+            values.update(self._pending_values)
+            written = self._save_file(
+                self._values_file, self._values_file_content(values)
+            )
+        # every key is recorded as its own artifact, living in the values
+        # file, the manifest is written once for all of them
+        with buffered_inputs():
+            self._record_input(
+                self.values_filename, self._input_lines(self.values_filename)
+            )
+            for key, latex_input in self._pending_inputs.items():
+                value = self._pending_values[key].encode("utf-8")
+                digest = hashlib.sha256(value).hexdigest()
+                self._record_input(
+                    key, latex_input, files=[(self._values_file, digest, len(value))]
+                )
+        self._pending_values = {}
+        self._pending_inputs = {}
+        atexit.unregister(self.flush)
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
     def __call__(
         self, value, filename, printing_input=True, rounding=None, vformat=None
     ):
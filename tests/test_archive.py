@@ -0,0 +1,102 @@
+from pythonlatex import ArchiveStorage, Table, Value
+
+import unittest
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+
+import pandas as pd
+
+FOLDERS_PATH = "Latex/test_archive/"
+
+
+def export(storage):
+    value = Value(folders_path=FOLDERS_PATH, storage=storage)
+    value(1, "first", printing_input=False)
+    value(2, "second", printing_input=False)
+    with Value(folders_path=FOLDERS_PATH, consolidated=True, storage=storage) as values:
+        values(3, "third", printing_input=False)
+    table = Table(folders_path=FOLDERS_PATH, storage=storage)
+    table.create_input_latex("a & b", "small", printing_input=False)
+    # streamed chunk by chunk into the archive
+    df = pd.DataFrame({"x": range(50), "y": range(50)})
+    table.create_input_latex(df, "streamed", chunk_size=10, printing_input=False)
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(FOLDERS_PATH, ignore_errors=True)
+
+    def test_zip(self):
+        buffer = io.BytesIO()
+        with ArchiveStorage(buffer, root=FOLDERS_PATH) as storage:
+            export(storage)
+        self.assertFalse(os.path.exists(FOLDERS_PATH))
+
+        with zipfile.ZipFile(buffer) as archive:
+            names = archive.namelist()
+            self.assertEqual(len(names), len(set(names)))
+            self.assertEqual(
+                sorted(names),
+                [
+                    "Tables/latest_inputs.txt",
+                    "Tables/small.tex",
+                    "Tables/streamed.tex",
+                    "Tabulars/small.tex",
+                    "Tabulars/streamed.tex",
+                    "Values/first.tex",
+                    "Values/latest_inputs.txt",
+                    "Values/second.tex",
+                    "Values/values.tex",
+                ],
+            )
+            self.assertEqual(archive.read("Values/first.tex"), b"1%")
+            self.assertIn(b"\\input{Tabulars/small}", archive.read("Tables/small.tex"))
+            self.assertIn(b"49 & 49", archive.read("Tabulars/streamed.tex"))
+            summary = archive.read("Values/latest_inputs.txt").decode()
+            for name in ("first", "second", "values"):
+                self.assertIn(f"\\input{{Values/{name}}}", summary)
+
+        with self.assertRaises(ValueError):
+            storage.write(f"{FOLDERS_PATH}Values/late.tex", "4%")
+
+    def test_zip_compresslevel(self):
+        sizes = []
+        for compresslevel in (1, 9):
+            buffer = io.BytesIO()
+            with ArchiveStorage(
+                buffer, root=FOLDERS_PATH, compresslevel=compresslevel
+            ) as storage:
+                export(storage)
+            sizes.append(len(buffer.getvalue()))
+        self.assertGreater(sizes[0], sizes[1])
+
+    def test_tar(self):
+        path = "Latex/test_archive.tar.gz"
+        os.makedirs("Latex", exist_ok=True)
+        with ArchiveStorage(path, format="tar.gz", root=FOLDERS_PATH) as storage:
+            export(storage)
+            # unchanged files are not added again
+            Value(folders_path=FOLDERS_PATH, storage=storage)(
+                1, "first", printing_input=False
+            )
+            with self.assertRaises(ValueError):
+                storage.write("elsewhere/file.tex", "")
+
+        with tarfile.open(path) as archive:
+            names = archive.getnames()
+            self.assertEqual(len(names), 9)
+            self.assertEqual(len(names), len(set(names)))
+            streamed = archive.extractfile("Tabulars/streamed.tex").read()
+            self.assertIn(b"49 & 49", streamed)
+            values = archive.extractfile("Values/values.tex").read()
+            self.assertIn(b"\\pyvalset{third}{3}%", values)
+
+        with self.assertRaises(ValueError):
+            ArchiveStorage(io.BytesIO(), format="rar")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+from pythonlatex import IncrementalCompiler, Table, Value
+from pylatex.errors import CompilerError
+
+import unittest
+import os
+import shutil
+import sys
+
+FOLDERS_PATH = "Latex/test_compiler/"
+
+# stands in for pdflatex: writes the .aux, .log and .pdf of the document and
+# counts its runs, failing on documents containing \fail
+STUB_ENGINE = r"""
+import sys
+
+name = sys.argv[-1][: -len(".tex")]
+with open(f"{name}.tex") as file:
+    if "\\fail" in file.read():
+        sys.exit(1)
+with open("runs.txt", "a") as file:
+    file.write("run\n")
+for extension in ("aux", "log", "pdf"):
+    with open(f"{name}.{extension}", "w") as file:
+        file.write("\\relax\n")
+"""
+
+DOCUMENT = r"""\documentclass{article}
+\begin{document}
+\input{Values/compiled_value}
+\input{Tables/compiled_table}
+%s
+\end{document}
+"""
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(FOLDERS_PATH, ignore_errors=True)
+        os.makedirs(FOLDERS_PATH)
+        engine_path = os.path.join(FOLDERS_PATH, "engine.py")
+        with open(engine_path, "w") as file:
+            file.write(STUB_ENGINE)
+        self.compiler = IncrementalCompiler(
+            os.path.join(FOLDERS_PATH, "main"),
+            folders_path=FOLDERS_PATH,
+            engine=[sys.executable, os.path.abspath(engine_path)],
+        )
+        self.value = Value(folders_path=FOLDERS_PATH)
+        self.table = Table(folders_path=FOLDERS_PATH)
+        self.value(1, "compiled_value", printing_input=False)
+        self.value(1, "unused_value", printing_input=False)
+        self.table.create_input_latex("a & b", "compiled_table", printing_input=False)
+        self.write_document()
+
+    def write_document(self, extra=""):
+        with open(os.path.join(FOLDERS_PATH, "main.tex"), "w") as file:
+            file.write(DOCUMENT % extra)
+
+    def runs(self):
+        with open(os.path.join(FOLDERS_PATH, "runs.txt")) as file:
+            return len(file.readlines())
+
+    def test_compile_incrementally(self):
+        # the first compile needs a second pass as the .aux file appeared
+        result = self.compiler.compile()
+        self.assertTrue(result.compiled)
+        self.assertEqual(result.passes, 2)
+        self.assertIn("Values/compiled_value.tex", result.changed)
+        self.assertEqual(self.runs(), 2)
+
+        # nothing changed, an unchanged value or an artifact not in the document
+        self.value(1, "compiled_value", printing_input=False)
+        self.value(2, "unused_value", printing_input=False)
+        self.assertEqual(self.compiler.compile().compiled, False)
+        self.assertEqual(self.runs(), 2)
+
+        # a changed dependency compiles once, as the .aux file stays the same
+        self.table.create_input_latex("c & d", "compiled_table", printing_input=False)
+        result = self.compiler.compile()
+        self.assertEqual(result.changed, ["Tabulars/compiled_table.tex"])
+        self.assertEqual(result.passes, 1)
+        self.assertEqual(self.runs(), 3)
+
+        self.assertTrue(self.compiler.compile(force=True).compiled)
+        os.remove(os.path.join(FOLDERS_PATH, "main.pdf"))
+        self.assertTrue(self.compiler.compile().compiled)
+        self.assertEqual(self.runs(), 5)
+
+    def test_chapter_inputs(self):
+        chapter = os.path.join(FOLDERS_PATH, "chapters", "intro.tex")
+        os.makedirs(os.path.dirname(chapter))
+        with open(chapter, "w") as file:
+            file.write("\\input{Values/chapter_value}\n")
+            file.write("% \\input{Values/unused_value}\n")
+        self.value(1, "chapter_value", printing_input=False)
+        self.write_document("\\include{chapters/intro}")
+        self.assertTrue(self.compiler.compile().compiled)
+
+        # artifacts input by a chapter are dependencies, commented ones not
+        self.value(2, "unused_value", printing_input=False)
+        self.assertFalse(self.compiler.compile().compiled)
+        self.value(2, "chapter_value", printing_input=False)
+        result = self.compiler.compile()
+        self.assertEqual(result.changed, ["Values/chapter_value.tex"])
+
+        # and so is the chapter itself
+        with open(chapter, "a") as file:
+            file.write("more text\n")
+        self.assertEqual(self.compiler.compile().changed, [chapter])
+
+    def test_compile_errors(self):
+        self.write_document("\\fail")
+        with self.assertRaises(CompilerError):
+            self.compiler.compile()
+        # no state is kept for a failed compile, so the next one retries
+        self.write_document()
+        self.assertTrue(self.compiler.compile().compiled)
+
+        self.compiler.engine = ["pythonlatex-missing-engine"]
+        with self.assertRaises(CompilerError):
+            self.compiler.compile()
+
+
+if __name__ == "__main__":
+    unittest.main()
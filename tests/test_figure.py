@@ -1,11 +1,25 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from pythonlatex import Figure
+from pythonlatex import (
+    BackgroundRenderer,
+    Figure,
+    FigureBatch,
+    MemoryStorage,
+    PngOptimizer,
+    RenderCache,
+    SubFigure,
+)
 from pylatex import Document, NoEscape
 
 import unittest
 import os
 import shutil
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from pythonlatex.decimate import decimate_lines, lttb
 
 a = 0.0
 b = 2.0
@@ -44,6 +58,26 @@ doc.preamble.append(NoEscape(r"\usepackage{graphicx}"))
 doc.preamble.append(NoEscape(r"\usepackage{zref-user}"))
 doc.generate_pdf("Latex/test_tex", clean_tex=False)
 
+
+def plot_line(slope):
+    plt.figure()
+    plt.plot(x, slope * x)
+
+
+def plot_returned(slope):
+    figure, axes = plt.subplots()
+    axes.plot(x, slope * x)
+    return figure
+
+
+def plot_fails():
+    raise ValueError("no data")
+
+
+def plot_slow():
+    time.sleep(10)
+
+
 class TestFigures(unittest.TestCase):
     def test_path(self):
         path = "./Latex/test_path/"
@@ -162,6 +196,365 @@ class TestFigures(unittest.TestCase):
         doc.preamble.append(NoEscape(r"\usepackage{zref-user}"))
         doc.generate_pdf("Latex/test_tex", clean_tex=False)
 
+    def test_background_renderer(self):
+        name = "test_background"
+        with BackgroundRenderer(max_workers=2) as renderer:
+            fig = Figure(renderer=renderer)
+            plt.figure()
+            plt.plot(x, y)
+            job = fig.create_input_latex(name, printing_input=False)
+            plt.close()
+
+            # outer file and LaTeX path are available before the render is done
+            self.assertEqual(job, f"Graphics/{name}.png")
+            self.assertTrue(os.path.isfile(fig._absolute_outer_path(f"{name}.tex")))
+
+        self.assertTrue(job.done())
+        self.assertTrue(os.path.isfile(fig._absolute_inner_path(f"{name}.png")))
+
+    def test_background_renderer_error(self):
+        renderer = BackgroundRenderer(max_workers=1)
+        fig = Figure(renderer=renderer)
+        plt.figure()
+        plt.plot(x, y)
+        fig.save_plot("test_background_error", extension="unknown")
+        plt.close()
+
+        with self.assertRaises(RuntimeError):
+            renderer.shutdown()
+
+    def test_figure_batch(self):
+        path = "Latex/test_batch/"
+        batch = FigureBatch(max_workers=2, timeout=5, folders_path=path)
+        for slope in [3, 1, 2]:
+            batch.register(plot_line, f"batch_{slope}", args=(slope,))
+        batch.register(plot_returned, "batch_returned", kwargs={"slope": 4})
+        batch.register(plot_fails, "batch_fails", caption="Fails")
+
+        with self.assertWarns(UserWarning):
+            results = batch.run()
+
+        # results follow the registration, the failure does not stop the others
+        names = ["batch_3", "batch_1", "batch_2", "batch_returned", "batch_fails"]
+        self.assertEqual([result.filename for result in results], names)
+        self.assertIn("no data", results[-1].error)
+        self.assertIsNone(results[-1].latex_input)
+
+        fig = Figure(folders_path=path)
+        for name in names[:-1]:
+            self.assertTrue(os.path.isfile(fig._absolute_inner_path(f"{name}.png")))
+            self.assertTrue(os.path.isfile(fig._absolute_outer_path(f"{name}.tex")))
+        recorded = [artifact.filename for artifact in fig.manifest.artifacts()]
+        self.assertEqual(recorded, sorted(names[:-1]))
+
+        report = batch.timings(slowest=2).splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertTrue(all(result.total_time > 0 for result in results[:-1]))
+
+    def test_figure_batch_timeout(self):
+        batch = FigureBatch(max_workers=1, timeout=0.2)
+        batch.register(plot_slow, "batch_slow")
+        batch.register(plot_line, "batch_after_slow", args=(1,))
+
+        start = time.perf_counter()
+        with self.assertWarns(UserWarning):
+            results = batch.run()
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertIn("TimeoutError", results[0].error)
+        self.assertIsNone(results[1].error)
+
+    def test_save_variants(self):
+        fig = Figure()
+        plt.figure()
+        plt.plot(x, y)
+        path = fig.save_plot("test_variants", extension=["pdf", "png"], dpi=[100, 50])
+        figure = plt.gcf()
+
+        # the graphic refers to the primary format, raster formats get every dpi
+        self.assertEqual(path, "Graphics/test_variants.pdf")
+        expected = ["test_variants.pdf", "test_variants.png", "test_variants_50dpi.png"]
+        for name in expected:
+            self.assertTrue(os.path.isfile(fig._absolute_inner_path(name)))
+        vector_50dpi = fig._absolute_inner_path("test_variants_50dpi.pdf")
+        self.assertFalse(os.path.isfile(vector_50dpi))
+
+        # the primary dpi output is the same as saving it on its own
+        buffer = BytesIO()
+        figure.savefig(buffer, format="png", dpi=100)
+        with open(fig._absolute_inner_path("test_variants.png"), "rb") as file:
+            self.assertEqual(file.read(), buffer.getvalue())
+        with Image.open(fig._absolute_inner_path("test_variants_50dpi.png")) as image:
+            self.assertEqual(image.size, (320, 240))
+        plt.close()
+
+    def test_save_variants_formats(self):
+        fig = Figure()
+        plt.figure()
+        plt.plot(x, y)
+        extensions = ["png", "tif", "jpg", "webp"]
+        fig.save_plot("test_formats", extension=extensions, dpi=[100, 50])
+        plt.close()
+
+        formats = Image.registered_extensions()
+        for extension in extensions:
+            for name in ["test_formats", "test_formats_50dpi"]:
+                path = fig._absolute_inner_path(f"{name}.{extension}")
+                with Image.open(path) as image:
+                    self.assertEqual(image.format, formats[f".{extension}"])
+
+    def test_rasterize_heavy_artists(self):
+        points = np.random.default_rng(0).random((200_000, 2))
+        plt.figure()
+        plt.plot(x, y)
+        scatter = plt.scatter(points[:, 0], points[:, 1], s=1)
+
+        vector = Figure(rasterize_threshold=None)
+        vector.save_plot("test_vector", extension="pdf")
+        fig = Figure(rasterize_threshold=100_000, rasterize_dpi=150)
+        with self.assertLogs("pythonlatex.figure", "INFO") as logs:
+            fig.save_plot("test_rasterized", extension="pdf")
+        with self.assertLogs("pythonlatex.figure", "INFO") as variant_logs:
+            fig.save_plot("test_rasterized", extension=["pdf", "png"], dpi=[120, 60])
+        plt.close()
+
+        # only the scatter is rasterized, and just while saving
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("PathCollection (200000 elements)", logs.output[0])
+        self.assertIn("150 dpi", logs.output[0])
+        self.assertIn("120 dpi", variant_logs.output[0])
+        self.assertFalse(scatter.get_rasterized())
+        self.assertLess(
+            os.path.getsize(fig._absolute_inner_path("test_rasterized.pdf")),
+            os.path.getsize(vector._absolute_inner_path("test_vector.pdf")) / 10,
+        )
+
+    def test_decimate(self):
+        series = np.sin(np.linspace(0, 20, 100_000))
+        series[54_321] = 5.0
+        plt.figure(figsize=(4, 3))
+        (line,) = plt.plot(series)
+        decimated = decimate_lines(plt.gcf(), 100, points_per_pixel=2)
+        self.assertEqual(len(decimated), 1)
+        self.assertEqual(len(line.get_ydata()), int(line.axes.bbox.width * 2))
+        self.assertIn(5.0, line.get_ydata())
+        line.set_data(*decimated[0][1:])
+
+        # decimated while saving only
+        fig = Figure(decimate=True, points_per_pixel=2)
+        fig.save_plot("test_decimate", dpi=100)
+        plt.close()
+        self.assertEqual(len(line.get_ydata()), 100_000)
+        with Image.open(fig._absolute_inner_path("test_decimate.png")) as image:
+            self.assertEqual(image.size, (400, 300))
+
+        x_values = np.arange(100_000, dtype=float)
+        kept = lttb(x_values, series, 500)
+        self.assertEqual(len(kept), 500)
+        self.assertEqual((kept[0], kept[-1]), (0, 99_999))
+        self.assertIn(54_321, kept)
+        self.assertTrue((np.diff(kept) > 0).all())
+
+    def test_render_modes(self):
+        plt.figure()
+        plt.plot(x, y)
+        variants = [
+            {"caption": "a_b & c", "description": "100%"},
+            {"caption": "below", "above": False, "resizebox": True},
+        ]
+        for figure_class in (Figure, SubFigure):
+            for variant in variants:
+                tree, template = (
+                    figure_class(position="ht", render_mode=render_mode)
+                    for render_mode in ("tree", "template")
+                )
+                for figure in (tree, template):
+                    figure.add_plot("test_render_modes", **variant)
+                self.assertEqual(template.dumps(), tree.dumps())
+                self.assertEqual(template.dumps_packages(), tree.dumps_packages())
+
+        # items added through the pylatex api keep their place among the lines
+        tree, template = (
+            Figure(render_mode=render_mode) for render_mode in ("tree", "template")
+        )
+        for figure in (tree, template):
+            figure.append(NoEscape(r"\small"))
+            figure.add_caption("first")
+            figure.add_plot("test_render_modes", caption="below", above=False)
+            figure.append("Source: a_b & c")
+            figure.insert(1, NoEscape(r"\centering"))
+        self.assertEqual(template.dumps(), tree.dumps())
+        self.assertEqual(template.dumps_packages(), tree.dumps_packages())
+        self.assertIn("Source: a\\_b \\& c", template.dumps())
+        plt.close()
+
+    def test_memory_storage(self):
+        path = "Latex/test_memory_storage/"
+        storage = MemoryStorage()
+        # plots are rendered and optimized in process, not written to disk
+        with BackgroundRenderer() as renderer, PngOptimizer() as optimizer:
+            fig = Figure(
+                folders_path=path,
+                storage=storage,
+                renderer=renderer,
+                png_optimizer=optimizer,
+            )
+            plt.figure()
+            plt.plot(x, y)
+            fig.create_input_latex(
+                "memory", extension=["png", "pdf"], printing_input=False
+            )
+            plt.close()
+
+        self.assertFalse(os.path.exists(path))
+        png = storage.read(f"{path}Graphics/memory.png")
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertTrue(storage.read(f"{path}Graphics/memory.pdf").startswith(b"%PDF"))
+        self.assertIn(b"Graphics/memory.png", storage.read(f"{path}Figures/memory.tex"))
+
+    def test_png_optimizer(self):
+        name = "test_png_optimizer"
+        with PngOptimizer(quantize=True) as optimizer:
+            fig = Figure(png_optimizer=optimizer)
+            plt.figure()
+            plt.plot(x, y, antialiased=False)
+            fig.save_plot(name, dpi=100)
+            buffer = BytesIO()
+            plt.gcf().savefig(buffer, format="png", dpi=100)
+            plt.close()
+
+        # losslessly smaller, without the text chunks but with the dpi
+        path = fig._absolute_inner_path(f"{name}.png")
+        self.assertLess(os.path.getsize(path), len(buffer.getvalue()))
+        with Image.open(path) as optimized, Image.open(buffer) as original:
+            self.assertEqual(optimized.mode, "P")
+            self.assertNotIn("Software", optimized.info)
+            self.assertAlmostEqual(optimized.info["dpi"][0], 100, places=1)
+            self.assertEqual(
+                np.asarray(optimized.convert("RGBA")).tobytes(),
+                np.asarray(original.convert("RGBA")).tobytes(),
+            )
+
+        self.assertEqual(len(optimizer.results), 1)
+        self.assertEqual(optimizer.results[0].optimized_size, os.path.getsize(path))
+        self.assertGreater(optimizer.total_saved, 0)
+        self.assertIn("total", optimizer.report().splitlines()[-1])
+
+    def test_render_cache(self):
+        cache = RenderCache("Latex/test_render_cache")
+        for name in ["test_cache1", "test_cache2"]:
+            fig = Figure(render_cache=cache)
+            plt.figure()
+            plt.plot(x, y)
+            fig.save_plot(name)
+            plt.close()
+
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertTrue(os.path.isfile(fig._absolute_inner_path("test_cache2.png")))
+
+        # the index on disk is picked up by a new cache
+        cache.flush()
+        self.assertEqual(RenderCache("Latex/test_render_cache").stats["entries"], 1)
+
+    def test_render_cache_background(self):
+        cache = RenderCache("Latex/test_render_cache_background")
+
+        def save(fig, name, extension):
+            plt.figure()
+            plt.plot(x, y)
+            try:
+                return fig.save_plot(name, extension=extension)
+            finally:
+                plt.close()
+
+        extensions = ["png", ["png", "pdf"]]
+        for extension in extensions:
+            save(Figure(render_cache=cache), "test_cached", extension)
+
+        # cache hits report whether the file on disk actually changed
+        with BackgroundRenderer(max_workers=1) as renderer:
+            fig = Figure(renderer=renderer, render_cache=cache)
+            for extension in extensions:
+                unchanged = save(fig, "test_cached", extension)
+                self.assertFalse(unchanged.result()[0])
+                new = save(fig, "test_cached_new", extension)
+                self.assertTrue(new.result()[0])
+        self.assertEqual(cache.stats["hits"], 6)
+
+    def test_render_cache_eviction(self):
+        cache = RenderCache("Latex/test_render_cache_eviction", max_bytes=16)
+        for i in range(3):
+            cache.put(f"fingerprint{i}", b"rendered")
+
+        self.assertEqual(cache.stats["entries"], 2)
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertIsNone(cache.get("fingerprint0"))
+        self.assertIsNotNone(cache.get("fingerprint2"))
+
+    def test_render_cache_processes(self):
+        path = "Latex/test_render_cache_processes"
+        shutil.rmtree(path, ignore_errors=True)
+        first = RenderCache(path, max_bytes=16)
+        first.put("a", b"rendered")
+        first.flush()
+
+        # a second cache (process) evicts "a" and adds its own entries
+        second = RenderCache(path, max_bytes=16)
+        second.put("b", b"rendered")
+        second.put("c", b"rendered")
+        second.flush()
+        first.put("d", b"rendered")
+        first.flush()
+
+        # "a" does not come back and the merged index stays within max_bytes
+        merged = RenderCache(path, max_bytes=16)
+        self.assertEqual(sorted(merged._entries), ["c", "d"])
+        self.assertLessEqual(merged.size, 16)
+
+    def test_render_cache_fingerprint(self):
+        from matplotlib.colors import LogNorm
+        from matplotlib.ticker import FuncFormatter
+
+        from pythonlatex.cache import figure_fingerprint
+
+        data = np.arange(1, 17).reshape(4, 4)
+
+        def fingerprint(draw):
+            figure = plt.figure()
+            draw(figure.add_subplot())
+            try:
+                return figure_fingerprint(figure, (), {}, {})
+            finally:
+                plt.close(figure)
+
+        plain = fingerprint(lambda ax: ax.imshow(data))
+        self.assertEqual(plain, fingerprint(lambda ax: ax.imshow(data)))
+        for changed in [
+            lambda ax: ax.imshow(data, cmap="gray"),
+            lambda ax: ax.imshow(data, norm=LogNorm()),
+            lambda ax: ax.imshow(data, vmin=0, vmax=100),
+        ]:
+            self.assertNotEqual(plain, fingerprint(changed))
+
+        def formatted(unit):
+            def draw(ax):
+                ax.imshow(data)
+                ax.xaxis.set_major_formatter(FuncFormatter(lambda v, _: f"{v}{unit}"))
+
+            return draw
+
+        self.assertNotEqual(fingerprint(formatted("s")), fingerprint(formatted("m")))
+        self.assertNotEqual(
+            plain, fingerprint(lambda ax: (ax.imshow(data), ax.set_xscale("log")))
+        )
+
+        # anything the fingerprint can not describe is not cached at all
+        class Unit:
+            def __str__(self):
+                return "s"
+
+        self.assertIsNone(fingerprint(formatted(Unit())))
+
 
 if __name__ == "__main__":
     unittest.main()
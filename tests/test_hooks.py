@@ -0,0 +1,81 @@
+from pythonlatex import StageStats, Table, Value, add_observer, observing
+from pythonlatex import remove_observer
+from pythonlatex.hooks import _NULL_STAGE, track
+
+import unittest
+import shutil
+
+FOLDERS_PATH = "Latex/test_hooks/"
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(FOLDERS_PATH, ignore_errors=True)
+
+    def test_events(self):
+        events = []
+        add_observer(events.append)
+        try:
+            Value(folders_path=FOLDERS_PATH)(1, "hooked_value", printing_input=False)
+        finally:
+            remove_observer(events.append)
+
+        stages = [(event.event, event.stage) for event in events]
+        self.assertEqual(
+            stages,
+            [
+                ("start", "format"),
+                ("stop", "format"),
+                ("start", "write"),
+                ("stop", "write"),
+                ("start", "record"),
+                ("stop", "record"),
+            ],
+        )
+        write = events[3]
+        self.assertEqual((write.kind, write.name), ("value", "hooked_value"))
+        self.assertEqual(write.bytes_written, len("1%"))
+        self.assertGreaterEqual(write.duration, 0)
+
+        # removed observers are no longer called, and cost nothing
+        Value(folders_path=FOLDERS_PATH)(2, "hooked_value", printing_input=False)
+        self.assertEqual(len(events), 6)
+        self.assertIs(track("value", "hooked_value", "write"), _NULL_STAGE)
+
+    def test_stats(self):
+        table = Table(folders_path=FOLDERS_PATH)
+        with observing(StageStats()) as stats:
+            for number in range(3):
+                table.create_input_latex(
+                    "a & b", f"hooked_table_{number}", printing_input=False
+                )
+            # unchanged files are left untouched, writing no bytes
+            table.create_input_latex("a & b", "hooked_table_0", printing_input=False)
+
+        self.assertEqual(
+            stats.keys(),
+            [
+                ("table", "tabular"),
+                ("table", "dumps"),
+                ("table", "write"),
+                ("table", "record"),
+            ],
+        )
+        self.assertEqual(stats.count("table", "dumps"), 4)
+        self.assertEqual(stats.count("table", "write"), 8)
+        written = stats.bytes_written("table", "write")
+        self.assertGreater(written, 0)
+        self.assertLessEqual(
+            stats.percentile("table", "write", 50),
+            stats.percentile("table", "write", 99),
+        )
+        self.assertIn("record", str(stats))
+
+        table.create_input_latex("c & d", "hooked_table_0", printing_input=False)
+        self.assertEqual(stats.bytes_written("table", "write"), written)
+        stats.reset()
+        self.assertEqual(stats.keys(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
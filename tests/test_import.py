@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# heavy dependencies that should only be imported once they are needed
+HEAVY_MODULES = ("matplotlib", "pandas", "numpy")
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(statement):
+    """Runs statement in a fresh interpreter with -X importtime and returns
+    a dict of the imported top-level modules with their cumulative time (us)
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in [PACKAGE_ROOT, env.get("PYTHONPATH")] if path
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestImport(unittest.TestCase):
+    def assertNotImported(self, statement):
+        imported = import_times(statement)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, imported, f"'{statement}' imports {module}")
+        return imported
+
+    def test_import_package(self):
+        self.assertNotImported("import pythonlatex")
+
+    def test_import_value(self):
+        self.assertNotImported("from pythonlatex import Value")
+
+    def test_import_classes(self):
+        self.assertNotImported(
+            "from pythonlatex import Figure, LatexSaving, SubFigure, Table, Value"
+        )
+
+    def test_value_without_heavy_modules(self):
+        self.assertNotImported(
+            "import tempfile; from pythonlatex import Value; "
+            "Value(folders_path=tempfile.mkdtemp() + '/')(1, 'x', printing_input=False)"
+        )
+
+    def test_lazy_attribute(self):
+        import pythonlatex
+
+        self.assertIn("Figure", dir(pythonlatex))
+        with self.assertRaises(AttributeError):
+            pythonlatex.DoesNotExist
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+from pythonlatex import MemoryStorage, Table, Value, set_default_storage
+from pythonlatex.saving import LocalStorage, buffered_inputs, write_if_changed
+
+import unittest
+from unittest import mock
+
+import multiprocessing
+import os
+import shutil
+import threading
+
+try:
+    shutil.rmtree("Latex")
+except FileNotFoundError:
+    pass
+
+STRESS_PATH = "./Latex/test_stress/"
+STRESS_CONTENT = "x" * 100000
+
+
+def hammer_folder(process):
+    """Writes a shared and own values and tables into one folder"""
+    value = Value(folders_path=STRESS_PATH)
+    table = Table(folders_path=STRESS_PATH)
+    for i in range(20):
+        value(f"{process}{STRESS_CONTENT}", "shared", printing_input=False)
+        value(i, f"value_{process}_{i}", printing_input=False)
+        table.create_input_latex(
+            f"{process} & {i}", f"table_{process}_{i}", printing_input=False
+        )
+
+
+class TestSaving(unittest.TestCase):
+    def test_write_if_changed(self):
+        os.makedirs("Latex", exist_ok=True)
+        path = "Latex/test_write_if_changed.tex"
+
+        self.assertTrue(write_if_changed(path, "first"))
+        mtime = os.stat(path).st_mtime_ns
+        self.assertFalse(write_if_changed(path, "first"))
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+        self.assertTrue(write_if_changed(path, b"second"))
+        with open(path) as file:
+            self.assertEqual(file.read(), "second")
+
+    def test_skip_unchanged_value(self):
+        value = Value()
+        value(1, "test_skip", printing_input=False)
+        value(1, "test_skip", printing_input=False)
+        value(2, "test_skip", printing_input=False)
+
+        self.assertEqual(value.write_stats.written, 2)
+        self.assertEqual(value.write_stats.skipped, 1)
+
+    def test_skip_unchanged_table(self):
+        table = Table()
+        table.create_input_latex("a & b", "test_skip", printing_input=False)
+        table.create_input_latex("a & b", "test_skip", printing_input=False)
+
+        # inner tabular and outer table file are both skipped the second time
+        self.assertEqual(table.write_stats.written, 2)
+        self.assertEqual(table.write_stats.skipped, 2)
+
+    def test_construction_without_filesystem(self):
+        path = "./Latex/test_construction/"
+        with mock.patch("os.makedirs") as makedirs, mock.patch(
+            "builtins.open"
+        ) as open_, mock.patch("os.stat") as stat:
+            for _ in range(10000):
+                Table(folders_path=path)
+        makedirs.assert_not_called()
+        open_.assert_not_called()
+        stat.assert_not_called()
+        self.assertFalse(os.path.exists(path))
+
+    def test_shared_inputs_index(self):
+        path = "./Latex/test_shared_index/"
+        Value(folders_path=path)("1", "first", printing_input=False)
+        value = Value(folders_path=path)
+        value("2", "second", printing_input=False)
+        value.flush_inputs()
+
+        # the second instance does not wipe the input of the first one
+        with open(f"{path}Values/latest_inputs.txt") as file:
+            summary = file.read()
+        self.assertEqual(summary.count("SUMMARY OF ALL VALUES"), 1)
+        self.assertIn("\\input{Values/first}", summary)
+        self.assertIn("\\input{Values/second}", summary)
+
+    def test_buffered_inputs(self):
+        path = "./Latex/test_buffered_inputs/"
+        summary_file = f"{path}Values/latest_inputs.txt"
+        with buffered_inputs():
+            value = Value(folders_path=path)
+
+            def write_values(thread):
+                for i in range(50):
+                    value(i, f"value_{thread}_{i}", printing_input=False)
+
+            threads = [
+                threading.Thread(target=write_values, args=(thread,))
+                for thread in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # nothing written yet, all inputs are pending
+            self.assertFalse(os.path.exists(summary_file))
+
+        with open(summary_file) as file:
+            summary = file.read()
+        self.assertEqual(summary.count("\\input{Values/value_"), 200)
+        self.assertEqual(len(value.manifest.artifacts(kind="value")), 200)
+
+    def test_summary_rendered_on_flush(self):
+        path = "./Latex/test_summary_flush/"
+        summary_file = f"{path}Values/latest_inputs.txt"
+        value = Value(folders_path=path)
+        for i in range(10):
+            value(i, f"value_{i}", printing_input=False)
+
+        # recorded in the manifest straight away, the summary is rendered later
+        self.assertEqual(len(value.manifest.artifacts()), 10)
+        self.assertFalse(os.path.exists(summary_file))
+        value.flush_inputs()
+        with open(summary_file) as file:
+            self.assertEqual(file.read().count("\\input{Values/value_"), 10)
+
+    def test_flush_inputs(self):
+        path = "./Latex/test_flush_inputs/"
+        summary_file = f"{path}Values/latest_inputs.txt"
+        with buffered_inputs():
+            value = Value(folders_path=path)
+            value(1, "first", printing_input=False)
+            self.assertFalse(os.path.exists(summary_file))
+            value.flush_inputs()
+            self.assertTrue(os.path.exists(summary_file))
+
+    def test_manifest(self):
+        path = "./Latex/test_manifest/"
+        for _ in range(2):
+            value = Value(folders_path=path)
+            value(2, "b", printing_input=False)
+            value(1, "a", printing_input=False)
+        table = Table(folders_path=path)
+        table.create_input_latex("a & b", "table", printing_input=False)
+
+        # rerunning replaces the entries instead of adding duplicates
+        artifacts = value.manifest.artifacts()
+        self.assertEqual(
+            [(item.kind, item.filename) for item in artifacts],
+            [("table", "table"), ("value", "a"), ("value", "b")],
+        )
+        entry = value.manifest.get("Tables", "table")
+        self.assertEqual(entry.inner_path, "Tabulars/table.tex")
+        self.assertEqual(entry.outer_path, "Tables/table.tex")
+        self.assertEqual(len(entry.digest), 64)
+
+        # summary is rendered from the manifest, sorted by filename
+        value.flush_inputs()
+        with open(f"{path}Values/latest_inputs.txt") as file:
+            summary = file.read()
+        self.assertLess(summary.index("Values/a"), summary.index("Values/b"))
+        self.assertEqual(summary.count("Values/a"), 1)
+
+    def test_memory_storage(self):
+        path = "./Latex/test_memory_storage/"
+        storage = MemoryStorage()
+        set_default_storage(storage)
+        try:
+            Value(folders_path=path)(1, "a", printing_input=False)
+            with Value(folders_path=path, consolidated=True) as values:
+                values(2, "b", printing_input=False)
+            table = Table(folders_path=path)
+            table.create_input_latex("a & b", "table", printing_input=False)
+            table.create_input_latex("a & b", "table", printing_input=False)
+            table.flush_inputs()
+        finally:
+            set_default_storage(LocalStorage())
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(storage.read(f"{path}Values/a.tex"), b"1%")
+        self.assertIn(b"\\pyvalset{b}{2}%", storage.read(f"{path}Values/values.tex"))
+        self.assertEqual(storage.read(f"{path}Tabulars/table.tex"), b"a & b")
+        table_file = storage.read(f"{path}Tables/table.tex")
+        self.assertIn(b"\\input{Tabulars/table}", table_file)
+        self.assertEqual(table.write_stats.skipped, 2)
+
+        summary = storage.read(f"{path}Values/latest_inputs.txt").decode()
+        self.assertIn("\\input{Values/a}", summary)
+        self.assertIn("\\pyval{b}", summary)
+        manifest = storage.manifest(f"{path}manifest.sqlite")
+        self.assertEqual(
+            [item.filename for item in manifest.artifacts()],
+            ["table", "a", "b", "values"],
+        )
+
+        # a per-instance storage overrides the default one
+        local = Table(folders_path=path, storage=LocalStorage())
+        local.create_input_latex("c & d", "table", printing_input=False)
+        with open(f"{path}Tabulars/table.tex") as file:
+            self.assertEqual(file.read(), "c & d")
+        self.assertEqual(storage.read(f"{path}Tabulars/table.tex"), b"a & b")
+
+    def test_atomic_multiprocess(self):
+        n_processes = 4
+        shared_file = f"{STRESS_PATH}Values/shared.tex"
+        valid = {f"{process}{STRESS_CONTENT}%" for process in range(n_processes)}
+
+        processes = [
+            multiprocessing.Process(target=hammer_folder, args=(process,))
+            for process in range(n_processes)
+        ]
+        for process in processes:
+            process.start()
+
+        # a reader never sees a torn file while the processes keep replacing it
+        while any(process.is_alive() for process in processes):
+            try:
+                with open(shared_file) as file:
+                    self.assertIn(file.read(), valid)
+            except FileNotFoundError:
+                pass
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        # no index entries got lost
+        with open(f"{STRESS_PATH}Values/latest_inputs.txt") as file:
+            summary = file.read()
+        with open(f"{STRESS_PATH}Tables/latest_inputs.txt") as file:
+            tables = file.read()
+        for process in range(n_processes):
+            for i in range(20):
+                self.assertIn(f"\\input{{Values/value_{process}_{i}}}", summary)
+                self.assertIn(f"\\input{{Tables/table_{process}_{i}}}", tables)
+        manifest = Value(folders_path=STRESS_PATH).manifest
+        self.assertEqual(len(manifest.artifacts()), n_processes * 40 + 1)
+        self.assertEqual(
+            [name for name in os.listdir(f"{STRESS_PATH}Values") if name.endswith(".tmp")],
+            [],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
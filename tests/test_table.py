@@ -1,4 +1,4 @@
-from pythonlatex import Table
+from pythonlatex import Pretypesetter, Table, export_tables
 from pylatex import Document, NoEscape
 
 # from pylatex.base_classes import Arguments
@@ -11,6 +11,8 @@ import unittest
 
 import os
 import shutil
+import sys
+import tracemalloc
 
 try:
     shutil.rmtree("Latex")
@@ -26,6 +28,20 @@ for i in x:
 # df["y"] = x
 df.index.name = "index"
 
+# stands in for pdflatex: "compiles" a standalone document into a pdf holding
+# its source and counts its runs
+STUB_ENGINE = r"""
+import sys
+
+name = sys.argv[-1][: -len(".tex")]
+with open(f"{name}.tex") as file:
+    source = file.read()
+with open("runs.txt", "a") as file:
+    file.write(f"{name}\n")
+with open(f"{name}.pdf", "w") as file:
+    file.write(source)
+"""
+
 
 class TestTables(unittest.TestCase):
     def test_path(self):
@@ -225,6 +241,282 @@ class TestTables(unittest.TestCase):
             "Cannot have both resizebox and adjustbox" in str(context.exception)
         )
 
+    def test_stream_dataframe(self):
+        table = Table()
+        name = "test_stream"
+        table.add_table(df, name, chunk_size=5)
+
+        # streamed output matches the Styler output, only the path is kept
+        with open(table._absolute_inner_path(f"{name}.tex")) as file:
+            self.assertEqual(file.read(), df.style.to_latex())
+        self.assertIsNone(table.tabular)
+        self.assertEqual(table.tabular_path, table._absolute_inner_path(f"{name}.tex"))
+
+    def test_stream_dataframe_hrules(self):
+        table = Table()
+        name = "test_stream_hrules"
+        table.add_table(df, name, chunk_size=5, hrules=True)
+
+        with open(table._absolute_inner_path(f"{name}.tex")) as file:
+            self.assertEqual(file.read(), df.style.to_latex(hrules=True))
+
+    def test_stream_rows(self):
+        table = Table()
+        name = "test_stream_rows"
+        rows = ((i, i * 0.5, f"row {i}") for i in range(200000))
+
+        tracemalloc.start()
+        table.add_table(rows, name, columns=["i", "half", "label"], chunk_size=1000)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # memory stays proportional to a chunk, not to the ~7MB tabular
+        self.assertLess(peak, 2 * 1024**2)
+        with open(table._absolute_inner_path(f"{name}.tex")) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(
+            lines[:3],
+            [
+                "\\begin{tabular}{rrl}",
+                "i & half & label \\\\",
+                "0 & 0.000000 & row 0 \\\\",
+            ],
+        )
+        self.assertEqual(len(lines), 200003)
+
+    def test_stream_rows_without_columns(self):
+        table = Table()
+        with self.assertRaises(ValueError):
+            table.add_table(iter([(1, 2)]), "test_stream_error")
+
+    def test_numpy_engine(self):
+        numbers = pd.DataFrame(
+            {
+                "float": [1234567.891, -0.5, np.nan, -1234.5],
+                "int": [1234567, 3, -4000, 0],
+                "small": np.array([0.1, 0.25, np.nan, 2], dtype="float32"),
+            }
+        )
+        numbers.index.name = "index"
+        options = [
+            {},
+            {"precision": 2, "thousands": ","},
+            {"precision": 1, "thousands": "\\,", "na_rep": "--"},
+            {"number_format": "percent", "precision": 1, "na_rep": "-"},
+            {"number_format": "scientific", "precision": 3},
+        ]
+        for formatting in options:
+            with self.subTest(**formatting):
+                table = Table()
+                table._set_tabular(numbers, engine="numpy", hrules=True, **formatting)
+                styler = Table()
+                styler._set_tabular(numbers, hrules=True, **formatting)
+                self.assertEqual(table.tabular, styler.tabular)
+
+    def test_numpy_engine_stream(self):
+        table = Table()
+        name = "test_numpy_stream"
+        table.add_table(df, name, chunk_size=5, engine="numpy", thousands=",")
+
+        with open(table._absolute_inner_path(f"{name}.tex")) as file:
+            self.assertEqual(file.read(), df.style.format(thousands=",").to_latex())
+
+    def test_split_continued(self):
+        table = Table()
+        name = "test_split"
+        table.add_table(df, name, max_rows=8, caption="Split", hrules=True)
+
+        # every page is a full tabular of its rows, in its own inner file
+        for number, start in enumerate(range(0, len(df), 8), start=1):
+            with open(table._absolute_inner_path(f"{name}_{number}.tex")) as file:
+                page = df.iloc[start : start + 8].style.to_latex(hrules=True)
+                self.assertEqual(file.read(), page)
+        self.assertFalse(os.path.exists(table._absolute_inner_path(f"{name}_4.tex")))
+
+        latex = table.dumps()
+        self.assertEqual(latex.count("\\begin{table}"), 3)
+        self.assertEqual(latex.count("\\ContinuedFloat"), 2)
+        self.assertEqual(latex.count("\\caption[]{Split (continued)}"), 2)
+        self.assertEqual(latex.count("\\label{tbl:test_split}"), 1)
+
+        # fewer pages on a rerun remove the pages left by the earlier run
+        table.reset()
+        table.add_table(df, name, max_rows=10)
+        self.assertFalse(os.path.exists(table._absolute_inner_path(f"{name}_3.tex")))
+        self.assertEqual(table.dumps().count("\\begin{table}"), 2)
+
+    def test_split_longtable(self):
+        table = Table()
+        name = "test_split_longtable"
+        table.add_table(df, name, max_rows=10, split="longtable", caption="Long")
+
+        latex = table.dumps()
+        self.assertTrue(latex.startswith("\\begin{longtable}{lrrrrrrrrrrrrrrrrrrr}"))
+        self.assertIn("\\caption{Long}\\label{tbl:test_split_longtable}", latex)
+        self.assertIn(f"\\input{{Tabulars/{name}_2}}", latex)
+        self.assertIn("\\usepackage{longtable}", table.dumps_packages())
+
+        # the pages only hold rows, the header is part of the longtable
+        with open(table._absolute_inner_path(f"{name}_2.tex")) as file:
+            rows = file.read().splitlines()
+        self.assertEqual(len(rows), 9)
+        self.assertTrue(rows[0].startswith("10 & 11 & 11"))
+
+    def test_split_auto(self):
+        table = Table()
+        table.page_height = 120.0
+        table.add_table(df, "test_split_auto", max_rows="auto")
+        # 10 rows fit, minus two header rows and the rows kept for the caption
+        with open(table._absolute_inner_path("test_split_auto_1.tex")) as file:
+            self.assertEqual(file.read(), df.iloc[:4].style.to_latex())
+
+    def test_split_memory(self):
+        numbers = pd.DataFrame(np.ones((200000, 3)), columns=["a", "b", "c"])
+        table = Table()
+
+        tracemalloc.start()
+        table.add_table(numbers, "test_split_memory", max_rows=2000, engine="numpy")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # memory stays proportional to a page, not to the ~6MB of pages
+        self.assertLess(peak, 2 * 1024**2)
+        self.assertEqual(table.dumps().count("\\begin{table}"), 100)
+
+    def test_split_errors(self):
+        table = Table()
+        with self.assertRaises(ValueError):
+            table.add_table(df, "test_split_error", max_rows=5, split="pages")
+        with self.assertRaises(ValueError):
+            table.add_table("tabular", "test_split_error", max_rows=5)
+        # Styler.to_latex options are refused rather than failing mid-write
+        with self.assertRaisesRegex(ValueError, "siunitx"):
+            table.create_input_latex(df, "test_split_error", max_rows=20, siunitx=True)
+        with self.assertRaisesRegex(ValueError, "siunitx"):
+            table.add_table(df, "test_split_error", chunk_size=10, siunitx=True)
+        with self.assertRaisesRegex(ValueError, "engine"):
+            table.add_table([(1,)], "test_split_error", columns=["a"], engine="numpy")
+
+    def test_export_tables(self):
+        path = "./Latex/test_export/"
+        tables = [
+            (f"export_{i}", df * i, {"caption": f"Export {i}"}) for i in range(5, 0, -1)
+        ]
+        failing = pd.DataFrame({"a": ["x"]})
+        tables.insert(2, ("export_fails", failing, {"engine": "numpy"}))
+
+        with self.assertWarns(UserWarning) as context:
+            results = export_tables(
+                tables, max_workers=2, folders_path=path, hrules=True
+            )
+
+        # results follow the batch, the failure does not stop the others
+        self.assertEqual([result.name for result in results], [t[0] for t in tables])
+        self.assertIn("export_fails", str(context.warning))
+        self.assertIn("ValueError", results[2].error)
+        self.assertIsNone(results[2].latex_input)
+
+        table = Table(folders_path=path)
+        for name, tabular, _ in tables[:2] + tables[3:]:
+            with open(table._absolute_inner_path(f"{name}.tex")) as file:
+                self.assertEqual(file.read(), tabular.style.to_latex(hrules=True))
+        recorded = [artifact.filename for artifact in table.manifest.artifacts()]
+        self.assertEqual(recorded, [f"export_{i}" for i in range(1, 6)])
+        with open(table._latest_inputs_file) as file:
+            self.assertIn(results[0].latex_input, file.read())
+
+    def test_export_tables_mapping(self):
+        path = "./Latex/test_export_mapping/"
+        results = export_tables(
+            {"mapping_a": df, "mapping_b": (df, {"caption": False})},
+            max_workers=1,
+            folders_path=path,
+        )
+        self.assertTrue(all(result.error is None for result in results))
+        outer_path = Table(folders_path=path)._absolute_outer_path("mapping_b.tex")
+        with open(outer_path) as file:
+            self.assertNotIn("caption", file.read())
+
+    def test_numpy_engine_errors(self):
+        table = Table()
+        with self.assertRaises(ValueError):
+            table._set_tabular(pd.DataFrame({"a": ["x"]}), engine="numpy")
+        with self.assertRaises(ValueError):
+            table._set_tabular(df, engine="cython")
+
+    def test_pretypeset(self):
+        path = "./Latex/test_pretypeset/"
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        with open(f"{path}engine.py", "w") as file:
+            file.write(STUB_ENGINE)
+        engine = [sys.executable, os.path.abspath(f"{path}engine.py")]
+
+        def export(content):
+            with Pretypesetter(path, engine=engine, max_workers=1) as pretypesetter:
+                table = Table(folders_path=path, pretypesetter=pretypesetter)
+                table.create_input_latex(content, "typeset", printing_input=False)
+            return pretypesetter.compiled
+
+        def runs():
+            with open(f"{path}Pretypeset/runs.txt") as file:
+                return file.read().split()
+
+        # the table includes the pdf of the standalone document
+        self.assertEqual(export("a & b"), ["Tabulars-typeset"])
+        with open(f"{path}Tables/typeset.tex") as file:
+            outer = file.read()
+        self.assertIn("\\includegraphics{Pretypeset/Tabulars-typeset.pdf}", outer)
+        self.assertNotIn("\\input", outer)
+        with open(f"{path}Pretypeset/Tabulars-typeset.pdf") as file:
+            self.assertIn("\\input{Tabulars/typeset}", file.read())
+
+        # only a changed tabular is compiled again, also by a new instance
+        self.assertEqual(export("a & b"), [])
+        self.assertEqual(export("c & d"), ["Tabulars-typeset"])
+        self.assertEqual(export("a & b"), [])
+        self.assertEqual(runs(), ["Tabulars-typeset"] * 2)
+
+    def test_render_modes(self):
+        variants = [
+            {},
+            {"caption": "a_b & c", "description": "100%", "label": "x_1"},
+            {"caption": "below", "description": "text", "above": False},
+            {"resizebox": True, "adjustbox": False, "zref": True},
+            {"placement": None, "max_rows": 5},
+        ]
+        for variant in variants:
+            with self.subTest(**variant):
+                tree, template = (
+                    Table(position="h", render_mode=render_mode)
+                    for render_mode in ("tree", "template")
+                )
+                for table in (tree, template):
+                    table.add_table(df, "test_render_modes", **variant)
+                self.assertEqual(template.dumps(), tree.dumps())
+                self.assertEqual(template.dumps_packages(), tree.dumps_packages())
+                self.assertEqual(tree._lines, None)
+                self.assertEqual(template.data, [])
+
+        # items added through the pylatex api keep their place among the lines
+        tree, template = (
+            Table(render_mode=render_mode) for render_mode in ("tree", "template")
+        )
+        for table in (tree, template):
+            table.append(NoEscape(r"\small"))
+            table.add_caption("first")
+            table.add_table(df, "test_render_modes", caption="below", above=False)
+            table.append("Source: a_b & c")
+            table.insert(1, NoEscape(r"\centering"))
+            table.add_label("last")
+        self.assertEqual(template.dumps(), tree.dumps())
+        self.assertEqual(template.dumps_packages(), tree.dumps_packages())
+        self.assertIn("Source: a\\_b \\& c", template.dumps())
+        self.assertEqual(template.data, [])
+
+        with self.assertRaises(ValueError):
+            Table(render_mode="jinja").add_table("a & b", "test_render_modes")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -4,7 +4,9 @@ from pylatex import Document, NoEscape
 import unittest
 
 # import os
+import gc
 import shutil
+import weakref
 
 try:
     shutil.rmtree("Latex")
@@ -78,6 +80,60 @@ class Testvalues(unittest.TestCase):
         _ = value(1.124, name, printing_input=False, vformat=":.2f")
         self.assertRaises(ValueError, value, 1.1221, name)
 
+    def test_consolidated(self):
+        path = "./Latex/test_consolidated/"
+        with Value(folders_path=path, consolidated=True) as value:
+            value(1, "first", printing_input=False)
+            value(2, "second", printing_input=False)
+            value(3, "first", printing_input=False)
+
+        with open(f"{path}Values/values.tex") as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[-2:], ["\\pyvalset{first}{3}%", "\\pyvalset{second}{2}%"])
+
+        # rerun replaces entries in place and keeps the others
+        value = Value(folders_path=path, consolidated=True)
+        value(4, "second", printing_input=False)
+        value(5, "third", printing_input=False)
+        self.assertTrue(value.flush())
+
+        with open(f"{path}Values/values.tex") as file:
+            lines = file.read().splitlines()
+        self.assertEqual(
+            lines[-3:],
+            [
+                "\\pyvalset{first}{3}%",
+                "\\pyvalset{second}{4}%",
+                "\\pyvalset{third}{5}%",
+            ],
+        )
+
+    def test_consolidated_released(self):
+        path = "./Latex/test_consolidated_released/"
+        value = Value(folders_path=path, consolidated=True)
+        value(1, "first", printing_input=False)
+        reference = weakref.ref(value)
+
+        # only kept alive for the exit flush while it holds pending values
+        del value
+        gc.collect()
+        self.assertIsNotNone(reference())
+        reference().flush()
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_consolidated_texinput(self):
+        name = "test_consolidated_tex"
+        value = Value(consolidated=True)
+        value("1", name, printing_input=False)
+        value.flush()
+
+        doc = Document()
+        doc.preamble.append(NoEscape(r"\input{Values/values}"))
+        doc.append(NoEscape(f"\\pyval{{{name}}}"))
+
+        doc.generate_pdf(f"Latex/{name}", clean_tex=False)
+
 
 # self.assertRaises(ValueError, failure.fail)
 if __name__ == "__main__":